@@ -1,8 +1,10 @@
-from data.Data import StockData
+from data.Registry import stock_registry
 from strategy.factory import StrategyFactory
 import streamlit as st
 from data.DatabaseHandler import DBHandler
 from backtest.optimisation import WalkForwardOptimisation
+from backtest.search import SEARCH_METHODS
+import pandas as pd
 import time
 
 def app():
@@ -24,6 +26,32 @@ def app():
         else:
             st.error(error)
 
+    def showOptimisationResults(optimisation):
+        """
+        Shows the windows optimised so far and, the first time they are shown, loads the best parameters into the sliders.
+        The best parameters are those of the window with the highest in-sample return
+        """
+        rows = [row for row in optimisation["rows"] if row["Best Parameters"] is not None]
+        if not rows:
+            st.warning("No parameters were found before the optimisation stopped.")
+            return
+        best_row = max(rows, key=lambda row: row["In Sample Return"])
+        best_params, best_performance = best_row["Best Parameters"], best_row["In Sample Return"]
+
+        windows_done = len(optimisation["rows"])
+        if optimisation["finished"] and optimisation["stop_reason"] is None:
+            st.success(f"Optimisation Complete! Best {optimisation['strategy']} Parameters for {optimisation['ticker']}: {best_params} with return: {round(best_performance, 3) * 100}%", icon="🚀")
+        else:
+            reason = {"time_budget": "the time budget ran out"}.get(optimisation["stop_reason"], "it was stopped")
+            st.warning(f"Optimisation ended after {windows_done} of {optimisation['windows']} windows because {reason}. Best {optimisation['strategy']} Parameters so far for {optimisation['ticker']}: {best_params} with return: {round(best_performance, 3) * 100}%")
+        st.caption(f"{optimisation['search']} ran {optimisation['evaluations']} backtests covering {optimisation['bars']} bars")
+        st.dataframe(pd.DataFrame(optimisation["rows"]).astype({"Best Parameters": str}), use_container_width=True)
+
+        if not optimisation["applied"]:
+            # Save optimised parameters to session state
+            st.session_state[f"{optimisation['strategy']}_params"] = dict(best_params)
+            optimisation["applied"] = True
+
     # Create strategy factory
     factory = StrategyFactory()
 
@@ -39,24 +67,51 @@ def app():
     if f"{strategy_str}_params" not in st.session_state:
         st.session_state[f"{strategy_str}_params"] = {}
 
-    best_params = {}
+    # Select how the parameter space is searched during optimisation
+    search_name = st.selectbox("Search Method", list(SEARCH_METHODS.keys()))
+
+    # Optional limit on how long the optimisation may run
+    time_budget = st.number_input("Time Budget (seconds, 0 for no limit)", min_value=0, value=0, step=10)
 
     # Load the stock data when optimise button is clicked
     optimise_button = st.button("Optimise Parameters", disabled=not stock_ticker)
     if optimise_button:
-        stock = StockData(stock_ticker)
+        stock = stock_registry.getStockData(stock_ticker)
         if stock.getError():
             st.error(stock.getError())
         else:
-            with st.spinner("Optimising Parameters..."):
-                optimiser = WalkForwardOptimisation(strategy_str, stock)
-                all_portfolios, performance_parameter_map = optimiser.run(0.7, 0.3)
-                best_performance = max(list(performance_parameter_map.keys()))
-                best_params = performance_parameter_map[best_performance]
-                st.success(f"Optimisation Complete! Best {strategy_str} Parameters for {stock_ticker}: {best_params} with return: {round(best_performance, 3) * 100}%", icon="🚀")
-
-            # Save optimised parameters to session state
-            st.session_state[f"{strategy_str}_params"] = best_params
+            # Clicking Stop reruns the page, which interrupts the optimisation. The windows finished so far are kept
+            # in session state, so the rerun can still use the best parameters found
+            st.button("Stop")
+            optimisation = {"strategy": strategy_str, "ticker": stock_ticker, "search": search_name, "rows": [],
+                            "windows": None, "finished": False, "stop_reason": None, "evaluations": 0, "bars": 0, "applied": False}
+            st.session_state["optimisation"] = optimisation
+            progress = st.progress(0.0, text="Optimising Parameters...")
+            table = st.empty()
+
+            optimiser = WalkForwardOptimisation(strategy_str, stock, search=SEARCH_METHODS[search_name])
+            for result in optimiser.iterRun(0.7, 0.3, time_budget=time_budget or None):
+                optimisation["windows"] = result["windows"]
+                optimisation["evaluations"] = optimiser.getEvaluationCount()
+                optimisation["bars"] = optimiser.getEvaluatedBars()
+                optimisation["rows"].append({
+                    "Window": result["window"] + 1,
+                    "Best Parameters": result["best_params"],
+                    "In Sample Return": result["in_sample_performance"],
+                    "Out of Sample Return": result["out_sample_return"],
+                    "Out of Sample Trades": result["out_sample_trades"],
+                    "Elapsed (s)": round(result["elapsed_seconds"], 1),
+                })
+                progress.progress((result["window"] + 1) / result["windows"], text=f"Optimised window {result['window'] + 1} of {result['windows']}")
+                table.dataframe(pd.DataFrame(optimisation["rows"]).astype({"Best Parameters": str}), use_container_width=True)
+            optimisation["finished"] = True
+            optimisation["stop_reason"] = optimiser.stop_reason
+            progress.empty()
+            table.empty()
+
+    optimisation = st.session_state.get("optimisation")
+    if optimisation is not None and optimisation["strategy"] == strategy_str and optimisation["ticker"] == stock_ticker:
+        showOptimisationResults(optimisation)
 
     # Get default parameters from the strategy class or session state
     default_params = {
@@ -95,7 +150,7 @@ def app():
     save_button = st.button("Add Data", disabled=not (stock_ticker and strategy_str))
 
     if save_button:
-        stock = StockData(stock_ticker)
+        stock = stock_registry.getStockData(stock_ticker)
         if stock.getError():
             st.error(stock.getError())
         else:
@@ -0,0 +1,69 @@
+import streamlit as st
+import time
+from itertools import product
+from data.DatabaseHandler import DBHandler
+from strategy.factory import StrategyFactory
+from strategy.screener import Screener, loadCachedPanel, DEFAULT_PARAMETER_SETS
+
+def parseValues(text):
+    """
+    Parses a comma separated list of whole numbers, ignoring anything that is not one
+    """
+    return [int(value) for value in text.split(",") if value.strip().isdigit()]
+
+
+def createParameterSets(strategy_name, values):
+    """
+    Returns every combination of the values given for each parameter. The short window of the SMA and MACD strategies
+    must be shorter than the long window, as in the optimisation
+    """
+    names = list(values.keys())
+    parameter_sets = [dict(zip(names, combination)) for combination in product(*values.values())]
+    if strategy_name in ("SMA Crossover Strategy", "MACD Strategy"):
+        parameter_sets = [params for params in parameter_sets if params["short_window"] < params["long_window"]]
+    return parameter_sets
+
+
+def app():
+    """
+    The main function for the Screener page. This page shows which tickers give a buy or sell signal on their latest bar,
+    for the saved strategies or for every cached ticker with chosen parameter sets
+    """
+    st.markdown("<h1 style='text-align: center;'>Market Screener 🔎</h1>", unsafe_allow_html=True)
+    st.caption("Signals are calculated from the cached stock data, which the prewarm job keeps up to date.")
+
+    mode = st.radio("Screen", ["Saved Strategies", "All Cached Tickers"], horizontal=True)
+
+    parameter_sets = {}
+    if mode == "All Cached Tickers":
+        # Each parameter takes a list of values, and every combination of them is screened
+        for strategy_name in StrategyFactory().getStrategyNames():
+            with st.expander(strategy_name, expanded=False):
+                if not st.checkbox(f"Screen {strategy_name}", value=True, key=f"screen_{strategy_name}"):
+                    continue
+                defaults = DEFAULT_PARAMETER_SETS[strategy_name][0]
+                values = {name: parseValues(st.text_input(name.replace("_", " ").title(), value=str(value), key=f"screen_{strategy_name}_{name}"))
+                          for name, value in defaults.items()}
+                parameter_sets[strategy_name] = createParameterSets(strategy_name, values)
+                st.caption(f"{len(parameter_sets[strategy_name])} parameter sets")
+
+    only_signals = st.checkbox("Only show buy and sell signals", value=True)
+
+    if st.button("Run Screener"):
+        start = time.perf_counter()
+        with st.spinner("Screening..."):
+            panel = loadCachedPanel()
+            screener = Screener(panel)
+            if mode == "Saved Strategies":
+                table = screener.screenStockStrategies(DBHandler().getAllStockStrategies() or {})
+            else:
+                table = screener.screen(parameter_sets)
+        st.caption(f"Screened {len(table)} ticker and strategy pairs over {len(panel.getTickers())} cached tickers "
+                   f"in {time.perf_counter() - start:.2f}s")
+
+        if only_signals:
+            table = table[table["Signal"] != "Hold"]
+        if table.empty:
+            st.info("No signals on the latest bar.")
+        else:
+            st.dataframe(table, use_container_width=True, hide_index=True)
@@ -1,9 +1,9 @@
 import streamlit as st
 from data.DatabaseHandler import DBHandler
 from strategy.strategies import *
-from strategy.factory import StrategyFactory
-from data.Data import StockData
+from data.Registry import stock_registry
 from backtest.Backtest import Backtester 
+from diagnostics.profiler import profiler
 
 def app(stock_strategy_id):
     """
@@ -12,20 +12,27 @@ def app(stock_strategy_id):
     database_client = DBHandler()
 
     ticker, strategy_name, params = database_client.getStockStrategy(stock_strategy_id)
-    # create a stock object
-    stock = StockData(ticker)
-    last_updated = stock.getFetchTime()
+    # get the stock and strategy, reusing the ones built by earlier reruns where possible
+    stock, strategy = stock_registry.getStrategy(ticker, strategy_name, params)
     # Check if there is an error in the stock data
     error = stock.getError()
     if error:
         st.error(error, icon="🚨")
     else:
-        
-        factory = StrategyFactory()
-        strategy = factory.createStrategy(strategy_name, stock, **params)
+        last_updated = stock.getFetchTime()
         st.write(f"last updated: {last_updated}")
         delete_button = st.button("Delete Strategy", key="delete")
 
+        # Signals precomputed by jobs.precompute, shown when they were computed from the current stock data
+        snapshot = database_client.getStrategySnapshot(stock_strategy_id)
+        if snapshot and snapshot["data_fingerprint"] == stock.getFingerprint():
+            signal_names = {1: "Buy", -1: "Sell", 0: "Hold", None: "None"}
+            signal_column, last_signal_column, return_column = st.columns(3)
+            signal_column.metric(f"Signal on {snapshot['last_bar_date']}", signal_names[snapshot["current_signal"]])
+            last_signal_column.metric(f"Last Signal ({snapshot['last_signal_date']})", signal_names[snapshot["last_signal"]])
+            return_column.metric("Backtest Return", f"{round(snapshot['total_return'] * 100, 2)}%")
+            st.dataframe(snapshot["indicators"], use_container_width=True)
+
         st.subheader("Plot for {} with {}".format(ticker, strategy_name))
 
         # slider for the user to adjust the plot window
@@ -48,9 +55,20 @@ def app(stock_strategy_id):
         backtest_button = st.button("Run Backtest")
 
         if backtest_button:
-            backtester = Backtester(strategy)
-            with st.spinner("Running backtest..."):
-                portfolio = backtester.run(initial_cash, fees)
-                backtest_results = portfolio.stats()
+            # Backtests are cached per version of the stock data, so drop results from before the data was refreshed
+            data_fingerprint = stock.getFingerprint()
+            database_client.removeStaleBacktestResults(stock_strategy_id, data_fingerprint)
+            cached_result = database_client.getBacktestResult(stock_strategy_id, data_fingerprint, initial_cash, fees)
+            profiler.count("backtest_cache.hits" if cached_result else "backtest_cache.misses")
+            if cached_result:
+                backtest_results, equity = cached_result
+            else:
+                backtester = Backtester(strategy)
+                with st.spinner("Running backtest..."):
+                    portfolio = backtester.run(initial_cash, fees)
+                    backtest_results = portfolio.stats()
+                    equity = portfolio.value()
+                database_client.insertBacktestResult(stock_strategy_id, data_fingerprint, initial_cash, fees, backtest_results, equity)
     
             st.dataframe(backtest_results, use_container_width=True)
+            st.line_chart(equity, use_container_width=True)
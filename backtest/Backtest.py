@@ -1,6 +1,9 @@
 import vectorbt as vbt
 import numpy as np
+import pandas as pd
 from strategy.strategies import *
+from backtest.simulator import simulateMetrics
+from diagnostics.profiler import profiler
 
 class Backtester():
     def __init__(self, strategy):
@@ -8,6 +11,7 @@ class Backtester():
         
         self.data = self.strategy.getData()
         self.entries, self.exits = self.generateEntryExit()
+        self.signal_arrays = None
 
     
     def generateEntryExit(self):
@@ -15,44 +19,104 @@ class Backtester():
         Generate the entry and exit signals for the strategy
         """
         
-        signals = self.strategy.generateSignalSeries()
+        with profiler.span("backtest.signals", strategy=self.strategy.getName()):
+            signals = self.strategy.generateSignalSeries()
 
         entry = signals == 1
         exit = signals == -1
 
         return entry, exit
     
+    def getWindow(self, start_data=None, end_data=None):
+        """
+        Converts the start and end bar positions into a (start_date, end_date) label window for .loc slicing.
+        A bound that is not given leaves that side of the window open
+        """
+        start_date = self.data.index[start_data] if start_data else None
+        end_date = self.data.index[end_data] if end_data else None
+        return start_date, end_date
+
     def run(self, initial_cash, percentage_commission, start_data=None, end_data=None):
         """
         Run the backtest using the strategy
         """
-        if start_data:
-            start_date = self.data.index[start_data]
-        if end_data:
-            end_date = self.data.index[end_data]
-        if start_data and end_data:
-            data = self.data.loc[start_date:end_date]
-            entries = self.entries.loc[start_date:end_date]
-            exits = self.exits.loc[start_date:end_date]
-        elif start_data:
-            data = self.data.loc[start_date:]
-            entries = self.entries.loc[start_date:]
-            exits = self.exits.loc[start_date:] 
-        elif end_data:
-            data = self.data.loc[:end_date]
-            entries = self.entries.loc[:end_date]
-            exits = self.exits.loc[:end_date]
-        else:
-            data = self.data
-            entries = self.entries
-            exits = self.exits
+        start_date, end_date = self.getWindow(start_data, end_data)
+        data = self.data.loc[start_date:end_date]
+        entries = self.entries.loc[start_date:end_date]
+        exits = self.exits.loc[start_date:end_date]
         
         commission = percentage_commission / 100
-        portfolio = vbt.Portfolio.from_signals(data['Close'], entries, exits, init_cash=initial_cash, fees=commission)
+        with profiler.span("backtest.simulate", bars=len(data), columns=entries.shape[1] if entries.ndim > 1 else 1):
+            portfolio = vbt.Portfolio.from_signals(data['Close'], entries, exits, init_cash=initial_cash, fees=commission)
+        profiler.count("backtest.runs")
         return portfolio
-    
+
+    def getWindowPositions(self, start_data=None, end_data=None):
+        """
+        Converts the start and end bar positions into a [start, stop) slice covering the same bars as getWindow
+        """
+        start = start_data if start_data else 0
+        stop = end_data + 1 if end_data else len(self.data)
+        return start, stop
+
+    def getSignalArrays(self):
+        """
+        Returns the close prices and the entry and exit signals as NumPy arrays, converting them only the first time
+        """
+        if self.signal_arrays is None:
+            self.signal_arrays = (self.data['Close'].to_numpy(dtype=np.float64), self.entries.to_numpy(dtype=bool), self.exits.to_numpy(dtype=bool))
+        return self.signal_arrays
+
+    def runMetrics(self, initial_cash, percentage_commission, start_data=None, end_data=None, metrics=("total_return",)):
+        """
+        Run the backtest with the compiled simulator instead of building a vectorbt portfolio, returning a dictionary of the
+        requested metrics (see backtest.simulator). Each metric is a float for one strategy, or an array with a value per
+        strategy for a batch. The results agree with the vectorbt portfolio to within floating point rounding
+        """
+        start, stop = self.getWindowPositions(start_data, end_data)
+        close, entries, exits = self.getSignalArrays()
+        with profiler.span("backtest.simulate_metrics", bars=stop - start, columns=entries.shape[1] if entries.ndim > 1 else 1):
+            results = simulateMetrics(close[start:stop], entries[start:stop], exits[start:stop], initial_cash, percentage_commission, metrics)
+        profiler.count("backtest.runs")
+        if entries.ndim == 1:
+            return {metric: float(values[0]) for metric, values in results.items()}
+        return results
 
 
+class BatchBacktester(Backtester):
+    """
+    Backtests several strategies over the same stock in one vectorbt simulation.
+    The entry and exit signals of each strategy are stacked as the columns of a matrix,
+    so the returned portfolio has one column per strategy, in the order the strategies were given.
+    Only the signals are kept, so strategies can be passed as a generator and released one at a time
+    """
+    def __init__(self, strategies=None, data=None, signals=None):
+        """
+        Either pass the strategies, or the data they share and a (bars x strategies) matrix of their signals
+        """
+        self.data = data
+        if strategies is not None:
+            signals = self.generateSignalMatrix(strategies)
+        self.entries, self.exits = self.generateEntryExit(signals)
+        self.signal_arrays = None
 
+    def generateSignalMatrix(self, strategies):
+        """
+        Stacks the signals of the strategies into a matrix with one column per strategy
+        """
+        signal_columns = []
+        with profiler.span("backtest.signals"):
+            for strategy in strategies:
+                if self.data is None:
+                    self.data = strategy.getData()
+                signal_columns.append(strategy.generateSignalArray())
+        return np.column_stack(signal_columns)
 
+    def generateEntryExit(self, signals):
+        """
+        Generate the entry and exit signal matrices, with one column per strategy
+        """
+        entry = pd.DataFrame(signals == 1, index=self.data.index)
+        exit = pd.DataFrame(signals == -1, index=self.data.index)
 
+        return entry, exit
@@ -1,37 +1,194 @@
 from strategy.strategies import *
 from strategy.factory import StrategyFactory
-from backtest.Backtest import Backtester
+from backtest.Backtest import Backtester, BatchBacktester
+from backtest.search import GridSearch
+from backtest.scoring import IncrementalScorer
+from backtest.results import WalkForwardResults
+from diagnostics.profiler import profiler
 import numpy as np
+import time
 from itertools import product
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+# Optimiser owned by each worker process of a parallel run, created once by _initialiseWorker
+_worker_optimiser = None
+
+def _initialiseWorker(strategy_str, stock, batch, search, incremental, metric_only):
+    """
+    Creates the worker's optimiser. The stock is passed once per worker rather than once per task,
+    and with the fork start method it is inherited from the parent without being pickled at all
+    """
+    global _worker_optimiser
+    _worker_optimiser = WalkForwardOptimisation(strategy_str, stock, batch=batch, search=search, incremental=incremental,
+                                                metric_only=metric_only)
+
+def _optimiseTask(task):
+    """
+    Optimises one window, or one chunk of the parameter grid over one window, inside a worker process.
+    Returns the best parameters and performance along with the number of backtests run and the bars they covered
+    """
+    in_sample_start, in_sample_end, parameter_range = task
+    evaluations_before = _worker_optimiser.getEvaluationCount()
+    bars_before = _worker_optimiser.getEvaluatedBars()
+    best_params, best_performance = _worker_optimiser.optimiseParametersInSample(in_sample_start, in_sample_end, parameter_range=parameter_range)
+    return (best_params, best_performance, _worker_optimiser.getEvaluationCount() - evaluations_before,
+            _worker_optimiser.getEvaluatedBars() - bars_before)
+
 
 class WalkForwardOptimisation:
-    def __init__(self, strategy_str,stock):
+    def __init__(self, strategy_str,stock, batch=True, max_workers=None, parameter_chunks=1, search=None, incremental=True,
+                 metric_only=False):
+        """
+        When incremental is True each combination is simulated once over the whole history and every window is scored
+        from prefix sums of that simulation (see IncrementalScorer).
+        Otherwise, when batch is True the parameter combinations are backtested together in a single vectorbt simulation per window,
+        and when it is False each combination is backtested separately.
+        When metric_only is True those backtests run on the compiled simulator of Backtester.runMetrics,
+        which only calculates the total return, instead of building vectorbt portfolios.
+        When max_workers is greater than 1 the in-sample windows are optimised in parallel on a process pool,
+        with the parameter grid optionally split into parameter_chunks pieces per window for a grid search.
+        search is the ParameterSearch used in each in-sample window, an exhaustive GridSearch by default
+        """
         self.strategy_str = strategy_str
         self.parameter_grid = self.createParameterGrid()
         self.initial_cash = 10000
         self.percentage_commission = 2
         self.strategy_factory = StrategyFactory()
         self.stock = stock
+        self.batch = batch
+        self.incremental = incremental
+        self.metric_only = metric_only
+        self.max_workers = max_workers
+        self.parameter_chunks = max(1, parameter_chunks)
+        self.search = search if search is not None else GridSearch()
+        # Signals of every combination built so far, keyed by parameters, and the data they are aligned with
+        self.signal_cache = {}
+        self.signal_data = None
+        # Incremental scorers built so far, and the (scorer, column) holding each combination, keyed by parameters
+        self.scorers = []
+        self.scorer_columns = {}
+        self.evaluation_count = 0
+        self.evaluated_bars = 0
+        # Why the last iterRun stopped before its final window: "cancelled", "time_budget", "evaluation_budget", or None if it finished
+        self.stop_reason = None
 
 
-    def optimiseParametersInSample(self, in_sample_start=None, in_sample_end=None):
+    def optimiseParametersInSample(self, in_sample_start=None, in_sample_end=None, parameter_range=None):
         """
-        Find the optimal parameters for the strategy in the range specified
+        Find the optimal parameters for the strategy in the range specified.
+        parameter_range is an optional (start, end) slice of the parameter grid to search exhaustively,
+        otherwise the optimiser's search is used
         """
-        best_performance = -np.inf
-        best_params = None
+        if parameter_range is None:
+            return self.search.search(self, in_sample_start, in_sample_end)
+
+        parameter_grid = self.parameter_grid[parameter_range[0]:parameter_range[1]]
+        performances = self.evaluateParameters(parameter_grid, in_sample_start, in_sample_end)
+        return self.selectBestParameters(performances, parameter_grid)
 
-        for params in self.parameter_grid:
+    def evaluateParameters(self, parameter_list, start_data=None, end_data=None):
+        """
+        Backtests every combination in parameter_list over the window and returns their total returns as an array in the same order
+        """
+        self.evaluation_count += len(parameter_list)
+        profiler.count("optimise.evaluations", len(parameter_list))
+        if end_data is not None:
+            self.evaluated_bars += len(parameter_list) * (end_data - (start_data or 0) + 1)
+        if self.incremental:
+            return self.evaluateParametersIncremental(parameter_list, start_data, end_data)
+        if self.batch:
+            return self.evaluateParametersBatch(parameter_list, start_data, end_data)
+
+        performances = []
+        for params in parameter_list:
             # create the strategy with the parameters
             strategy = self.strategy_factory.createStrategy(self.strategy_str, self.stock, **params)
             bt = Backtester(strategy)
-            portfolio = bt.run(self.initial_cash, self.percentage_commission, start_data=in_sample_start, end_data=in_sample_end)
-            performance = portfolio.total_return()
+            if self.metric_only:
+                performances.append(bt.runMetrics(self.initial_cash, self.percentage_commission, start_data=start_data, end_data=end_data)["total_return"])
+                continue
+            portfolio = bt.run(self.initial_cash, self.percentage_commission, start_data=start_data, end_data=end_data)
+            performances.append(portfolio.total_return())
+        return np.array(performances, dtype=float)
+
+    def evaluateParametersBatch(self, parameter_list, start_data=None, end_data=None):
+        """
+        Backtests the combinations together in one vectorbt simulation.
+        The signals of each combination are generated once and reused for every window
+        """
+        with profiler.span("optimise.signals", combinations=len(parameter_list)):
+            signals = np.column_stack([self.getSignals(params) for params in parameter_list])
+        backtester = BatchBacktester(data=self.signal_data, signals=signals)
+        if self.metric_only:
+            return backtester.runMetrics(self.initial_cash, self.percentage_commission, start_data=start_data, end_data=end_data)["total_return"]
+        portfolio = backtester.run(self.initial_cash, self.percentage_commission, start_data=start_data, end_data=end_data)
+        return np.asarray(portfolio.total_return(), dtype=float)
+
+    def evaluateParametersIncremental(self, parameter_list, start_data=None, end_data=None):
+        """
+        Scores the combinations over the window from their full history simulations, which are built the first time
+        a combination is seen and shared by every overlapping window after that
+        """
+        keys = [tuple(sorted(params.items())) for params in parameter_list]
+        new_params = {key: params for key, params in zip(keys, parameter_list) if key not in self.scorer_columns}
+        if new_params:
+            with profiler.span("optimise.signals", combinations=len(new_params)):
+                signals = np.column_stack([self.getSignals(params) for params in new_params.values()])
+            with profiler.span("optimise.scorer", combinations=len(new_params)):
+                self.scorers.append(IncrementalScorer(self.signal_data['Close'].to_numpy(), signals, self.percentage_commission))
+            for column, key in enumerate(new_params):
+                self.scorer_columns[key] = (len(self.scorers) - 1, column)
+
+        # Score the combinations held by each scorer together
+        positions_by_scorer = {}
+        for position, key in enumerate(keys):
+            scorer_index, column = self.scorer_columns[key]
+            positions_by_scorer.setdefault(scorer_index, ([], []))
+            positions_by_scorer[scorer_index][0].append(position)
+            positions_by_scorer[scorer_index][1].append(column)
 
-            if performance > best_performance:
-                best_performance = performance
-                best_params = params
-        return best_params, best_performance
+        performances = np.empty(len(parameter_list))
+        for scorer_index, (positions, columns) in positions_by_scorer.items():
+            performances[positions] = self.scorers[scorer_index].totalReturn(start_data, end_data, columns)
+        return performances
+
+    def getSignals(self, params):
+        """
+        Returns the signal array of the strategy with the given parameters, building the strategy only the first time
+        """
+        key = tuple(sorted(params.items()))
+        if key not in self.signal_cache:
+            strategy = self.strategy_factory.createStrategy(self.strategy_str, self.stock, **params)
+            if self.signal_data is None:
+                self.signal_data = strategy.getData()
+            self.signal_cache[key] = strategy.generateSignalArray().astype(np.int8)
+        return self.signal_cache[key]
+
+    def getEvaluationCount(self):
+        """
+        Returns the number of (parameter combination, window) backtests run so far
+        """
+        return self.evaluation_count
+
+    def getEvaluatedBars(self):
+        """
+        Returns the total number of bars covered by the windowed backtests run so far, a measure of their cost
+        when searches backtest over windows of different lengths
+        """
+        return self.evaluated_bars
+
+    def selectBestParameters(self, performances, parameter_grid=None):
+        """
+        Picks the best parameters from an array of performances in grid order.
+        Ties go to the earliest combination and NaN performances are never chosen, as in a loop keeping the first strictly better result
+        """
+        parameter_grid = self.parameter_grid if parameter_grid is None else parameter_grid
+        performances = np.where(np.isnan(performances), -np.inf, performances)
+        best_index = int(np.argmax(performances))
+        if performances[best_index] == -np.inf:
+            return None, -np.inf
+        return parameter_grid[best_index], performances[best_index]
     
     def ApplyParametersOutOfSample(self, best_params, out_sample_start=None, out_sample_end=None):
         """
@@ -42,28 +199,35 @@ class WalkForwardOptimisation:
         portfolio = bt.run(self.initial_cash, self.percentage_commission, start_data=out_sample_start, end_data=out_sample_end)
         return portfolio
     
-    def createParameterGrid(self):
+    def getParameterSpace(self):
+        """
+        Returns (names, axes): the strategy's parameter names and the values each parameter is searched over
+        """
         if self.strategy_str == "SMA Crossover Strategy":
-            short_window = np.arange(1, 50, 5)
-            long_window = np.arange(1, 200, 5)
-            return [{"short_window": short, "long_window": long} for short, long in product(short_window, long_window) if short < long]
+            return ["short_window", "long_window"], [np.arange(1, 50, 5), np.arange(1, 200, 5)]
         elif self.strategy_str == "MACD Strategy":
-            ema_short_window = np.arange(1, 50, 5)
-            ema_long_window = np.arange(1, 200, 5)
-            signal_window = np.arange(1, 50, 5)
-            return [{"short_window": short, "long_window": long, "signal_window": signal} for short, long, signal in product(ema_short_window, ema_long_window, signal_window) if short < long]
+            return ["short_window", "long_window", "signal_window"], [np.arange(1, 50, 5), np.arange(1, 200, 5), np.arange(1, 50, 5)]
         elif self.strategy_str == "Bollinger Band Strategy":
-            window = np.arange(1, 50, 1)
-            standard_deviations = np.arange(1, 5, 1)
-            return [{"window": window, "standard_deviations": std} for window, std in product(window, standard_deviations)]
+            return ["window", "standard_deviations"], [np.arange(1, 50, 1), np.arange(1, 5, 1)]
 
-    def run(self, in_sample_percentage, out_sample_percentage):
+    def isValidParameters(self, params):
         """
-        Perform walk forward optimisation
+        The short window of the SMA and MACD strategies must be shorter than the long window
         """
+        if self.strategy_str in ("SMA Crossover Strategy", "MACD Strategy"):
+            return params["short_window"] < params["long_window"]
+        return True
 
-        all_portfolios = []
-        performance_parameter_map = {}
+    def createParameterGrid(self):
+        names, axes = self.getParameterSpace()
+        grid = [dict(zip(names, values)) for values in product(*axes)]
+        return [params for params in grid if self.isValidParameters(params)]
+
+    def createWindows(self, in_sample_percentage, out_sample_percentage):
+        """
+        Returns the (in_sample_start, in_sample_end, out_sample_start, out_sample_end) bar positions of every walk forward window
+        """
+        windows = []
 
         total_data_size = self.strategy_factory.createStrategy(self.strategy_str, self.stock, **self.parameter_grid[0]).getDataSize()
         half_window = int(total_data_size / 2)
@@ -78,14 +242,156 @@ class WalkForwardOptimisation:
             in_sample_start = i
             in_sample_end = i + in_sample_window
             out_sample_start = in_sample_end
-            out_sample_end = min(out_sample_start + out_sample_window, total_data_size)  
-            best_params, best_performance = self.optimiseParametersInSample(in_sample_start, in_sample_end)
-            performance_parameter_map[best_performance] = best_params
-
-            portfolio = self.ApplyParametersOutOfSample(best_params, out_sample_start, out_sample_end)
-            all_portfolios.append(portfolio)
+            # Bar positions run from 0 to total_data_size - 1, and the end of a window is inclusive
+            out_sample_end = min(out_sample_start + out_sample_window, total_data_size - 1)
+            windows.append((in_sample_start, in_sample_end, out_sample_start, out_sample_end))
 
             i += step_size
+        return windows
+
+    def optimiseWindowsInParallel(self, windows):
+        """
+        Optimises the in-sample part of every window on a process pool and returns (best_params, best_performance) per window, in window order.
+        When the grid is split into chunks, the chunk results are combined in grid order so ties resolve exactly as in a serial run
+        """
+        return list(self.iterWindowsInParallel(windows))
+
+    def iterWindowsInParallel(self, windows):
+        """
+        Generator form of optimiseWindowsInParallel, yielding each window's (best_params, best_performance) once it and every
+        earlier window are done. Closing the generator cancels the windows not yet started
+        """
+        if isinstance(self.search, GridSearch) and self.parameter_chunks > 1:
+            chunk_bounds = np.linspace(0, len(self.parameter_grid), self.parameter_chunks + 1).astype(int)
+            chunks = [(start, end) for start, end in zip(chunk_bounds[:-1], chunk_bounds[1:]) if start < end]
+        else:
+            # Other searches decide which combinations to backtest as they go, so each window is a single task
+            chunks = [None]
+        tasks = [(window[0], window[1], chunk) for window in windows for chunk in chunks]
+
+        # Fork shares the parent's copy of the stock data with the workers instead of pickling it
+        context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+        executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context, initializer=_initialiseWorker,
+                                       initargs=(self.strategy_str, self.stock, self.batch, self.search, self.incremental,
+                                                 self.metric_only))
+        try:
+            chunk_results = executor.map(_optimiseTask, tasks)
+            for _ in windows:
+                best_params, best_performance = None, -np.inf
+                for _ in chunks:
+                    params, performance, evaluations, bars = next(chunk_results)
+                    self.evaluation_count += evaluations
+                    self.evaluated_bars += bars
+                    if performance > best_performance:
+                        best_params, best_performance = params, performance
+                yield best_params, best_performance
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def run(self, in_sample_percentage, out_sample_percentage, compact=False, spill_dir=None):
+        """
+        Perform walk forward optimisation.
+        Returns the out-of-sample portfolio of every window and a map from each window's index to its
+        (in-sample performance, best parameters).
+        When compact is True a WalkForwardResults is returned instead, holding each window's summary and equity curve
+        rather than its portfolio, so memory stays bounded however many windows there are. Portfolios are then saved to
+        spill_dir, if given, and can be loaded one at a time from the results
+        """
+        if compact:
+            return self.runCompact(in_sample_percentage, out_sample_percentage, spill_dir=spill_dir)
+
+        all_portfolios = []
+        performance_parameter_map = {}
+
+        with profiler.span("optimise.run", strategy=self.strategy_str, ticker=self.stock.getTicker()):
+            for result in self.iterRun(in_sample_percentage, out_sample_percentage, keep_portfolios=True):
+                # Keyed by window, as windows with the same in-sample performance would overwrite each other
+                performance_parameter_map[result["window"]] = (result["in_sample_performance"], result["best_params"])
+                all_portfolios.append(result["portfolio"])
+
         return all_portfolios, performance_parameter_map
+
+    def runCompact(self, in_sample_percentage, out_sample_percentage, spill_dir=None, **kwargs):
+        """
+        Perform walk forward optimisation keeping only a WalkForwardResults. Each out-of-sample portfolio is released as soon as
+        its summary and equity curve are recorded. The keyword arguments, such as cancel_event or time_budget, are passed to iterRun
+        """
+        names, axes = self.getParameterSpace()
+        results = WalkForwardResults(self.createWindows(in_sample_percentage, out_sample_percentage), names,
+                                     [axis.dtype for axis in axes], spill_dir=spill_dir)
+
+        with profiler.span("optimise.run", strategy=self.strategy_str, ticker=self.stock.getTicker()):
+            for result in self.iterRun(in_sample_percentage, out_sample_percentage, keep_portfolios=True, **kwargs):
+                results.add(result, result.pop("portfolio"))
+        results.stop_reason = self.stop_reason
+        return results
+
+    def iterRun(self, in_sample_percentage, out_sample_percentage, keep_portfolios=False, cancel_event=None,
+                time_budget=None, evaluation_budget=None):
+        """
+        Generator form of run, yielding a dictionary for each walk forward window as soon as it has been optimised, with the window's
+        bar positions, best parameters and in-sample performance, and the out-of-sample return, maximum drawdown and number of trades.
+        The out-of-sample portfolio is included under "portfolio" only when keep_portfolios is True.
+        Before each window the run stops if cancel_event (anything with an is_set method, such as a threading.Event) is set,
+        time_budget seconds have passed or evaluation_budget backtests have been run. stop_reason records why it stopped
+        """
+        self.stop_reason = None
+        start_time = time.perf_counter()
+        windows = self.createWindows(in_sample_percentage, out_sample_percentage)
+
+        if self.max_workers and self.max_workers > 1:
+            in_sample_results = self.iterWindowsInParallel(windows)
+        else:
+            in_sample_results = (self.optimiseInSampleWindow(window) for window in windows)
+
+        try:
+            for window_index, window in enumerate(windows):
+                self.stop_reason = self.getStopReason(start_time, cancel_event, time_budget, evaluation_budget)
+                if self.stop_reason is not None:
+                    return
+
+                best_params, best_performance = next(in_sample_results)
+                result = {
+                    "window": window_index,
+                    "windows": len(windows),
+                    "in_sample_start": window[0],
+                    "in_sample_end": window[1],
+                    "out_sample_start": window[2],
+                    "out_sample_end": window[3],
+                    "best_params": best_params,
+                    "in_sample_performance": best_performance,
+                    "out_sample_return": None,
+                    "out_sample_max_drawdown": None,
+                    "out_sample_trades": None,
+                    "evaluations": self.evaluation_count,
+                    "elapsed_seconds": None,
+                }
+                portfolio = None
+                # No parameters are chosen when every combination's performance was undefined
+                if best_params is not None:
+                    with profiler.span("optimise.out_of_sample", start=window[2], end=window[3]):
+                        portfolio = self.ApplyParametersOutOfSample(best_params, window[2], window[3])
+                    result["out_sample_return"] = float(portfolio.total_return())
+                    result["out_sample_max_drawdown"] = float(portfolio.max_drawdown())
+                    result["out_sample_trades"] = int(portfolio.trades.count())
+                if keep_portfolios:
+                    result["portfolio"] = portfolio
+                result["elapsed_seconds"] = time.perf_counter() - start_time
+                yield result
+        finally:
+            in_sample_results.close()
+
+    def getStopReason(self, start_time, cancel_event=None, time_budget=None, evaluation_budget=None):
+        if cancel_event is not None and cancel_event.is_set():
+            return "cancelled"
+        if time_budget is not None and time.perf_counter() - start_time >= time_budget:
+            return "time_budget"
+        if evaluation_budget is not None and self.evaluation_count >= evaluation_budget:
+            return "evaluation_budget"
+        return None
+
+    def optimiseInSampleWindow(self, window):
+        with profiler.span("optimise.in_sample", start=window[0], end=window[1], search=self.search.getName()):
+            return self.optimiseParametersInSample(window[0], window[1])
     
 
@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+import vectorbt as vbt
+import os
+
+class WalkForwardResults:
+    """
+    Compact results of a walk forward run. The summary of every window is kept in a structured array and the
+    out-of-sample equity curves in one float array, both allocated once when the windows are known,
+    so the memory used does not grow with the portfolios of the run.
+    The best parameters of each window are stored as fields of the summary, param_<name> for each strategy parameter.
+    When spill_dir is given each out-of-sample portfolio is also saved there and loaded again only when asked for
+    """
+    def __init__(self, windows, parameter_names, parameter_dtypes, spill_dir=None):
+        """
+        windows are the (in_sample_start, in_sample_end, out_sample_start, out_sample_end) bar positions of the run
+        """
+        self.parameter_names = list(parameter_names)
+        self.summary = np.zeros(len(windows), dtype=self.createSummaryDtype(parameter_names, parameter_dtypes))
+        self.summary["window"] = np.arange(len(windows))
+        for field, values in zip(["in_sample_start", "in_sample_end", "out_sample_start", "out_sample_end"], zip(*windows)):
+            self.summary[field] = values
+        self.summary["in_sample_performance"] = -np.inf
+        for field in ["out_sample_return", "out_sample_max_drawdown", "elapsed_seconds"]:
+            self.summary[field] = np.nan
+        self.summary["out_sample_trades"] = -1
+
+        # Equity curve of window i is equity[equity_offsets[i]:equity_offsets[i + 1]]
+        lengths = [self.getWindowLength(window[2], window[3]) for window in windows]
+        self.equity_offsets = np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)])
+        self.equity = np.full(self.equity_offsets[-1], np.nan)
+
+        self.spill_dir = spill_dir
+        if spill_dir is not None:
+            os.makedirs(spill_dir, exist_ok=True)
+        self.count = 0
+        self.stop_reason = None
+
+    @staticmethod
+    def createSummaryDtype(parameter_names, parameter_dtypes):
+        return np.dtype([
+            ("window", np.int32),
+            ("in_sample_start", np.int64),
+            ("in_sample_end", np.int64),
+            ("out_sample_start", np.int64),
+            ("out_sample_end", np.int64),
+            ("has_params", np.bool_),
+            ("in_sample_performance", np.float64),
+            ("out_sample_return", np.float64),
+            ("out_sample_max_drawdown", np.float64),
+            ("out_sample_trades", np.int64),
+            ("elapsed_seconds", np.float64),
+        ] + [(f"param_{name}", dtype) for name, dtype in zip(parameter_names, parameter_dtypes)])
+
+    @staticmethod
+    def getWindowLength(start_data, end_data):
+        """
+        Number of bars Backtester.run covers between the positions, where a start of 0 leaves the window open on that side
+        """
+        return end_data - (start_data or 0) + 1
+
+    def add(self, result, portfolio=None):
+        """
+        Records a window yielded by WalkForwardOptimisation.iterRun along with its out-of-sample portfolio, which is not kept
+        """
+        row = self.summary[result["window"]]
+        row["in_sample_performance"] = result["in_sample_performance"]
+        row["elapsed_seconds"] = result["elapsed_seconds"]
+        if result["best_params"] is not None:
+            row["has_params"] = True
+            for name in self.parameter_names:
+                row[f"param_{name}"] = result["best_params"][name]
+            row["out_sample_return"] = result["out_sample_return"]
+            row["out_sample_max_drawdown"] = result["out_sample_max_drawdown"]
+            row["out_sample_trades"] = result["out_sample_trades"]
+
+        if portfolio is not None:
+            start, end = self.equity_offsets[result["window"]], self.equity_offsets[result["window"] + 1]
+            self.equity[start:end] = portfolio.value().to_numpy()
+            if self.spill_dir is not None:
+                portfolio.save(self.getSpillPath(result["window"]))
+        self.count = max(self.count, result["window"] + 1)
+
+    def getSpillPath(self, window):
+        return os.path.join(self.spill_dir, f"window_{window}.pkl")
+
+    def __len__(self):
+        """
+        Number of windows recorded, which is fewer than the windows of the run when it stopped early
+        """
+        return self.count
+
+    def getSummary(self):
+        """
+        Returns the summary of the recorded windows as a DataFrame with one row per window
+        """
+        return pd.DataFrame(self.summary[:self.count])
+
+    def getParameters(self, window):
+        """
+        Returns the best parameters of the window, or None if no parameters were chosen
+        """
+        row = self.summary[window]
+        if not row["has_params"]:
+            return None
+        return {name: row[f"param_{name}"].item() for name in self.parameter_names}
+
+    def getBestWindow(self):
+        """
+        Returns the recorded window with the highest in-sample performance, the earliest on ties, or None if no window has parameters
+        """
+        performances = np.where(self.summary["has_params"][:self.count], self.summary["in_sample_performance"][:self.count], -np.inf)
+        if not len(performances) or performances.max() == -np.inf:
+            return None
+        return int(np.argmax(performances))
+
+    def getBestParameters(self):
+        """
+        Returns (best_params, in_sample_performance) of the best window, or (None, -inf) if no window has parameters
+        """
+        best_window = self.getBestWindow()
+        if best_window is None:
+            return None, -np.inf
+        return self.getParameters(best_window), float(self.summary["in_sample_performance"][best_window])
+
+    def getEquityCurve(self, window):
+        """
+        Returns the out-of-sample portfolio value of the window on each bar
+        """
+        return self.equity[self.equity_offsets[window]:self.equity_offsets[window + 1]]
+
+    def getPortfolio(self, window):
+        """
+        Loads the out-of-sample portfolio of the window from spill_dir, or returns None if it was not spilled
+        """
+        if self.spill_dir is None or not os.path.exists(self.getSpillPath(window)):
+            return None
+        return vbt.Portfolio.load(self.getSpillPath(window))
+
+    def getMemoryUsage(self):
+        """
+        Returns the bytes held by the summary and equity arrays
+        """
+        return self.summary.nbytes + self.equity.nbytes + self.equity_offsets.nbytes
@@ -0,0 +1,67 @@
+import numpy as np
+
+class IncrementalScorer:
+    """
+    Scores many signal columns over any window of the same price history without re-simulating the window.
+
+    The long-only strategy of every column is simulated once over the whole history, as in Backtester: buy with all cash on an
+    entry signal when flat, sell everything on an exit signal when invested, paying the commission on both trades.
+    The log growth of the portfolio on each bar is stored as a prefix sum, so the growth over any run of bars is a
+    difference of two prefix values.
+
+    A window backtest starts flat, so its trades can differ from the full-history trades only until its first entry signal.
+    From that bar on the window holds the same position as the full history, so its total return is the entry commission
+    plus the full-history growth after the entry bar, which makes each window O(1) per column.
+    """
+    def __init__(self, close, signals, percentage_commission):
+        """
+        close is the closing price of every bar and signals a (bars x columns) matrix of 1 (buy), -1 (sell) and 0 (hold)
+        """
+        close = np.asarray(close, dtype=np.float64)
+        signals = np.asarray(signals)
+        if signals.ndim == 1:
+            signals = signals[:, None]
+        bars, columns = signals.shape
+        commission = percentage_commission / 100
+        self.entry_log_growth = np.log(1 / (1 + commission))
+        exit_log_growth = np.log(1 - commission)
+
+        # Position held after each bar over the full history: the direction of the most recent signal, or flat before any
+        bar_index = np.arange(bars)[:, None]
+        last_signal_bar = np.maximum.accumulate(np.where(signals != 0, bar_index, -1), axis=0)
+        last_signal = np.take_along_axis(signals, np.maximum(last_signal_bar, 0), axis=0)
+        position = ((last_signal_bar >= 0) & (last_signal == 1)).astype(np.float64)
+        previous_position = np.vstack([np.zeros((1, columns)), position[:-1]])
+
+        price_log_growth = np.zeros(bars)
+        price_log_growth[1:] = np.log(close[1:] / close[:-1])
+        log_growth = previous_position * price_log_growth[:, None]
+        log_growth += ((position == 1) & (previous_position == 0)) * self.entry_log_growth
+        log_growth += ((position == 0) & (previous_position == 1)) * exit_log_growth
+
+        # prefix[t] is the log growth over bars 0..t-1
+        self.prefix = np.vstack([np.zeros((1, columns)), np.cumsum(log_growth, axis=0)])
+
+        # next_entry[t] is the first bar at or after t with an entry signal, or bars if there is none
+        entry_bars = np.where(signals == 1, bar_index, bars)
+        self.next_entry = np.vstack([np.minimum.accumulate(entry_bars[::-1], axis=0)[::-1], np.full((1, columns), bars)])
+        self.bars = bars
+
+    # Returns are rounded to this many decimals. Columns that trade identically inside a window can reach the same return
+    # through different prefix sums, and rounding away that last-bit noise keeps them tied, as they are in a vectorbt backtest
+    DECIMALS = 12
+
+    def totalReturn(self, start_data=None, end_data=None, columns=None):
+        """
+        Returns the total return of each column backtested over bars start_data..end_data inclusive.
+        Like Backtester.run, a missing (or zero) bound leaves that side of the window open
+        """
+        start = start_data if start_data else 0
+        end = end_data if end_data else self.bars - 1
+        columns = np.arange(self.prefix.shape[1]) if columns is None else np.asarray(columns)
+
+        first_entry = self.next_entry[start, columns]
+        invested = first_entry <= end
+        entry_prefix = self.prefix[np.minimum(first_entry, end) + 1, columns]
+        log_return = self.prefix[end + 1, columns] - entry_prefix + self.entry_log_growth
+        return np.where(invested, np.round(np.expm1(log_return), self.DECIMALS), 0.0)
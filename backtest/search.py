@@ -0,0 +1,149 @@
+import numpy as np
+from itertools import product
+
+class ParameterSearch:
+    """
+    Base class for the ways WalkForwardOptimisation can search the parameter space of a strategy over an in-sample window.
+    Searches backtest parameters through optimiser.evaluateParameters, which counts every backtest it runs
+    """
+    def search(self, optimiser, in_sample_start, in_sample_end):
+        """
+        Returns (best_params, best_performance) over the in-sample window
+        """
+        raise NotImplementedError()
+
+    def getName(self):
+        raise NotImplementedError()
+
+
+class GridSearch(ParameterSearch):
+    """
+    Exhaustive search that backtests every combination in the parameter grid
+    """
+    def search(self, optimiser, in_sample_start, in_sample_end):
+        performances = optimiser.evaluateParameters(optimiser.parameter_grid, in_sample_start, in_sample_end)
+        return optimiser.selectBestParameters(performances, optimiser.parameter_grid)
+
+    def getName(self):
+        return "Grid Search"
+
+
+class RandomSearch(ParameterSearch):
+    """
+    Backtests a fixed budget of combinations sampled from the parameter grid without replacement.
+    The sample is seeded so a run is reproducible
+    """
+    def __init__(self, budget=200, seed=0):
+        self.budget = budget
+        self.seed = seed
+
+    def search(self, optimiser, in_sample_start, in_sample_end):
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(self.budget, len(optimiser.parameter_grid))
+        # Sorting keeps the sample in grid order, so ties are broken as in a grid search
+        indices = np.sort(rng.choice(len(optimiser.parameter_grid), size=sample_size, replace=False))
+        candidates = [optimiser.parameter_grid[i] for i in indices]
+        performances = optimiser.evaluateParameters(candidates, in_sample_start, in_sample_end)
+        return optimiser.selectBestParameters(performances, candidates)
+
+    def getName(self):
+        return "Random Search"
+
+
+class CoarseToFineSearch(ParameterSearch):
+    """
+    Backtests a coarse lattice taking every coarse_step-th value of each parameter, then repeatedly halves the step
+    and backtests the neighbours of the top_cells best points found so far, until the step reaches 1.
+    No combination is backtested twice
+    """
+    def __init__(self, coarse_step=4, top_cells=3):
+        self.coarse_step = coarse_step
+        self.top_cells = top_cells
+
+    def search(self, optimiser, in_sample_start, in_sample_end):
+        names, axes = optimiser.getParameterSpace()
+        # Performance of every evaluated point, keyed by its tuple of value indices along the axes
+        scores = {}
+
+        def toParams(point):
+            return {name: axis[i] for name, axis, i in zip(names, axes, point)}
+
+        def evaluate(points):
+            points = sorted(point for point in set(points) if point not in scores and optimiser.isValidParameters(toParams(point)))
+            if points:
+                performances = optimiser.evaluateParameters([toParams(point) for point in points], in_sample_start, in_sample_end)
+                scores.update(zip(points, np.where(np.isnan(performances), -np.inf, performances)))
+
+        step = max(1, self.coarse_step)
+        evaluate(product(*[sorted(set(range(0, len(axis), step)) | {len(axis) - 1}) for axis in axes]))
+
+        while step > 1:
+            step = max(1, step // 2)
+            # Sorting by point before score keeps the choice of top cells deterministic when scores tie
+            top_points = sorted(sorted(scores), key=lambda point: scores[point], reverse=True)[:self.top_cells]
+            neighbours = []
+            for point in top_points:
+                neighbours.extend(product(*[[i + offset for offset in (-step, 0, step) if 0 <= i + offset < len(axis)] for i, axis in zip(point, axes)]))
+            evaluate(neighbours)
+
+        if not scores:
+            return None, -np.inf
+        points = sorted(scores)
+        return optimiser.selectBestParameters(np.array([scores[point] for point in points]), [toParams(point) for point in points])
+
+    def getName(self):
+        return "Coarse To Fine Search"
+
+
+class SuccessiveHalvingSearch(ParameterSearch):
+    """
+    Successive halving over sub-windows of the in-sample window. All candidates are first backtested on the most recent
+    part of the window, then only the best 1/eta of them are kept and the sub-window grows by a factor of eta,
+    until the survivors are backtested on the whole window. Early rounds are cheap because their windows are short.
+    Candidates are the whole grid, or a seeded random sample of initial_candidates combinations
+    """
+    def __init__(self, eta=2, rounds=3, initial_candidates=None, seed=0):
+        if rounds < 1:
+            raise ValueError("rounds must be an integer 1 or greater")
+        if eta <= 1:
+            raise ValueError("eta must be greater than 1")
+        self.eta = eta
+        self.rounds = rounds
+        self.initial_candidates = initial_candidates
+        self.seed = seed
+
+    def search(self, optimiser, in_sample_start, in_sample_end):
+        candidates = optimiser.parameter_grid
+        if self.initial_candidates is not None and self.initial_candidates < len(candidates):
+            rng = np.random.default_rng(self.seed)
+            indices = np.sort(rng.choice(len(candidates), size=self.initial_candidates, replace=False))
+            candidates = [candidates[i] for i in indices]
+
+        window_start = in_sample_start or 0
+        window_length = in_sample_end - window_start
+        for round_number in range(self.rounds):
+            remaining_rounds = self.rounds - 1 - round_number
+            if remaining_rounds > 0 and len(candidates) == 1:
+                # Nothing left to prune, so go straight to the whole window
+                continue
+            sub_window_length = max(2, int(window_length / (self.eta ** remaining_rounds)))
+            sub_window_start = max(window_start, in_sample_end - sub_window_length)
+            performances = optimiser.evaluateParameters(candidates, sub_window_start, in_sample_end)
+
+            if remaining_rounds == 0:
+                return optimiser.selectBestParameters(performances, candidates)
+
+            performances = np.where(np.isnan(performances), -np.inf, performances)
+            keep = max(1, int(np.ceil(len(candidates) / self.eta)))
+            # A stable sort keeps ties in grid order
+            survivors = np.sort(np.argsort(-performances, kind="stable")[:keep])
+            candidates = [candidates[i] for i in survivors]
+
+    def getName(self):
+        return "Successive Halving Search"
+
+
+# Search methods offered in the UI, keyed by their display name
+SEARCH_METHODS = {
+    search.getName(): search for search in [GridSearch(), CoarseToFineSearch(), SuccessiveHalvingSearch(), RandomSearch()]
+}
@@ -0,0 +1,100 @@
+import numpy as np
+from strategy.kernels import jit, getBackend, asFloatArray
+
+# Metrics the simulator can return, in the order the compiled loop produces them
+METRICS = ("total_return", "max_drawdown", "trade_count")
+
+
+@jit
+def _simulateLoop(close, entries, exits, initial_cash, fees):
+    """
+    Long-only simulation of every signal column with the order arithmetic of vbt.Portfolio.from_signals:
+    an entry when flat buys with all the cash, paying the fee out of it, and an exit when invested sells the whole position.
+    A bar with both an entry and an exit signal is ignored, as vectorbt ignores conflicting signals
+    """
+    bars, columns = entries.shape
+    metrics = np.empty((3, columns))
+    for column in range(columns):
+        cash = initial_cash
+        shares = 0.0
+        # Drawdowns are measured from the value after the first bar, as in vectorbt
+        peak = 0.0
+        max_drawdown = 0.0
+        trades = 0
+        value = initial_cash
+        for i in range(bars):
+            if entries[i, column] and exits[i, column]:
+                pass
+            elif shares == 0.0:
+                if entries[i, column] and cash > 0.0:
+                    shares = (cash / (1.0 + fees)) / close[i]
+                    cash = 0.0
+                    trades += 1
+            elif exits[i, column]:
+                acquired_cash = shares * close[i]
+                cash += acquired_cash - acquired_cash * fees
+                shares = 0.0
+            value = cash + shares * close[i]
+            if value > peak:
+                peak = value
+            elif value / peak - 1.0 < max_drawdown:
+                max_drawdown = value / peak - 1.0
+        metrics[0, column] = (value - initial_cash) / initial_cash
+        metrics[1, column] = max_drawdown
+        metrics[2, column] = trades
+    return metrics
+
+
+def _simulateNumpy(close, entries, exits, initial_cash, fees):
+    """
+    Vectorised form of the loop. The position after each bar is long when the most recent signal was an entry, so the
+    portfolio value is the initial cash compounded by the price moves while invested and the fees of every trade.
+    Agrees with the loop to within floating point rounding
+    """
+    bars, columns = entries.shape
+    signals = entries.astype(np.int8) - exits.astype(np.int8)
+    bar_index = np.arange(bars)[:, None]
+    last_signal_bar = np.maximum.accumulate(np.where(signals != 0, bar_index, -1), axis=0)
+    last_signal = np.take_along_axis(signals, np.maximum(last_signal_bar, 0), axis=0)
+    position = (last_signal_bar >= 0) & (last_signal == 1)
+    previous_position = np.vstack([np.zeros((1, columns), dtype=bool), position[:-1]])
+
+    price_growth = np.ones(bars)
+    price_growth[1:] = close[1:] / close[:-1]
+    growth = np.where(previous_position, price_growth[:, None], 1.0)
+    growth = growth / np.where(position & ~previous_position, 1.0 + fees, 1.0)
+    growth = growth * np.where(~position & previous_position, 1.0 - fees, 1.0)
+    value = initial_cash * np.cumprod(growth, axis=0)
+
+    metrics = np.empty((3, columns))
+    metrics[0] = (value[-1] - initial_cash) / initial_cash
+    metrics[1] = np.minimum((value / np.maximum.accumulate(value, axis=0) - 1.0).min(axis=0), 0.0)
+    metrics[2] = (position & ~previous_position).sum(axis=0)
+    return metrics
+
+
+SIMULATORS = {
+    "numba": _simulateLoop,
+    "numpy": _simulateNumpy,
+}
+
+
+def simulateMetrics(close, entries, exits, initial_cash, percentage_commission, metrics=("total_return",), backend=None):
+    """
+    Backtests one or more long-only signal columns over the close prices without building a vectorbt portfolio, and returns
+    a dictionary holding an array with one value per column for each of the requested metrics: "total_return" and
+    "max_drawdown" as fractions like the vectorbt portfolio methods, and "trade_count" as the number of trades opened
+    """
+    unknown = set(metrics) - set(METRICS)
+    if unknown:
+        raise ValueError(f"Unknown metrics {sorted(unknown)}, choose from {METRICS}")
+    entries = np.asarray(entries, dtype=np.bool_)
+    exits = np.asarray(exits, dtype=np.bool_)
+    if entries.ndim == 1:
+        entries, exits = entries[:, None], exits[:, None]
+    if len(entries) == 0:
+        return {metric: np.zeros(entries.shape[1]) for metric in metrics}
+
+    results = SIMULATORS[getBackend(backend)](asFloatArray(close), np.ascontiguousarray(entries), np.ascontiguousarray(exits),
+                                              float(initial_cash), percentage_commission / 100)
+    return {metric: results[METRICS.index(metric)] for metric in metrics}
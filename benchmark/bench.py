@@ -0,0 +1,372 @@
+"""
+Offline benchmark suite for the strategy, backtest and data pipeline, run on seeded synthetic stock data.
+
+    python -m benchmark.bench run --output benchmark/results.json
+    python -m benchmark.bench compare benchmark/baseline.json benchmark/results.json
+    python -m benchmark.bench compare benchmark/results.json benchmark/results.json --stages walk_forward_loop walk_forward_batch
+
+run writes the median time, peak traced memory and throughput of every case as JSON.
+compare exits with status 1 when a case is slower, or uses more memory, than the baseline by more than the threshold.
+With --stages it instead compares the cases of one stage against the same cases of another, such as the batched
+walk forward against the loop
+"""
+import os
+# Nothing here calls the API, but the config module refuses to load without a key
+os.environ.setdefault("ALPHA_VANTAGE_KEY", "benchmark")
+
+import argparse
+import json
+import pickle as pkl
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+import vectorbt as vbt
+
+from benchmark.synthetic import createStocks
+from strategy.factory import StrategyFactory
+from strategy.indicator_cache import indicator_cache
+from strategy import kernels
+from backtest.Backtest import Backtester
+from backtest.optimisation import WalkForwardOptimisation
+from backtest.search import RandomSearch
+from data.Data import StockData
+from data.PriceStore import PriceStore
+from data.Panel import PricePanel
+from strategy.screener import Screener
+from data.TradingCalendar import trading_calendar
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_TICKER_COUNTS = [1, 10]
+# Number of tickers read by the cache format comparison
+CACHE_FORMAT_TICKERS = 50
+
+STRATEGY_PARAMS = {
+    "SMA Crossover Strategy": {"short_window": 20, "long_window": 50},
+    "MACD Strategy": {"short_window": 12, "long_window": 26, "signal_window": 9},
+    "Bollinger Band Strategy": {"window": 20, "standard_deviations": 2},
+}
+
+KERNEL_CASES = {
+    "rollingMean": lambda close, backend: kernels.rollingMean(close, 20, backend),
+    "rollingStd": lambda close, backend: kernels.rollingStd(close, 20, backend),
+    "ema": lambda close, backend: kernels.ema(close, 26, backend),
+    "rsi": lambda close, backend: kernels.rsi(close, 14, backend=backend),
+}
+
+# Walk forward benchmarks backtest a fixed random sample of each strategy's grid so their cost does not depend on the grid size
+WALK_FORWARD_BUDGET = 20
+
+
+class Case:
+    """
+    One benchmark. setup() is called before every timed run and its result passed to run(state),
+    which returns the number of bars it processed
+    """
+    def __init__(self, name, stage, setup, run, strategy=None, bars=None, tickers=1):
+        self.name = name
+        self.stage = stage
+        self.setup = setup
+        self.run = run
+        self.strategy = strategy
+        self.bars = bars
+        self.tickers = tickers
+
+
+def measure(case, repeats):
+    """
+    Times the case after an untimed warm up run, then runs it once more under tracemalloc for its peak memory
+    """
+    case.run(case.setup())
+
+    times = []
+    for _ in range(repeats):
+        state = case.setup()
+        start = time.perf_counter()
+        bars_processed = case.run(state)
+        times.append(time.perf_counter() - start)
+
+    state = case.setup()
+    tracemalloc.start()
+    case.run(state)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    median_time = statistics.median(times)
+    return {
+        "name": case.name,
+        "stage": case.stage,
+        "strategy": case.strategy,
+        "bars": case.bars,
+        "tickers": case.tickers,
+        "repeats": repeats,
+        "time_seconds": median_time,
+        "min_time_seconds": min(times),
+        "peak_memory_bytes": peak_memory,
+        "bars_processed": bars_processed,
+        "bars_per_second": bars_processed / median_time if median_time > 0 else None,
+    }
+
+
+def kernelCases(bars, seed):
+    close = np.ascontiguousarray(createStocks(1, bars, seed)[0].getDataFrame()["Close"].to_numpy())
+    cases = []
+    for backend in kernels.BACKENDS:
+        for kernel, function in KERNEL_CASES.items():
+            def runKernel(state, function=function, backend=backend):
+                function(close, backend)
+                return len(close)
+            cases.append(Case(f"kernel/{kernel}/{backend}/{bars}", "kernel", lambda: None, runKernel, bars=bars))
+    return cases
+
+
+def strategyCases(bars, ticker_counts, seed):
+    factory = StrategyFactory()
+    cases = []
+    for strategy_name, params in STRATEGY_PARAMS.items():
+        stock = createStocks(1, bars, seed)[0]
+
+        for tickers in ticker_counts:
+            stocks = createStocks(tickers, bars, seed)
+
+            def setupPreprocess():
+                # Clearing the shared indicator cache makes every run compute its indicators
+                indicator_cache.clear()
+
+            def runPreprocess(state, stocks=stocks, strategy_name=strategy_name, params=params):
+                for s in stocks:
+                    factory.createStrategy(strategy_name, s, **params)
+                return bars * len(stocks)
+            cases.append(Case(f"preprocess/{strategy_name}/{bars}/{tickers}", "preprocess", setupPreprocess, runPreprocess,
+                              strategy=strategy_name, bars=bars, tickers=tickers))
+
+            # The same stocks as one panel, with the signals of every ticker calculated in one pass
+            panel = PricePanel.fromStocks(stocks)
+
+            def runPanelSignals(state, panel=panel, strategy_name=strategy_name, params=params):
+                factory.createPanelStrategy(strategy_name, panel, **params).generateSignalArray()
+                return bars * len(panel.getTickers())
+            cases.append(Case(f"panel_signals/{strategy_name}/{bars}/{tickers}", "panel_signals", lambda: None, runPanelSignals,
+                              strategy=strategy_name, bars=bars, tickers=tickers))
+
+        def setupStrategy(stock=stock, strategy_name=strategy_name, params=params):
+            return factory.createStrategy(strategy_name, stock, **params)
+
+        def runSignals(strategy):
+            return len(strategy.generateSignalSeries())
+        cases.append(Case(f"signals/{strategy_name}/{bars}", "signals", setupStrategy, runSignals, strategy=strategy_name, bars=bars))
+
+        def runBacktest(strategy):
+            Backtester(strategy).run(10000, 2)
+            return strategy.getDataSize()
+        cases.append(Case(f"backtest/{strategy_name}/{bars}", "backtest", setupStrategy, runBacktest, strategy=strategy_name, bars=bars))
+
+        def runBacktestMetrics(strategy):
+            Backtester(strategy).runMetrics(10000, 2)
+            return strategy.getDataSize()
+        cases.append(Case(f"backtest_metrics/{strategy_name}/{bars}", "backtest_metrics", setupStrategy, runBacktestMetrics,
+                          strategy=strategy_name, bars=bars))
+
+        def setupWalkForward(stock=stock, strategy_name=strategy_name):
+            indicator_cache.clear()
+            return WalkForwardOptimisation(strategy_name, stock, search=RandomSearch(budget=WALK_FORWARD_BUDGET))
+
+        def runWalkForward(optimiser):
+            optimiser.run(0.5, 0.1)
+            return optimiser.getEvaluatedBars()
+        cases.append(Case(f"walk_forward/{strategy_name}/{bars}", "walk_forward", setupWalkForward, runWalkForward,
+                          strategy=strategy_name, bars=bars))
+
+        # Without the incremental scorer, comparing each window's combinations backtested in one vectorbt simulation
+        # against the loop backtesting them one at a time
+        for stage, batch in [("walk_forward_batch", True), ("walk_forward_loop", False)]:
+            def setupWalkForwardWindows(stock=stock, strategy_name=strategy_name, batch=batch):
+                indicator_cache.clear()
+                return WalkForwardOptimisation(strategy_name, stock, batch=batch, incremental=False,
+                                               search=RandomSearch(budget=WALK_FORWARD_BUDGET))
+            cases.append(Case(f"{stage}/{strategy_name}/{bars}", stage, setupWalkForwardWindows, runWalkForward,
+                              strategy=strategy_name, bars=bars))
+    return cases
+
+
+def screenerCases(bars, ticker_counts, seed):
+    """
+    Screens the latest bar of every ticker in a panel for the default parameter set of every strategy
+    """
+    cases = []
+    for tickers in ticker_counts:
+        panel = PricePanel.fromStocks(createStocks(tickers, bars, seed))
+
+        def runScreener(state, panel=panel):
+            Screener(panel).screen()
+            # One latest bar is screened per ticker
+            return len(panel.getTickers())
+        cases.append(Case(f"screener/{bars}/{tickers}", "screener", lambda: None, runScreener, bars=bars, tickers=tickers))
+    return cases
+
+
+def cacheLoadCases(bars, ticker_counts, seed, directory):
+    """
+    Loads stocks through StockData from a price store in a temporary directory, written so that they are up to date
+    so StockData takes them from the cache instead of calling the API
+    """
+    store = PriceStore(directory)
+    cases = []
+    for tickers in ticker_counts:
+        stocks = createStocks(tickers, bars, seed)
+        names = [f"{stock.getTicker()}_{bars}" for stock in stocks]
+        # Ending the bars on the latest published session keeps the stored data current for StockData
+        latest_session = pd.Timestamp(trading_calendar.getLatestPublishedSession())
+        for name, stock in zip(names, stocks):
+            data = stock.getDataFrame()
+            store.save(name, data.set_axis(data.index + (latest_session - data.index[-1])), pd.Timestamp.now().date())
+
+        def runLoad(state, names=names):
+            for name in names:
+                if StockData(name).getError() is not None:
+                    raise RuntimeError(f"Failed to load {name} from the benchmark cache")
+            return bars * len(names)
+        cases.append(Case(f"cache_load/{bars}/{tickers}", "cache_load", lambda: None, runLoad, bars=bars, tickers=tickers))
+    return cases, store
+
+
+def cacheFormatCases(bars, seed, directory):
+    """
+    Reads the same CACHE_FORMAT_TICKERS stocks from the old pickle cache format and from the Arrow price store,
+    in full and as one column from the last tenth of the history
+    """
+    store = PriceStore(os.path.join(directory, f"format_{bars}"))
+    stocks = createStocks(CACHE_FORMAT_TICKERS, bars, seed)
+    fetch_date = pd.Timestamp.now().date()
+    for stock in stocks:
+        store.save(stock.getTicker(), stock.getDataFrame(), fetch_date)
+        with open(store.getPicklePath(stock.getTicker()), "wb") as file:
+            pkl.dump({"fetchDate": fetch_date, "Data": stock.getDataFrame()}, file)
+    tickers = [stock.getTicker() for stock in stocks]
+    recent_start = stocks[0].getDataFrame().index[-max(bars // 10, 1)]
+
+    readers = {
+        "pickle": lambda ticker: store.loadPickle(ticker),
+        "arrow": lambda ticker: store.load(ticker),
+        "arrow_recent_close": lambda ticker: store.load(ticker, start=recent_start, columns=["Close"]),
+    }
+    cases = []
+    for cache_format, read in readers.items():
+        def runRead(state, read=read):
+            for ticker in tickers:
+                read(ticker)
+            return bars * len(tickers)
+        cases.append(Case(f"cache_format/{cache_format}/{bars}/{CACHE_FORMAT_TICKERS}", "cache_format", lambda: None, runRead,
+                          bars=bars, tickers=CACHE_FORMAT_TICKERS))
+    return cases
+
+
+def runSuite(sizes, ticker_counts, repeats, seed, only=None):
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        original_store = StockData.price_store
+        try:
+            for bars in sizes:
+                load_cases, store = cacheLoadCases(bars, ticker_counts, seed, directory)
+                StockData.price_store = store
+                cases = kernelCases(bars, seed) + strategyCases(bars, ticker_counts, seed) + screenerCases(bars, ticker_counts, seed)
+                for case in cases + load_cases + cacheFormatCases(bars, seed, directory):
+                    if only and only not in case.name:
+                        continue
+                    result = measure(case, repeats)
+                    results.append(result)
+                    print(f"{case.name:<60} {result['time_seconds'] * 1000:10.2f} ms {result['peak_memory_bytes'] / 2**20:9.1f} MiB"
+                          f" {result['bars_per_second'] or 0:14,.0f} bars/s", flush=True)
+        finally:
+            StockData.price_store = original_store
+    return results
+
+
+def getMetadata(seed, repeats):
+    return {
+        "created": pd.Timestamp.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "vectorbt": vbt.__version__,
+        "kernel_backend": kernels.DEFAULT_BACKEND,
+        "seed": seed,
+        "repeats": repeats,
+    }
+
+
+def compare(baseline, current, threshold, memory_threshold, stages=None):
+    """
+    Returns one row per case found in both result sets, with the ratios of current to baseline time and memory
+    and whether either exceeds 1 + its threshold. stages is an optional (baseline stage, current stage) pair, which
+    compares the baseline's cases of the first stage with the current cases of the second stage for the same strategy and size
+    """
+    if stages is None:
+        baseline_results = {result["name"]: result for result in baseline["results"]}
+        current_results = current["results"]
+    else:
+        baseline_stage, current_stage = stages
+        baseline_results = {current_stage + result["name"][len(baseline_stage):]: result for result in baseline["results"]
+                            if result["stage"] == baseline_stage}
+        current_results = [result for result in current["results"] if result["stage"] == current_stage]
+    rows = []
+    for result in current_results:
+        previous = baseline_results.get(result["name"])
+        if previous is None:
+            continue
+        time_ratio = result["time_seconds"] / previous["time_seconds"] if previous["time_seconds"] else float("inf")
+        memory_ratio = result["peak_memory_bytes"] / previous["peak_memory_bytes"] if previous["peak_memory_bytes"] else 1.0
+        regressed = time_ratio > 1 + threshold or memory_ratio > 1 + memory_threshold
+        rows.append((result["name"], time_ratio, memory_ratio, regressed))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks the trading tool on synthetic stock data")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks and write the results as JSON")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="history lengths in bars")
+    run_parser.add_argument("--tickers", type=int, nargs="+", default=DEFAULT_TICKER_COUNTS, help="ticker counts for the multi-ticker stages")
+    run_parser.add_argument("--repeats", type=int, default=5)
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--only", help="only run cases whose name contains this text")
+    run_parser.add_argument("--output", default="benchmark/results.json")
+
+    compare_parser = commands.add_parser("compare", help="flag regressions against a saved baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.25, help="allowed fractional slowdown")
+    compare_parser.add_argument("--memory-threshold", type=float, default=0.25, help="allowed fractional growth in peak memory")
+    compare_parser.add_argument("--stages", nargs=2, metavar=("BASELINE_STAGE", "CURRENT_STAGE"),
+                                help="compare the cases of one stage with the same cases of another")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        results = runSuite(args.sizes, args.tickers, args.repeats, args.seed, args.only)
+        with open(args.output, "w") as file:
+            json.dump({"metadata": getMetadata(args.seed, args.repeats), "results": results}, file, indent=2)
+        print(f"Wrote {len(results)} results to {args.output}")
+        return 0
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    with open(args.current) as file:
+        current = json.load(file)
+    rows = compare(baseline, current, args.threshold, args.memory_threshold, args.stages)
+    for name, time_ratio, memory_ratio, regressed in rows:
+        print(f"{name:<60} time x{time_ratio:6.2f} memory x{memory_ratio:6.2f}{'  REGRESSION' if regressed else ''}")
+    regressions = sum(regressed for *_, regressed in rows)
+    print(f"{regressions} regression(s) in {len(rows)} compared cases")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
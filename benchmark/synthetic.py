@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import hashlib
+
+def generateOHLCV(bars, seed=0, start_price=100.0, drift=0.0003, volatility=0.015, end_date="2024-12-31"):
+    """
+    Returns a reproducible random walk of daily OHLCV bars shaped like the cached Alpha Vantage data:
+    float Open, High, Low, Close and Volume columns indexed by a DatetimeIndex named Date, one bar per calendar day up to end_date
+    """
+    rng = np.random.default_rng(seed)
+    close = start_price * np.exp(np.cumsum(rng.normal(drift, volatility, bars)))
+    # Each bar opens near the previous close, and the high and low extend beyond the open and close
+    open_ = np.empty(bars)
+    open_[0] = start_price
+    open_[1:] = close[:-1] * np.exp(rng.normal(0, volatility / 4, bars - 1))
+    high = np.maximum(open_, close) * np.exp(np.abs(rng.normal(0, volatility / 2, bars)))
+    low = np.minimum(open_, close) * np.exp(-np.abs(rng.normal(0, volatility / 2, bars)))
+    volume = np.round(rng.lognormal(15, 0.5, bars))
+
+    index = pd.date_range(end=end_date, periods=bars, freq="D", name="Date")
+    return pd.DataFrame({"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume}, index=index)
+
+
+class SyntheticStock:
+    """
+    Stand-in for StockData holding generated bars, so strategies and backtests can be benchmarked offline
+    """
+    def __init__(self, ticker, bars, seed=0):
+        self.ticker = ticker
+        self.data = generateOHLCV(bars, seed=seed)
+        self.fetch_time = pd.Timestamp.now().date()
+        self.fingerprint = None
+
+    def getTicker(self):
+        return self.ticker
+
+    def getFetchTime(self):
+        return self.fetch_time
+
+    def getError(self):
+        return None
+
+    def getDataFrame(self):
+        return self.data
+
+    def getFingerprint(self):
+        if self.fingerprint is None:
+            digest = hashlib.blake2b(digest_size=16)
+            digest.update(self.data.index.asi8.tobytes())
+            digest.update(self.data.to_numpy().tobytes())
+            self.fingerprint = digest.hexdigest()
+        return self.fingerprint
+
+
+def createStocks(tickers, bars, seed=0):
+    """
+    Returns synthetic stocks named SYN0, SYN1, ..., each generated from its own seed
+    """
+    return [SyntheticStock(f"SYN{i}", bars, seed=seed + i) for i in range(tickers)]
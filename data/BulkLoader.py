@@ -0,0 +1,108 @@
+from data.Data import StockData
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+import requests
+import threading
+import random
+import time
+
+class TokenBucket:
+    """
+    Rate limiter allowing requests_per_minute requests on average, with bursts of up to capacity requests.
+    The capacity defaults to 1, which spaces the requests evenly so no minute has more than requests_per_minute of them.
+    acquire() blocks until a token is available and is safe to call from several threads
+    """
+    def __init__(self, requests_per_minute, capacity=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = capacity
+        self.tokens = float(self.capacity)
+        self.clock = clock
+        self.sleep = sleep
+        self.last_refill = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                # Allows for rounding in the refill, so a wait of exactly the time to the next token is enough
+                if self.tokens >= 1 - 1e-9:
+                    self.tokens = max(self.tokens - 1, 0.0)
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+
+
+class RateLimitedSession:
+    """
+    Pooled HTTP session for the Alpha Vantage API. Every request takes a token from a shared token bucket,
+    and transient failures (connection errors, timeouts, 429 and 5xx responses, and Alpha Vantage's
+    rate limit notes) are retried with exponential backoff and jitter. Alpha Vantage's "Information" responses,
+    sent for invalid keys, premium endpoints and exhausted daily quotas, are permanent and returned without retrying.
+    It has the same get method as requests, so it can be passed to StockData as its session
+    """
+    # Alpha Vantage reports per-minute rate limiting in a 200 response with one of these keys instead of the data
+    RATE_LIMIT_MARKERS = (b'"Note"',)
+
+    def __init__(self, requests_per_minute=75, pool_size=10, max_retries=4, backoff_seconds=1.0, sleep=time.sleep):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.token_bucket = TokenBucket(requests_per_minute, sleep=sleep)
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.sleep = sleep
+
+    def isTransient(self, response):
+        if response.status_code == 429 or response.status_code >= 500:
+            return True
+        return any(marker in response.content[:200] for marker in self.RATE_LIMIT_MARKERS)
+
+    def get(self, url, **kwargs):
+        """
+        Sends a GET request, retrying transient failures. Once the retries are used up the last response is returned,
+        or the last exception raised, so the caller reports the error as usual
+        """
+        for attempt in range(self.max_retries + 1):
+            self.token_bucket.acquire()
+            try:
+                response = self.session.get(url, **kwargs)
+                if not self.isTransient(response) or attempt == self.max_retries:
+                    return response
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt == self.max_retries:
+                    raise
+            self.sleep(self.backoff_seconds * (2 ** attempt) * (1 + random.random()))
+
+    def close(self):
+        self.session.close()
+
+
+class BulkStockLoader:
+    """
+    Loads the stock data for many tickers concurrently. Tickers are fetched on a thread pool that shares one
+    rate limited, pooled session, and the results are written to the stock data cache as they arrive.
+    Tickers that are already cached and up to date are served from the cache without using the quota
+    """
+    def __init__(self, requests_per_minute=75, max_workers=8, max_retries=4, backoff_seconds=1.0):
+        self.max_workers = max_workers
+        self.session = RateLimitedSession(requests_per_minute=requests_per_minute, pool_size=max_workers,
+                                          max_retries=max_retries, backoff_seconds=backoff_seconds)
+
+    def loadTicker(self, ticker):
+        return StockData(ticker, session=self.session)
+
+    def load(self, tickers):
+        """
+        Returns a dictionary mapping each ticker to its StockData, in the order the tickers were given.
+        Failed tickers are included, with the reason available from getError()
+        """
+        tickers = list(dict.fromkeys(tickers))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return dict(zip(tickers, executor.map(self.loadTicker, tickers)))
+
+    def close(self):
+        self.session.close()
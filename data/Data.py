@@ -1,8 +1,10 @@
 import config.config as config
 import requests
 import pandas as pd
-import os
-import pickle as pkl
+import hashlib
+from data.PriceStore import PriceStore
+from data.TradingCalendar import trading_calendar
+from diagnostics.profiler import profiler
 pd.set_option('display.max_columns', None)
 
 class StockData:
@@ -11,23 +13,40 @@ class StockData:
     """
     # Directory to store the stock data cache
     CACHE_DIR = "data/stock_data_cache"
+    # Columnar store holding the cached data, pickle caches in CACHE_DIR are migrated to it when first loaded
+    price_store = PriceStore(CACHE_DIR)
+    # Alpha Vantage endpoint, can be pointed at a local stand-in server
+    API_URL = "https://www.alphavantage.co/query"
 
-    def __init__(self, ticker):
+    # Seconds to wait for the API before giving up on a request
+    REQUEST_TIMEOUT = 30
+
+    def __init__(self, ticker, session=None):
+        """
+        session is an optional object with a requests-style get method used to call the API,
+        such as a pooled requests.Session. By default requests.get is used
+        """
         self.ticker = ticker
+        self.fingerprint = None
+        self.session = session
         # Fetch the stock data
         # Check if the data is stored in cache and is up to date
         cached_data = self.loadDataFromCache()
-        if cached_data is not None:
+        if cached_data is not None and self.isCacheUpToDate(cached_data[0], self.getLastBarDate(cached_data[1])):
             self.fetch_time, self.data = cached_data
             self.error = None   
 
         # If the data is not in cache or is outdated, fetch the data from the API
         else:
-            self.data, self.error  = self.fetchData()
+            if cached_data is not None:
+                # Only fetch the bars added since the cache was written
+                self.data, self.error = self.refreshData(cached_data[1])
+            else:
+                self.data, self.error  = self.fetchData()
             if self.error is None:
                 # Save the data to cache
+                self.fetch_time = trading_calendar.now()
                 self.saveDataToCache()
-                self.fetch_time = pd.Timestamp.now().date()
     
     def getTicker(self):
         return self.ticker
@@ -37,38 +56,71 @@ class StockData:
     
     def loadDataFromCache(self):
         """
-        Check if data for a stock is stored in cache and is up to date 
-        and return the data if it exist and is up to date
+        Return the (fetch time, data) stored in cache for the stock, or None if the stock is not cached
+        """
+        with profiler.span("data.cache_load", ticker=self.getTicker()):
+            return self.price_store.load(self.getTicker())
+
+    def isCacheUpToDate(self, fetch_time, last_bar_date=None):
+        """
+        Check if data fetched at fetch_time, ending with a bar on last_bar_date, is up to date.
+        It is out of date only once a trading session it does not have has closed and its bar has been published,
+        so the cache is not refetched over weekends and market holidays (see TradingCalendar)
         """
-        file_path = "{directory}/{symbol}.pkl".format(directory=self.CACHE_DIR,symbol = self.getTicker())
-        if os.path.exists(file_path):
-            with open(file_path, 'rb') as stock_data:
-                cached_content = pkl.load(stock_data)
-                if pd.Timestamp.now().date() == cached_content['fetchDate']:
-                    return cached_content['fetchDate'], cached_content['Data']
-        return None
+        return trading_calendar.isDataCurrent(fetch_time, last_bar_date)
+
+    @staticmethod
+    def getLastBarDate(data):
+        return data.index[-1] if len(data) else None
 
 
     def saveDataToCache(self):
         """
         Save the stock data to cache
         """
-        file_path = "{directory}/{symbol}.pkl".format(directory = self.CACHE_DIR, symbol = self.getTicker())
-        with open(file_path, 'wb') as stock_data:
-            pkl.dump({'fetchDate': pd.Timestamp.now().date(), 'Data': self.data}, stock_data)
+        with profiler.span("data.cache_save", ticker=self.getTicker()):
+            self.price_store.save(self.getTicker(), self.data, self.fetch_time)
 
 
-    def fetchData(self):
+    def refreshData(self, cached_data):
         """
-        Fetches daily stock data for a given ticker symbol using alpha vantage API and formats the data into a pandas dataframe
+        Brings cached stock data up to date by fetching only the compact window of recent bars and merging it into the cached history.
+        Bars in the compact window replace cached bars on the same date, so revised bars are corrected.
+        If the compact window does not overlap the cached history there may be missing bars, so the full history is fetched instead
         """
-        url = f"https://www.alphavantage.co/query?function=TIME_SERIES_DAILY&symbol={self.getTicker()}&outputsize=full&apikey={config.API_KEY}"
+        recent_data, error = self.fetchData(outputsize="compact")
+        if error is not None:
+            return None, error
+
+        if recent_data.empty or recent_data.index[0] > cached_data.index[-1]:
+            return self.fetchData(outputsize="full")
+
+        stock_dataframe = pd.concat([cached_data[cached_data.index < recent_data.index[0]], recent_data])
+        stock_dataframe = stock_dataframe[~stock_dataframe.index.duplicated(keep="last")].sort_index()
+        return stock_dataframe, None
+
+    def fetchData(self, outputsize="full"):
+        """
+        Fetches daily stock data for a given ticker symbol using alpha vantage API and formats the data into a pandas dataframe.
+        outputsize is "full" for the whole history or "compact" for the latest 100 bars
+        """
+        query = {
+            "function": "TIME_SERIES_DAILY",
+            "symbol": self.getTicker(),
+            "outputsize": outputsize,
+            "apikey": config.API_KEY
+        }
         try:
-            r = requests.get(url)
+            session = self.session if self.session is not None else requests
+            profiler.count("data.api_requests")
+            with profiler.span("data.fetch", ticker=self.getTicker(), outputsize=outputsize):
+                r = session.get(self.API_URL, params=query, timeout=self.REQUEST_TIMEOUT)
             r.raise_for_status()
             data = r.json()
 
             # Checks for errors in fetching the data and returns an error message
+            if "Information" in data or "Note" in data:
+                return None, f"Error: Alpha Vantage did not return data for {self.getTicker()}: {data.get('Information') or data.get('Note')}"
             if "Time Series (Daily)" not in data:
                 error_message = f"Error: Unable to retrieve data for {self.getTicker()}. Please check if the ticker symbol is correct."
                 return None, error_message
@@ -98,5 +150,16 @@ class StockData:
     
     def getDataFrame(self):
         return self.data
+
+    def getFingerprint(self):
+        """
+        Returns a hash of the stock data, used to tell apart different versions of the data for the same ticker
+        """
+        if self.fingerprint is None:
+            digest = hashlib.blake2b(digest_size=16)
+            digest.update(self.data.index.asi8.tobytes())
+            digest.update(self.data.to_numpy().tobytes())
+            self.fingerprint = digest.hexdigest()
+        return self.fingerprint
     
 
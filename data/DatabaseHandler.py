@@ -1,48 +1,197 @@
 import sqlite3
 import json
+import pickle as pkl
+import threading
+import queue
+from contextlib import contextmanager
 
-class DBHandler:
+# Schema migrations, applied in order. PRAGMA user_version records how many have been applied to a database
+MIGRATIONS = [
+    # 1: stock_strategy stores the stock ticker alongside the strategy name, and strategy parameters
     """
-    This class is responsible for handling the database operations for the stock trading tool. 
-    It creates a connection to the database and creates the necessary tables.
-    The class provides methods to insert, retrieve, and remove stock strategies from the database.
+    CREATE TABLE IF NOT EXISTS stock_strategy (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ticker TEXT NOT NULL,
+        strategy TEXT NOT NULL,
+        params TEXT NOT NULL,
+        time_stamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(ticker, strategy, params)
+    );
+    """,
+    # 2: backtest_result caches the backtest stats and equity curve of a stock strategy for a version of the stock data,
+    # initial cash and commission
+    """
+    CREATE TABLE IF NOT EXISTS backtest_result (
+        stock_strategy_id INTEGER NOT NULL,
+        data_fingerprint TEXT NOT NULL,
+        initial_cash REAL NOT NULL,
+        fees REAL NOT NULL,
+        stats BLOB NOT NULL,
+        equity BLOB NOT NULL,
+        time_stamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (stock_strategy_id, data_fingerprint, initial_cash, fees)
+    );
+    """,
+    # 3: strategy_snapshot holds the latest signals, indicator values and backtest return of a stock strategy, precomputed by
+    # jobs.precompute. input_key identifies the data, parameters and backtest settings the snapshot was computed from
+    """
+    CREATE TABLE IF NOT EXISTS strategy_snapshot (
+        stock_strategy_id INTEGER PRIMARY KEY,
+        input_key TEXT NOT NULL,
+        data_fingerprint TEXT NOT NULL,
+        last_bar_date TEXT NOT NULL,
+        current_signal INTEGER NOT NULL,
+        last_signal INTEGER,
+        last_signal_date TEXT,
+        total_return REAL,
+        indicators BLOB NOT NULL,
+        seconds REAL NOT NULL,
+        time_stamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """,
+]
+
+# Queries are kept as constants so each pooled connection compiles them once and reuses the prepared statement
+INSERT_STRATEGY = """
+INSERT INTO stock_strategy (ticker, strategy, params)
+VALUES (?, ?, ?)
+ON CONFLICT(ticker, strategy, params) DO NOTHING;
+"""
+SELECT_STRATEGY_ID = """
+SELECT id FROM stock_strategy
+WHERE ticker = ? AND strategy = ? AND params = ?;
+"""
+SELECT_STRATEGY = """
+SELECT ticker, strategy, params, time_stamp FROM stock_strategy
+WHERE id = ?;
+"""
+SELECT_ALL_STRATEGIES = """
+SELECT id, ticker, strategy, params FROM stock_strategy;
+"""
+SELECT_STRATEGY_TABLE_VERSION = """
+SELECT COUNT(*), MAX(id) FROM stock_strategy;
+"""
+DELETE_STRATEGY = """
+DELETE FROM stock_strategy WHERE id = ?;
+"""
+DELETE_STRATEGY_BACKTEST_RESULTS = """
+DELETE FROM backtest_result WHERE stock_strategy_id = ?;
+"""
+SELECT_BACKTEST_RESULT = """
+SELECT stats, equity FROM backtest_result
+WHERE stock_strategy_id = ? AND data_fingerprint = ? AND initial_cash = ? AND fees = ?;
+"""
+INSERT_BACKTEST_RESULT = """
+INSERT OR REPLACE INTO backtest_result (stock_strategy_id, data_fingerprint, initial_cash, fees, stats, equity)
+VALUES (?, ?, ?, ?, ?, ?);
+"""
+DELETE_STALE_BACKTEST_RESULTS = """
+DELETE FROM backtest_result WHERE stock_strategy_id = ? AND data_fingerprint != ?;
+"""
+SELECT_SNAPSHOT = """
+SELECT input_key, data_fingerprint, last_bar_date, current_signal, last_signal, last_signal_date, total_return, indicators, seconds, time_stamp
+FROM strategy_snapshot WHERE stock_strategy_id = ?;
+"""
+SELECT_SNAPSHOT_INPUT_KEYS = """
+SELECT stock_strategy_id, input_key FROM strategy_snapshot;
+"""
+INSERT_SNAPSHOT = """
+INSERT OR REPLACE INTO strategy_snapshot (stock_strategy_id, input_key, data_fingerprint, last_bar_date, current_signal, last_signal,
+                                          last_signal_date, total_return, indicators, seconds)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+"""
+DELETE_STRATEGY_SNAPSHOT = """
+DELETE FROM strategy_snapshot WHERE stock_strategy_id = ?;
+"""
+
+
+class ConnectionPool:
+    """
+    Pool of SQLite connections to one database file, shared by every thread in the process.
+    Connections use WAL journaling so readers are not blocked by a writer, and the schema migrations
+    are run once when the pool is created
     """
-    def __init__(self):
-        self.conn = None
-        self.createConnection()
-        self.createTables()
+    def __init__(self, db_path, size=5):
+        self.db_path = db_path
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        with self.connection() as conn:
+            self.migrate(conn)
 
     def createConnection(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=256)
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        conn.execute("PRAGMA busy_timeout=5000;")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrows a connection from the pool, waiting if all of them are in use
+        """
+        self._slots.acquire()
         try:
-            self.conn = sqlite3.connect('data/trading_tool.db')
-        except sqlite3.Error as e:
-            print("Error establishing connection: ", e)
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self.createConnection()
+            try:
+                yield conn
+            finally:
+                # Never hand an open transaction to the next borrower
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def migrate(self, conn):
+        """
+        Applies the migrations the database has not had yet
+        """
+        version = conn.execute("PRAGMA user_version;").fetchone()[0]
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            try:
+                conn.execute(migration)
+                conn.execute(f"PRAGMA user_version = {number};")
+                conn.commit()
+            except sqlite3.Error as e:
+                conn.rollback()
+                print("Error applying migration {number}: ".format(number=number), e)
+                return
 
 
+class DBHandler:
+    """
+    This class is responsible for handling the database operations for the stock trading tool.
+    Handlers are cheap to create: every handler for the same database shares one connection pool, created
+    (and the tables migrated) the first time that database is used in the process.
+    The class provides methods to insert, retrieve, and remove stock strategies from the database.
+    """
+    DB_PATH = 'data/trading_tool.db'
+
+    # Connection pools and cached strategy indexes shared by all handlers, keyed by database path
+    _pools = {}
+    _strategy_indexes = {}
+    _lock = threading.Lock()
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path if db_path is not None else self.DB_PATH
+        with DBHandler._lock:
+            if self.db_path not in DBHandler._pools:
+                DBHandler._pools[self.db_path] = ConnectionPool(self.db_path)
+        self.pool = DBHandler._pools[self.db_path]
+
     def closeConnection(self):
-        if self.conn:
-            self.conn.close()
-    
-    def createTables(self):
         """
-        Creates Table:
-        - stock_strategy: stores the stock ticker alongside the strategy name, and strategy parameters
+        Connections belong to the shared pool, so there is nothing to close per handler
         """
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS stock_strategy (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                ticker TEXT NOT NULL,
-                strategy TEXT NOT NULL,
-                params TEXT NOT NULL,
-                UNIQUE(ticker, strategy, params)
-            );
-            """)
-            self.conn.commit()
-        except sqlite3.Error as e:
-            self.conn.rollback()
-            print("Error creating tables: ", e)
+        pass
+
+    def invalidateStrategyIndex(self):
+        with DBHandler._lock:
+            DBHandler._strategy_indexes.pop(self.db_path, None)
 
     def insertStrategy(self, strategy, strategy_params):
         """
@@ -50,102 +199,95 @@ class DBHandler:
         """
         ticker = strategy.getTicker()
         strategy_name = strategy.getName()
-        try:
-            cursor = self.conn.cursor()
-
-            # Insert into stock_strategy table
-            serialized_params = json.dumps(strategy_params, sort_keys=True)
-            cursor.execute("""
-            INSERT INTO stock_strategy (ticker, strategy, params)
-            VALUES (?, ?, ?)
-            ON CONFLICT(ticker, strategy, params) DO NOTHING;
-            """, (ticker, strategy.getName(), serialized_params))
-
-            # Get the stock_strategy_id
-            stock_strategy_id = cursor.lastrowid
-
-            # If the strategy already exists, return an error message
-            if stock_strategy_id == 0:
-                return f"Failed to insert strategy {strategy_name} for {ticker}. This strategy might already exist with the given parameters."
-            
-            self.conn.commit()
-            return None
-        
-        except sqlite3.Error as e:
-            self.conn.rollback()
-            return f"Error inserting strategy for {ticker}: {e}"
-            
+        with self.pool.connection() as conn:
+            try:
+                cursor = conn.cursor()
+
+                # Insert into stock_strategy table
+                serialized_params = json.dumps(strategy_params, sort_keys=True)
+                cursor.execute(INSERT_STRATEGY, (ticker, strategy.getName(), serialized_params))
+
+                # If the strategy already exists, nothing is inserted so return an error message
+                if cursor.rowcount == 0:
+                    conn.rollback()
+                    return f"Failed to insert strategy {strategy_name} for {ticker}. This strategy might already exist with the given parameters."
+
+                conn.commit()
+                self.invalidateStrategyIndex()
+                return None
+
+            except sqlite3.Error as e:
+                conn.rollback()
+                return f"Error inserting strategy for {ticker}: {e}"
+
 
     def getStockStrategyId(self, strategy, strategy_params):
         """
         given a unique ticker, strategy, and strategy_params combination, returns the stock_strategy_id
         """
-        try:
-            ticker = strategy.getTicker()
-            strategy_name = strategy.getName()
-            cursor = self.conn.cursor()
-            serialized_params = json.dumps(strategy_params, sort_keys=True)
-            cursor.execute("""
-            SELECT id FROM stock_strategy
-            WHERE ticker = ? AND strategy = ? AND params = ?;
-            """, (ticker, strategy_name, serialized_params))
-            result = cursor.fetchone()
-            return result[0] if result else None
-        
-        except sqlite3.Error as e:
-            print("Error retrieving stock strategy ID: ", e)
-            return None
+        with self.pool.connection() as conn:
+            try:
+                ticker = strategy.getTicker()
+                strategy_name = strategy.getName()
+                serialized_params = json.dumps(strategy_params, sort_keys=True)
+                result = conn.execute(SELECT_STRATEGY_ID, (ticker, strategy_name, serialized_params)).fetchone()
+                return result[0] if result else None
+
+            except sqlite3.Error as e:
+                print("Error retrieving stock strategy ID: ", e)
+                return None
 
     def getStockStrategy(self, stock_strategy_id):
         """
         Given a stock_strategy_id, returns the stock strategy
         """
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-            SELECT ticker, strategy, params, time_stamp FROM stock_strategy
-            WHERE id = ?;
-            """, (stock_strategy_id,))
-            result = cursor.fetchone()
+        with self.pool.connection() as conn:
+            try:
+                result = conn.execute(SELECT_STRATEGY, (stock_strategy_id,)).fetchone()
 
-            ticker = result[0]
-            strategy = result[1]
-            params = json.loads(result[2])
+                ticker = result[0]
+                strategy = result[1]
+                params = json.loads(result[2])
 
-            return (ticker, strategy, params)
-        except sqlite3.Error as e:
-            print("Error retrieving stock strategy: ", e)
-            return None
+                return (ticker, strategy, params)
+            except sqlite3.Error as e:
+                print("Error retrieving stock strategy: ", e)
+                return None
 
 
     def getAllStockStrategies(self):
         """
-        Returns all stock strategies in the database
-        """
-        query = """
-        SELECT id, ticker, strategy, params FROM stock_strategy;
+        Returns all stock strategies in the database, grouped by ticker.
+        The result is cached until a strategy is inserted or removed, including by another process,
+        and is shared between callers so it must not be modified
         """
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute(query)
-            result = cursor.fetchall()
+        with self.pool.connection() as conn:
+            try:
+                table_version = conn.execute(SELECT_STRATEGY_TABLE_VERSION).fetchone()
+                cached_index = DBHandler._strategy_indexes.get(self.db_path)
+                if cached_index is not None and cached_index[0] == table_version:
+                    return cached_index[1]
+
+                result = conn.execute(SELECT_ALL_STRATEGIES).fetchall()
 
-            stock_strategies = {}
-            for row in result:
-                id = row[0]
-                ticker = row[1]
-                strategy = row[2]
-                params = json.loads(row[3])
+                stock_strategies = {}
+                for row in result:
+                    id = row[0]
+                    ticker = row[1]
+                    strategy = row[2]
+                    params = json.loads(row[3])
 
-                if ticker not in stock_strategies:
-                    stock_strategies[ticker] = []
-                
-                stock_strategies[ticker].append((id,strategy, params))
+                    if ticker not in stock_strategies:
+                        stock_strategies[ticker] = []
 
-            return stock_strategies
-        except sqlite3.Error as e:
-            print("Error retrieving all stock strategies: ", e)
-            return None
+                    stock_strategies[ticker].append((id,strategy, params))
+
+                with DBHandler._lock:
+                    DBHandler._strategy_indexes[self.db_path] = (table_version, stock_strategies)
+                return stock_strategies
+            except sqlite3.Error as e:
+                print("Error retrieving all stock strategies: ", e)
+                return None
 
 
 
@@ -153,16 +295,106 @@ class DBHandler:
         """
         Given a stock-strategy id, removes the stock strategy from the database.
         """
-        try:
+        with self.pool.connection() as conn:
+            try:
+                cursor = conn.cursor()
+
+                # Delete from stock_strategy table
+                cursor.execute(DELETE_STRATEGY, (stock_strategy_id,))
+
+                # Delete the cached backtests of the strategy
+                cursor.execute(DELETE_STRATEGY_BACKTEST_RESULTS, (stock_strategy_id,))
+                cursor.execute(DELETE_STRATEGY_SNAPSHOT, (stock_strategy_id,))
+
+                conn.commit()
+                self.invalidateStrategyIndex()
+            except sqlite3.Error as e:
+                conn.rollback()
+
+    def getBacktestResult(self, stock_strategy_id, data_fingerprint, initial_cash, fees):
+        """
+        Returns the cached (stats, equity) of a backtest, or None if this backtest has not been run before
+        """
+        with self.pool.connection() as conn:
+            try:
+                result = conn.execute(SELECT_BACKTEST_RESULT, (stock_strategy_id, data_fingerprint, initial_cash, fees)).fetchone()
+                return (pkl.loads(result[0]), pkl.loads(result[1])) if result else None
+
+            except sqlite3.Error as e:
+                print("Error retrieving backtest result: ", e)
+                return None
+
+    def insertBacktestResult(self, stock_strategy_id, data_fingerprint, initial_cash, fees, stats, equity):
+        """
+        Caches the stats and equity curve of a backtest, replacing any existing result for the same inputs
+        """
+        with self.pool.connection() as conn:
+            try:
+                conn.execute(INSERT_BACKTEST_RESULT, (stock_strategy_id, data_fingerprint, initial_cash, fees, pkl.dumps(stats), pkl.dumps(equity)))
+                conn.commit()
+
+            except sqlite3.Error as e:
+                conn.rollback()
+                print("Error inserting backtest result: ", e)
+
+    def removeStaleBacktestResults(self, stock_strategy_id, data_fingerprint):
+        """
+        Removes the cached backtests of a stock strategy that were run on a different version of the stock data,
+        which happens once the stock data is refreshed
+        """
+        with self.pool.connection() as conn:
+            try:
+                conn.execute(DELETE_STALE_BACKTEST_RESULTS, (stock_strategy_id, data_fingerprint))
+                conn.commit()
+
+            except sqlite3.Error as e:
+                conn.rollback()
+                print("Error removing stale backtest results: ", e)
 
-            cursor = self.conn.cursor()
+    def getStrategySnapshot(self, stock_strategy_id):
+        """
+        Returns the precomputed snapshot of a stock strategy as a dictionary, or None if it has not been computed
+        """
+        with self.pool.connection() as conn:
+            try:
+                result = conn.execute(SELECT_SNAPSHOT, (stock_strategy_id,)).fetchone()
+                if result is None:
+                    return None
+                columns = ["input_key", "data_fingerprint", "last_bar_date", "current_signal", "last_signal", "last_signal_date",
+                           "total_return", "indicators", "seconds", "time_stamp"]
+                snapshot = dict(zip(columns, result))
+                snapshot["indicators"] = pkl.loads(snapshot["indicators"])
+                return snapshot
 
-            # Delete from stock_strategy table
-            cursor.execute("""
-            DELETE FROM stock_strategy WHERE id = ?;
-            """, (stock_strategy_id,))
+            except sqlite3.Error as e:
+                print("Error retrieving strategy snapshot: ", e)
+                return None
+
+    def getSnapshotInputKeys(self):
+        """
+        Returns the input key of every precomputed snapshot, keyed by stock_strategy_id
+        """
+        with self.pool.connection() as conn:
+            try:
+                return dict(conn.execute(SELECT_SNAPSHOT_INPUT_KEYS).fetchall())
+
+            except sqlite3.Error as e:
+                print("Error retrieving snapshot input keys: ", e)
+                return {}
+
+    def insertStrategySnapshots(self, snapshots):
+        """
+        Stores precomputed snapshots, each a dictionary with the columns of strategy_snapshot, replacing older snapshots
+        of the same stock strategies. The snapshots are written in one transaction
+        """
+        rows = [(snapshot["stock_strategy_id"], snapshot["input_key"], snapshot["data_fingerprint"], snapshot["last_bar_date"],
+                 snapshot["current_signal"], snapshot["last_signal"], snapshot["last_signal_date"], snapshot["total_return"],
+                 pkl.dumps(snapshot["indicators"]), snapshot["seconds"]) for snapshot in snapshots]
+        with self.pool.connection() as conn:
+            try:
+                conn.executemany(INSERT_SNAPSHOT, rows)
+                conn.commit()
 
-            self.conn.commit()
-        except sqlite3.Error as e:
-            self.conn.rollback()
-            
+            except sqlite3.Error as e:
+                conn.rollback()
+                print("Error inserting strategy snapshots: ", e)
@@ -0,0 +1,284 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from data.PriceStore import PriceStore
+
+class PricePanel:
+    """
+    Daily OHLCV data of many tickers aligned on one shared date index, held as a dates × tickers float array per field
+    with NaN where a ticker has no bar, and a mask of the bars that exist.
+    A panel given a directory keeps its arrays in memory-mapped files there, so opening it reads no price data,
+    and new days and tickers are appended in place. Without a directory the arrays are held in memory
+    """
+    FIELDS = ("Open", "High", "Low", "Close", "Volume")
+    METADATA_FILE = "panel.json"
+    # Rows and columns are allocated ahead of use, so appending a day or a ticker rarely has to resize the arrays
+    MIN_ROW_CAPACITY = 256
+    MIN_COLUMN_CAPACITY = 16
+    # StockData.refreshData replaces the bars of the compact window, the latest 100 bars, so these are reread from the cache
+    REVISED_BARS = 100
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self.tickers = []
+        self.columns = {}
+        # Fetch time of the cached data each ticker was last read from
+        self.fetch_dates = {}
+        self.length = 0
+        self.row_capacity = 0
+        self.column_capacity = 0
+        # Arrays sized to the capacity: "Date" holds the dates as int64 nanoseconds, "Mask" the bars that exist
+        self.arrays = {}
+        if directory is not None and os.path.exists(self.getMetadataPath()):
+            self.openArrays()
+        else:
+            self.resize(self.MIN_ROW_CAPACITY, self.MIN_COLUMN_CAPACITY)
+
+    @classmethod
+    def fromStocks(cls, stocks, directory=None):
+        """
+        Builds a panel from StockData objects, leaving out those that failed to load
+        """
+        panel = cls(directory)
+        loaded = [stock for stock in stocks if stock.getError() is None]
+        panel.append({stock.getTicker(): stock.getDataFrame() for stock in loaded},
+                     {stock.getTicker(): stock.getFetchTime() for stock in loaded})
+        return panel
+
+    @classmethod
+    def fromPriceStore(cls, price_store, tickers, directory=None):
+        """
+        Opens the panel in directory, or creates one, and brings the given tickers up to date with the price store
+        """
+        panel = cls(directory)
+        panel.update(price_store, tickers)
+        return panel
+
+    # Storage
+
+    def getMetadataPath(self):
+        return os.path.join(self.directory, self.METADATA_FILE)
+
+    def getArrayPath(self, name):
+        return os.path.join(self.directory, f"{name}.bin")
+
+    def getArraySpecs(self, row_capacity, column_capacity):
+        """
+        Returns the shape, dtype and fill value of every array for the given capacity
+        """
+        specs = {"Date": ((row_capacity,), np.int64, 0), "Mask": ((row_capacity, column_capacity), np.bool_, False)}
+        for field in self.FIELDS:
+            specs[field] = ((row_capacity, column_capacity), np.float64, np.nan)
+        return specs
+
+    def openArrays(self):
+        with open(self.getMetadataPath()) as file:
+            metadata = json.load(file)
+        self.tickers = metadata["tickers"]
+        self.columns = {ticker: column for column, ticker in enumerate(self.tickers)}
+        self.fetch_dates = {ticker: PriceStore.parseFetchTime(date) for ticker, date in metadata["fetch_dates"].items()}
+        self.length = metadata["length"]
+        self.row_capacity = metadata["row_capacity"]
+        self.column_capacity = metadata["column_capacity"]
+        for name, (shape, dtype, _) in self.getArraySpecs(self.row_capacity, self.column_capacity).items():
+            self.arrays[name] = np.memmap(self.getArrayPath(name), dtype=dtype, mode="r+", shape=shape)
+
+    def resize(self, row_capacity, column_capacity, row_positions=None):
+        """
+        Reallocates the arrays with a new capacity and copies the stored rows into them, at row_positions if given.
+        Files are written alongside the old ones and then swapped in
+        """
+        rows = np.arange(self.length) if row_positions is None else row_positions
+        columns = len(self.tickers)
+        for name, (shape, dtype, fill) in self.getArraySpecs(row_capacity, column_capacity).items():
+            if self.directory is None:
+                array = np.full(shape, fill, dtype=dtype)
+            else:
+                os.makedirs(self.directory, exist_ok=True)
+                array = np.memmap(self.getArrayPath(name) + ".tmp", dtype=dtype, mode="w+", shape=shape)
+                array[...] = fill
+            if name in self.arrays:
+                old = self.arrays[name]
+                if name == "Date":
+                    array[rows] = old[:self.length]
+                else:
+                    array[rows, :columns] = old[:self.length, :columns]
+            if self.directory is not None:
+                array.flush()
+                del array
+                os.replace(self.getArrayPath(name) + ".tmp", self.getArrayPath(name))
+                array = np.memmap(self.getArrayPath(name), dtype=dtype, mode="r+", shape=shape)
+            self.arrays[name] = array
+        self.row_capacity = row_capacity
+        self.column_capacity = column_capacity
+
+    def flush(self):
+        """
+        Writes the arrays and then the metadata, so a panel interrupted while appending keeps its previous length
+        """
+        if self.directory is None:
+            return
+        for array in self.arrays.values():
+            array.flush()
+        metadata = {
+            "tickers": self.tickers,
+            "fetch_dates": {ticker: date.isoformat() for ticker, date in self.fetch_dates.items()},
+            "length": self.length,
+            "row_capacity": self.row_capacity,
+            "column_capacity": self.column_capacity,
+        }
+        temporary_path = self.getMetadataPath() + ".tmp"
+        with open(temporary_path, "w") as file:
+            json.dump(metadata, file)
+        os.replace(temporary_path, self.getMetadataPath())
+
+    # Appending
+
+    @staticmethod
+    def growCapacity(capacity, required):
+        while capacity < required:
+            capacity += max(capacity // 2, 1)
+        return capacity
+
+    def append(self, frames, fetch_dates=None):
+        """
+        Adds the bars in frames, a dictionary mapping tickers to OHLCV dataframes indexed by date, and records the fetch date
+        of each ticker given in fetch_dates. Bars on a date the ticker already has replace the stored ones.
+        New dates after the last row and new tickers are appended in place, while a date falling between existing rows
+        makes the arrays be rewritten with the row inserted
+        """
+        frames = {ticker: frame for ticker, frame in frames.items() if len(frame)}
+        if not frames:
+            return
+        dates = self.arrays["Date"][:self.length]
+        incoming = np.unique(np.concatenate([self.toNanoseconds(frame.index) for frame in frames.values()]))
+        new_dates = np.setdiff1d(incoming, dates, assume_unique=True)
+        new_tickers = [ticker for ticker in frames if ticker not in self.columns]
+
+        row_capacity = self.growCapacity(self.row_capacity, self.length + len(new_dates))
+        column_capacity = self.growCapacity(self.column_capacity, len(self.tickers) + len(new_tickers))
+        if len(new_dates) and self.length and new_dates[0] < dates[-1]:
+            merged = np.union1d(dates, new_dates)
+            self.resize(row_capacity, column_capacity, row_positions=np.searchsorted(merged, dates))
+            self.arrays["Date"][:len(merged)] = merged
+        else:
+            if (row_capacity, column_capacity) != (self.row_capacity, self.column_capacity):
+                self.resize(row_capacity, column_capacity)
+            self.arrays["Date"][self.length:self.length + len(new_dates)] = new_dates
+        self.length += len(new_dates)
+
+        for ticker in new_tickers:
+            self.columns[ticker] = len(self.tickers)
+            self.tickers.append(ticker)
+
+        dates = self.arrays["Date"][:self.length]
+        for ticker, frame in frames.items():
+            column = self.columns[ticker]
+            rows = np.searchsorted(dates, self.toNanoseconds(frame.index))
+            for field in self.FIELDS:
+                if field in frame:
+                    self.arrays[field][rows, column] = frame[field].to_numpy(dtype=np.float64)
+            self.arrays["Mask"][rows, column] = True
+        self.fetch_dates.update(fetch_dates or {})
+        self.flush()
+
+    def update(self, price_store, tickers):
+        """
+        Appends the cached data of the tickers whose cache was written since the panel last read it.
+        A ticker already in the panel only has its bars from REVISED_BARS before its last bar onwards read from the cache
+        """
+        frames = {}
+        fetch_dates = {}
+        for ticker in tickers:
+            fetch_date = price_store.loadFetchDate(ticker)
+            if fetch_date is None or self.fetch_dates.get(ticker) == fetch_date:
+                continue
+            start = None
+            if ticker in self.columns:
+                bar_rows = np.flatnonzero(self.arrays["Mask"][:self.length, self.columns[ticker]])
+                if len(bar_rows):
+                    start = pd.Timestamp(self.arrays["Date"][bar_rows[max(len(bar_rows) - self.REVISED_BARS, 0)]])
+            fetch_dates[ticker], frames[ticker] = price_store.load(ticker, start=start, columns=list(self.FIELDS))
+        self.append(frames, fetch_dates)
+
+    @staticmethod
+    def toNanoseconds(index):
+        return np.asarray(index.values.astype("datetime64[ns]").view(np.int64))
+
+    # Reading
+
+    def getTickers(self):
+        return list(self.tickers)
+
+    def getDates(self):
+        return pd.DatetimeIndex(self.arrays["Date"][:self.length].view("datetime64[ns]"), name="Date")
+
+    def getField(self, field):
+        """
+        Returns the dates × tickers array of a field, a view of the panel's storage with NaN where a ticker has no bar
+        """
+        return self.arrays[field][:self.length, :len(self.tickers)]
+
+    def getMask(self):
+        """
+        Returns the dates × tickers boolean array which is True where a ticker has a bar
+        """
+        return self.arrays["Mask"][:self.length, :len(self.tickers)]
+
+    def getFieldFrame(self, field):
+        return pd.DataFrame(self.getField(field), index=self.getDates(), columns=self.tickers, copy=False)
+
+    def getTickerFrame(self, ticker):
+        """
+        Returns the bars of one ticker as a dataframe shaped like StockData's
+        """
+        column = self.columns[ticker]
+        rows = np.flatnonzero(self.arrays["Mask"][:self.length, column])
+        return pd.DataFrame({field: self.arrays[field][rows, column] for field in self.FIELDS}, index=self.getDates()[rows])
+
+    def getBarCounts(self):
+        return self.getMask().sum(axis=0)
+
+    def getBars(self, field, bars):
+        """
+        Returns (values, rows) for the last bars bars of every ticker, aligned on each ticker's own bars rather than on dates,
+        so a ticker's windows are not split by the days only other tickers traded. Both are bars × tickers arrays, the last
+        row holding each ticker's latest bar. rows gives the panel row of each value, and tickers with fewer bars are padded
+        at the start with NaN values and rows of -1
+        """
+        mask = self.getMask()
+        values = np.full((bars, len(self.tickers)), np.nan)
+        rows = np.full((bars, len(self.tickers)), -1, dtype=np.int64)
+        # Only the rows from where every ticker has the bars needed, or all of its bars, onwards are searched
+        needed = np.minimum(self.getBarCounts(), bars)
+        start = max(self.length - bars, 0)
+        while start > 0 and (mask[start:].sum(axis=0) < needed).any():
+            start = max(start - max(self.length - start, bars), 0)
+
+        # Bars of every ticker in row order, grouped by ticker, numbered from the ticker's latest bar
+        columns, bar_rows = np.nonzero(mask[start:].T)
+        bar_rows += start
+        group_ends = np.cumsum(np.bincount(columns, minlength=len(self.tickers)))
+        bars_after = group_ends[columns] - 1 - np.arange(len(columns))
+        kept = bars_after < bars
+        columns, bar_rows, bars_after = columns[kept], bar_rows[kept], bars_after[kept]
+        values[bars - 1 - bars_after, columns] = self.getField(field)[bar_rows, columns]
+        rows[bars - 1 - bars_after, columns] = bar_rows
+        return values, rows
+
+    def toDateFrame(self, values, rows):
+        """
+        Places bars × tickers values aligned like getBars back on the panel's dates, as a dates × tickers dataframe
+        holding NaN where a value has no bar
+        """
+        frame = np.full((self.length, len(self.tickers)), np.nan)
+        present = rows >= 0
+        frame[rows[present], np.nonzero(present)[1]] = values[present]
+        return pd.DataFrame(frame, index=self.getDates(), columns=self.tickers)
+
+    def getMemoryUsage(self):
+        """
+        Returns the bytes used by the arrays, including the capacity reserved for later appends
+        """
+        return sum(array.nbytes for array in self.arrays.values())
@@ -0,0 +1,127 @@
+import pyarrow as pa
+import pandas as pd
+import numpy as np
+import pickle as pkl
+import os
+import datetime
+
+class PriceStore:
+    """
+    Columnar on-disk store for daily OHLCV history, holding one uncompressed Arrow IPC file per ticker.
+    Files are memory-mapped when read, so loading does not copy the price data, and a date range
+    or a subset of the columns can be read without touching the rest of the file.
+    The time the data was fetched is kept in the file's schema metadata.
+    """
+    DATE_COLUMN = "Date"
+    FETCH_DATE_KEY = b"fetchDate"
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def getPath(self, ticker):
+        return "{directory}/{symbol}.arrow".format(directory=self.directory, symbol=ticker)
+
+    def getPicklePath(self, ticker):
+        return "{directory}/{symbol}.pkl".format(directory=self.directory, symbol=ticker)
+
+    def getTickers(self):
+        """
+        Returns the tickers stored in the directory, including those still in the old pickle format
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        names = [os.path.splitext(name) for name in os.listdir(self.directory)]
+        return sorted({ticker for ticker, extension in names if extension in (".arrow", ".pkl")})
+
+    def exists(self, ticker):
+        if not os.path.exists(self.getPath(ticker)):
+            self.migratePickle(ticker)
+        return os.path.exists(self.getPath(ticker))
+
+    def save(self, ticker, dataframe, fetch_date):
+        """
+        Writes the stock data for a ticker, replacing any existing file atomically.
+        fetch_date is the timezone-aware time the data was fetched at, or a date for data without a fetch time
+        """
+        columns = {self.DATE_COLUMN: pa.array(dataframe.index.values.astype("datetime64[ns]"))}
+        for column in dataframe.columns:
+            columns[column] = pa.array(dataframe[column].to_numpy(dtype=np.float64))
+        table = pa.table(columns).replace_schema_metadata({self.FETCH_DATE_KEY: fetch_date.isoformat().encode()})
+
+        os.makedirs(self.directory, exist_ok=True)
+        temporary_path = self.getPath(ticker) + ".tmp"
+        with pa.OSFile(temporary_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(temporary_path, self.getPath(ticker))
+
+    def readTable(self, ticker):
+        """
+        Memory-maps the Arrow file for a ticker. The returned table references the mapped file rather than a copy of it
+        """
+        source = pa.memory_map(self.getPath(ticker), "r")
+        return pa.ipc.open_file(source).read_all()
+
+    def loadPickle(self, ticker):
+        """
+        Returns (fetch_date, dataframe) from the old pickle cache of a ticker, or None if it has none
+        """
+        pickle_path = self.getPicklePath(ticker)
+        if not os.path.exists(pickle_path):
+            return None
+        with open(pickle_path, 'rb') as stock_data:
+            cached_content = pkl.load(stock_data)
+        return cached_content['fetchDate'], cached_content['Data']
+
+    def loadFetchDate(self, ticker):
+        """
+        Returns the time the stored data was fetched at (see parseFetchTime), or None if the ticker is not stored
+        """
+        if not self.exists(ticker):
+            return None
+        schema = pa.ipc.open_file(pa.memory_map(self.getPath(ticker), "r")).schema
+        return self.getFetchDate(schema)
+
+    def getFetchDate(self, schema):
+        return self.parseFetchTime(schema.metadata[self.FETCH_DATE_KEY].decode())
+
+    @staticmethod
+    def parseFetchTime(text):
+        """
+        Parses a stored fetch time: a timezone-aware timestamp, or a date for data cached before fetch times were kept
+        """
+        if "T" in text:
+            return pd.Timestamp(text)
+        return datetime.date.fromisoformat(text)
+
+    def load(self, ticker, start=None, end=None, columns=None):
+        """
+        Returns (fetch_date, dataframe) for a ticker, or None if it is not stored.
+        start and end are optional inclusive date bounds and columns an optional list of the columns to read.
+        The dataframe's columns are read-only views of the mapped file
+        """
+        if not self.exists(ticker):
+            return None
+        table = self.readTable(ticker)
+        fetch_date = self.getFetchDate(table.schema)
+
+        if start is not None or end is not None:
+            dates = table.column(self.DATE_COLUMN).to_numpy()
+            first = 0 if start is None else int(np.searchsorted(dates, np.datetime64(pd.Timestamp(start)), side="left"))
+            last = len(dates) if end is None else int(np.searchsorted(dates, np.datetime64(pd.Timestamp(end)), side="right"))
+            table = table.slice(first, max(last - first, 0))
+
+        if columns is None:
+            columns = [name for name in table.column_names if name != self.DATE_COLUMN]
+        index = pd.DatetimeIndex(table.column(self.DATE_COLUMN).to_numpy(), name=self.DATE_COLUMN)
+        dataframe = pd.DataFrame({column: table.column(column).to_numpy() for column in columns}, index=index, copy=False)
+        return fetch_date, dataframe
+
+    def migratePickle(self, ticker):
+        """
+        Converts a cache file written by the old pickle cache into the columnar format.
+        The pickle is left in place, and is ignored once the Arrow file exists
+        """
+        cached_content = self.loadPickle(ticker)
+        if cached_content is not None:
+            self.save(ticker, cached_content[1], cached_content[0])
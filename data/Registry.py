@@ -0,0 +1,100 @@
+from data.Data import StockData
+from strategy.factory import StrategyFactory
+from diagnostics.profiler import profiler
+from collections import OrderedDict
+import threading
+import json
+import os
+
+class StockRegistry:
+    """
+    Process-wide in-memory cache of StockData objects and built strategies, shared by every Streamlit session
+    so reruns of a page do not reload the stock from disk or rebuild its strategy.
+    Stock entries are keyed by ticker and dropped when the ticker's cache file changes on disk or its data is out of date.
+    Strategy entries are keyed by ticker, fetch date, data fingerprint, strategy name and parameters.
+    The least recently used entries are evicted once their data takes up more than max_bytes
+    """
+    def __init__(self, max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.strategy_factory = StrategyFactory()
+        # key -> (value, size in bytes, cache file modification time)
+        self._entries = OrderedDict()
+        self._current_bytes = 0
+        self._lock = threading.Lock()
+
+    def getCacheFileVersion(self, ticker):
+        path = StockData.price_store.getPath(ticker)
+        return os.stat(path).st_mtime_ns if os.path.exists(path) else None
+
+    def _get(self, key, ticker):
+        """
+        Returns the value stored under key if it is still valid for the ticker's cache file, otherwise None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[2] != self.getCacheFileVersion(ticker):
+                self._invalidateTicker(ticker)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def _put(self, key, ticker, value, size):
+        with self._lock:
+            if key in self._entries:
+                self._current_bytes -= self._entries[key][1]
+            self._entries[key] = (value, size, self.getCacheFileVersion(ticker))
+            self._current_bytes += size
+            while self._current_bytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._current_bytes -= evicted_size
+
+    def _invalidateTicker(self, ticker):
+        for key in [key for key in self._entries if key[1] == ticker]:
+            self._current_bytes -= self._entries.pop(key)[1]
+
+    def invalidate(self, ticker):
+        """
+        Drops the stock and every strategy cached for a ticker
+        """
+        with self._lock:
+            self._invalidateTicker(ticker)
+
+    def getStockData(self, ticker):
+        """
+        Returns the StockData for a ticker, loading it only if it is not cached, the cache file changed or the data is out of date.
+        Stocks that failed to load are returned but not kept, so the next call tries again
+        """
+        key = ("stock", ticker)
+        stock = self._get(key, ticker)
+        if stock is not None and stock.isCacheUpToDate(stock.getFetchTime(), stock.getLastBarDate(stock.getDataFrame())):
+            profiler.count("registry.stock_hits")
+            return stock
+        profiler.count("registry.stock_misses")
+
+        stock = StockData(ticker)
+        if stock.getError() is None:
+            self._put(key, ticker, stock, int(stock.getDataFrame().memory_usage(index=True).sum()))
+        return stock
+
+    def getStrategy(self, ticker, strategy_name, params):
+        """
+        Returns (stock, strategy) where strategy is built with the given parameters over the ticker's current stock data.
+        strategy is None if the stock data could not be loaded, in which case stock.getError() gives the reason
+        """
+        stock = self.getStockData(ticker)
+        if stock.getError() is not None:
+            return stock, None
+
+        key = ("strategy", ticker, stock.getFetchTime(), stock.getFingerprint(), strategy_name, json.dumps(params, sort_keys=True, default=str))
+        strategy = self._get(key, ticker)
+        profiler.count("registry.strategy_hits" if strategy is not None else "registry.strategy_misses")
+        if strategy is None:
+            strategy = self.strategy_factory.createStrategy(strategy_name, stock, **params)
+            self._put(key, ticker, strategy, int(strategy.getData().memory_usage(index=True).sum()))
+        return stock, strategy
+
+
+# Registry shared by every session in the Streamlit process
+stock_registry = StockRegistry()
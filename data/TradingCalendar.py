@@ -0,0 +1,97 @@
+import datetime
+import pandas as pd
+from pandas.tseries.holiday import (AbstractHolidayCalendar, Holiday, GoodFriday, USMartinLutherKingJr, USPresidentsDay,
+                                    USMemorialDay, USLaborDay, USThanksgivingDay, nearest_workday, sunday_to_monday)
+from pandas.tseries.offsets import CustomBusinessDay
+
+
+class NYSEHolidayCalendar(AbstractHolidayCalendar):
+    """
+    Full day holidays of the New York Stock Exchange. New Year's Day falling on a Saturday is not observed on the Friday before
+    """
+    rules = [
+        Holiday("New Year's Day", month=1, day=1, observance=sunday_to_monday),
+        USMartinLutherKingJr,
+        USPresidentsDay,
+        GoodFriday,
+        USMemorialDay,
+        Holiday("Juneteenth", month=6, day=19, start_date="2022-06-19", observance=nearest_workday),
+        Holiday("Independence Day", month=7, day=4, observance=nearest_workday),
+        USLaborDay,
+        USThanksgivingDay,
+        Holiday("Christmas Day", month=12, day=25, observance=nearest_workday),
+    ]
+
+
+class TradingCalendar:
+    """
+    Trading sessions of the New York Stock Exchange, used to tell whether cached daily data can be missing a bar.
+    A session's daily bar is expected to be published publish_delay after the session closes.
+    Early closes are treated as full sessions, which only delays when their bar is expected
+    """
+    TIMEZONE = "America/New_York"
+
+    def __init__(self, close_time=datetime.time(16, 0), publish_delay=pd.Timedelta(minutes=30), retry_interval=pd.Timedelta(hours=1)):
+        """
+        retry_interval is how long data fetched after a bar was due, but without it, counts as current before it is fetched again
+        """
+        self.close_time = close_time
+        self.publish_delay = publish_delay
+        self.retry_interval = retry_interval
+        self.session_offset = CustomBusinessDay(calendar=NYSEHolidayCalendar())
+
+    def now(self):
+        return pd.Timestamp.now(tz=self.TIMEZONE)
+
+    def toMarketTime(self, time):
+        time = pd.Timestamp(time)
+        return time.tz_localize(self.TIMEZONE) if time.tzinfo is None else time.tz_convert(self.TIMEZONE)
+
+    def getPublishTime(self, session):
+        """
+        Returns the time the daily bar of a session is expected to be published
+        """
+        return self.toMarketTime(pd.Timestamp.combine(pd.Timestamp(session).date(), self.close_time)) + self.publish_delay
+
+    def isTradingDay(self, date):
+        date = pd.Timestamp(date).normalize()
+        return self.session_offset.is_on_offset(date)
+
+    def getSessions(self, start, end):
+        """
+        Returns the dates of the trading sessions between start and end inclusive
+        """
+        return pd.date_range(pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize(), freq=self.session_offset)
+
+    def getLatestPublishedSession(self, now=None):
+        """
+        Returns the date of the most recent session whose daily bar should be published by now
+        """
+        now = self.toMarketTime(self.now() if now is None else now)
+        # A bar published after midnight belongs to the day before, so work on the time the bar it covers closed
+        latest_close = (now - self.publish_delay).tz_localize(None)
+        session = latest_close.normalize()
+        if not self.isTradingDay(session) or latest_close.time() < self.close_time:
+            session = session - self.session_offset
+        return session.date()
+
+    def isDataCurrent(self, fetch_time, last_bar_date=None, now=None):
+        """
+        Daily data is current when it already has the latest published session's bar, or when it was fetched on a later day,
+        since refetching cannot return a bar the API did not have then. Weekends and holidays add no sessions,
+        so data fetched before them stays current through them.
+        Data fetched after the bar was due, but published late by the API, is current for retry_interval after it was fetched,
+        so it is not fetched again on every call until the bar appears. fetch_time may be a date for data cached without a fetch time
+        """
+        now = self.toMarketTime(self.now() if now is None else now)
+        latest_session = self.getLatestPublishedSession(now)
+        if last_bar_date is not None and pd.Timestamp(last_bar_date).date() >= latest_session:
+            return True
+        if not isinstance(fetch_time, datetime.datetime):
+            return fetch_time > latest_session
+        fetch_time = self.toMarketTime(fetch_time)
+        if fetch_time.date() > latest_session:
+            return True
+        return fetch_time >= self.getPublishTime(latest_session) and now - fetch_time < self.retry_interval
+
+trading_calendar = TradingCalendar()
@@ -0,0 +1,173 @@
+from collections import deque
+from contextlib import nullcontext
+from functools import wraps
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+
+logger = logging.getLogger("trading_tool.profiling")
+
+# Returned by span() while profiling is off, so a disabled span costs one attribute check
+_DISABLED_SPAN = nullcontext()
+
+
+class Span:
+    """
+    Times one stage, records its peak traced memory when memory tracing is on, and reports itself to the profiler on exit
+    """
+    def __init__(self, profiler, name, fields):
+        self.profiler = profiler
+        self.name = name
+        self.fields = fields
+
+    def __enter__(self):
+        stack = self.profiler.getStack()
+        self.parent = stack[-1] if stack else None
+        stack.append(self)
+        self.child_peak = 0
+        self.trace_memory = tracemalloc.is_tracing()
+        if self.trace_memory:
+            self.start_memory, peak_before = tracemalloc.get_traced_memory()
+            # Resetting the peak hides the parent's peak so far, so hand it to the parent before measuring this span
+            if self.parent is not None:
+                self.parent.child_peak = max(self.parent.child_peak, peak_before)
+            tracemalloc.reset_peak()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        duration = time.perf_counter() - self.start
+        peak_memory = None
+        if self.trace_memory and tracemalloc.is_tracing():
+            absolute_peak = max(tracemalloc.get_traced_memory()[1], self.child_peak)
+            peak_memory = max(0, absolute_peak - self.start_memory)
+            if self.parent is not None:
+                self.parent.child_peak = max(self.parent.child_peak, absolute_peak)
+        self.profiler.getStack().pop()
+        self.profiler.record(self.name, duration, peak_memory, self.parent.name if self.parent else None,
+                             self.fields, failed=exc_type is not None)
+        return False
+
+
+class Profiler:
+    """
+    Lightweight instrumentation of the stages of the tool: data fetching and loading, strategy preprocessing, signal generation,
+    backtests and optimisation. Stages are wrapped in spans, with the span context manager or the timed decorator,
+    and events such as cache hits are tallied with count.
+    Every finished span is logged as a JSON line on the trading_tool.profiling logger and aggregated per stage.
+    When the profiler is disabled spans and counters return immediately, so the instrumentation can stay in place
+    """
+    def __init__(self, enabled=False, trace_memory=False, max_records=1000):
+        self.enabled = enabled
+        self.records = deque(maxlen=max_records)
+        self.stages = {}
+        self.counters = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        if trace_memory:
+            self.setTraceMemory(True)
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def disable(self):
+        self.enabled = False
+
+    def setTraceMemory(self, trace_memory):
+        """
+        Turns tracemalloc on or off. Tracing records the peak memory of each span but slows allocation heavy code down
+        """
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def isTracingMemory(self):
+        return tracemalloc.is_tracing()
+
+    def getStack(self):
+        """
+        Returns the calling thread's stack of open spans
+        """
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def span(self, name, **fields):
+        """
+        Context manager timing the stage called name. The fields, such as the ticker, are included in its log record
+        """
+        if not self.enabled:
+            return _DISABLED_SPAN
+        return Span(self, name, fields)
+
+    def timed(self, name):
+        """
+        Decorator wrapping every call of a function in a span
+        """
+        def decorator(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with Span(self, name, {}):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count(self, name, amount=1):
+        """
+        Adds amount to the counter called name
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record(self, name, duration, peak_memory, parent, fields, failed=False):
+        record = {"stage": name, "seconds": duration, "peak_memory_bytes": peak_memory, "parent": parent, "failed": failed}
+        record.update(fields)
+        with self._lock:
+            self.records.append(record)
+            stage = self.stages.setdefault(name, {"calls": 0, "total_seconds": 0.0, "max_seconds": 0.0, "peak_memory_bytes": None})
+            stage["calls"] += 1
+            stage["total_seconds"] += duration
+            stage["max_seconds"] = max(stage["max_seconds"], duration)
+            if peak_memory is not None:
+                stage["peak_memory_bytes"] = max(stage["peak_memory_bytes"] or 0, peak_memory)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(record, default=str))
+
+    def getRecords(self):
+        """
+        Returns the most recent span records, oldest first
+        """
+        with self._lock:
+            return list(self.records)
+
+    def getStageSummary(self):
+        """
+        Returns the calls, total and maximum seconds and peak memory of every stage, keyed by stage name
+        """
+        with self._lock:
+            return {name: dict(stage) for name, stage in self.stages.items()}
+
+    def getCounters(self):
+        with self._lock:
+            return dict(self.counters)
+
+    def reset(self):
+        with self._lock:
+            self.records.clear()
+            self.stages.clear()
+            self.counters.clear()
+
+
+# Profiler shared by the whole process. Set TRADING_TOOL_PROFILE=1 to enable it at start up, and TRADING_TOOL_PROFILE=memory
+# to trace memory as well
+profiler = Profiler(enabled=os.environ.get("TRADING_TOOL_PROFILE", "") in ("1", "memory"),
+                    trace_memory=os.environ.get("TRADING_TOOL_PROFILE", "") == "memory")
@@ -0,0 +1,213 @@
+"""
+Headless batch runner that precomputes every stored stock strategy, so the pages only read the results.
+
+    python -m jobs.precompute
+    python -m jobs.precompute --workers 4 --force
+
+The stock data of every ticker in the stock_strategy table is brought up to date through BulkStockLoader. Each ticker's
+strategies are then computed on a process pool: the current and most recent signals, the last bars of the indicators,
+and a backtest with the View page's default settings. The results are stored in the strategy_snapshot and backtest_result tables.
+A strategy is skipped when its snapshot was computed from the same data, parameters and backtest settings,
+so running the job again does no work until the data changes
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from data.BulkLoader import BulkStockLoader
+from data.DatabaseHandler import DBHandler
+from strategy.factory import StrategyFactory
+from backtest.Backtest import Backtester
+from diagnostics.profiler import profiler
+
+# Backtest settings matching the defaults of the View page sliders, so its Run Backtest button finds the cached result
+DEFAULT_INITIAL_CASH = 1000
+DEFAULT_FEES = 2.0
+# Number of bars of indicator values kept in each snapshot
+INDICATOR_TAIL_BARS = 5
+
+# Stocks loaded by the parent process, inherited by the workers of the pool
+_worker_stocks = None
+
+
+def _initialiseWorker(stocks):
+    global _worker_stocks
+    _worker_stocks = stocks
+
+
+def createInputKey(data_fingerprint, strategy_name, params, initial_cash, fees):
+    """
+    Hash of everything a snapshot is computed from
+    """
+    inputs = json.dumps([data_fingerprint, strategy_name, params, float(initial_cash), float(fees)], sort_keys=True, default=str)
+    return hashlib.blake2b(inputs.encode(), digest_size=16).hexdigest()
+
+
+def computeSnapshot(stock, stock_strategy_id, strategy_name, params, input_key, initial_cash, fees, strategy_factory):
+    """
+    Builds the strategy and returns its snapshot, along with the stats and equity curve of its backtest
+    """
+    start = time.perf_counter()
+    strategy = strategy_factory.createStrategy(strategy_name, stock, **params)
+    signals = strategy.generateSignalSeries()
+    nonzero = np.flatnonzero(signals.to_numpy())
+    portfolio = Backtester(strategy).run(initial_cash, fees)
+    stats, equity = portfolio.stats(), portfolio.value()
+
+    snapshot = {
+        "stock_strategy_id": stock_strategy_id,
+        "input_key": input_key,
+        "data_fingerprint": stock.getFingerprint(),
+        "last_bar_date": str(signals.index[-1].date()),
+        "current_signal": int(signals.iloc[-1]),
+        "last_signal": int(signals.iloc[nonzero[-1]]) if len(nonzero) else None,
+        "last_signal_date": str(signals.index[nonzero[-1]].date()) if len(nonzero) else None,
+        "total_return": float(portfolio.total_return()),
+        "indicators": strategy.getData().tail(INDICATOR_TAIL_BARS),
+        "seconds": time.perf_counter() - start,
+    }
+    return snapshot, stats, equity
+
+
+def precomputeTicker(task):
+    """
+    Computes the snapshots of one ticker's strategies whose inputs changed. task is (ticker, strategies, input_keys, initial_cash, fees, force),
+    where strategies are the ticker's (stock_strategy_id, strategy_name, params) and input_keys the stored key of each snapshot.
+    Returns a report of the ticker with the computed snapshots and backtests. errors lists every failure of the ticker,
+    and error joins them, or is None when there were none
+    """
+    ticker, strategies, input_keys, initial_cash, fees, force = task
+    start = time.perf_counter()
+    report = {"ticker": ticker, "computed": [], "skipped": 0, "errors": [], "error": None, "seconds": 0.0}
+    stock = _worker_stocks[ticker]
+    if stock.getError():
+        report["errors"].append(stock.getError())
+        report["error"] = stock.getError()
+        return report
+
+    strategy_factory = StrategyFactory()
+    data_fingerprint = stock.getFingerprint()
+    for stock_strategy_id, strategy_name, params in strategies:
+        input_key = createInputKey(data_fingerprint, strategy_name, params, initial_cash, fees)
+        if not force and input_keys.get(stock_strategy_id) == input_key:
+            report["skipped"] += 1
+            continue
+        try:
+            with profiler.span("precompute.strategy", ticker=ticker, strategy=strategy_name):
+                report["computed"].append(computeSnapshot(stock, stock_strategy_id, strategy_name, params, input_key,
+                                                          initial_cash, fees, strategy_factory))
+        except Exception as e:
+            report["errors"].append(f"Error computing {strategy_name} {params}: {e}")
+    if report["errors"]:
+        report["error"] = "; ".join(report["errors"])
+    report["seconds"] = time.perf_counter() - start
+    return report
+
+
+class PrecomputeRunner:
+    """
+    Refreshes the stock data of every stored stock strategy and precomputes its snapshot and backtest.
+    Tickers are computed in parallel on max_workers processes, and all database writes are made by the calling process
+    """
+    def __init__(self, database_client=None, max_workers=None, initial_cash=DEFAULT_INITIAL_CASH, fees=DEFAULT_FEES,
+                 loader=None):
+        self.database_client = database_client if database_client is not None else DBHandler()
+        self.max_workers = max_workers
+        self.initial_cash = initial_cash
+        self.fees = fees
+        # Seconds spent loading the stock data in the last run, shared by all of its tickers
+        self.load_seconds = 0.0
+        self.loader = loader if loader is not None else BulkStockLoader()
+
+    def run(self, force=False, tickers=None):
+        """
+        Precomputes the stored strategies, only those of the given tickers if any are given, and returns a report per ticker.
+        force recomputes strategies whose inputs have not changed
+        """
+        stock_strategies = self.database_client.getAllStockStrategies() or {}
+        if tickers:
+            stock_strategies = {ticker: entries for ticker, entries in stock_strategies.items() if ticker in tickers}
+        if not stock_strategies:
+            return []
+
+        load_start = time.perf_counter()
+        with profiler.span("precompute.load", tickers=len(stock_strategies)):
+            stocks = self.loader.load(stock_strategies.keys())
+        self.load_seconds = time.perf_counter() - load_start
+
+        input_keys = self.database_client.getSnapshotInputKeys()
+        tasks = [(ticker, entries, {entry[0]: input_keys.get(entry[0]) for entry in entries}, self.initial_cash, self.fees, force)
+                 for ticker, entries in stock_strategies.items()]
+
+        reports = []
+        for report in self.computeTickers(stocks, tasks):
+            self.saveReport(report)
+            reports.append(report)
+        return reports
+
+    def computeTickers(self, stocks, tasks):
+        """
+        Yields the report of each ticker as it is computed, on a process pool when max_workers is greater than 1
+        """
+        if not self.max_workers or self.max_workers <= 1 or len(tasks) == 1:
+            _initialiseWorker(stocks)
+            yield from map(precomputeTicker, tasks)
+            return
+
+        # Fork shares the loaded stocks with the workers instead of pickling them
+        context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+        with ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context, initializer=_initialiseWorker,
+                                 initargs=(stocks,)) as executor:
+            yield from executor.map(precomputeTicker, tasks)
+
+    def saveReport(self, report):
+        """
+        Stores the snapshots and backtests of a ticker's report, removing backtests run on older versions of its data
+        """
+        if not report["computed"]:
+            return
+        snapshots = [snapshot for snapshot, _, _ in report["computed"]]
+        self.database_client.insertStrategySnapshots(snapshots)
+        for snapshot, stats, equity in report["computed"]:
+            self.database_client.removeStaleBacktestResults(snapshot["stock_strategy_id"], snapshot["data_fingerprint"])
+            self.database_client.insertBacktestResult(snapshot["stock_strategy_id"], snapshot["data_fingerprint"],
+                                                      self.initial_cash, self.fees, stats, equity)
+
+
+def printReports(reports, load_seconds):
+    print(f"{'ticker':<10} {'computed':>8} {'skipped':>8} {'seconds':>8}  error")
+    for report in reports:
+        print(f"{report['ticker']:<10} {len(report['computed']):>8} {report['skipped']:>8} {report['seconds']:>8.2f}  {report['error'] or ''}")
+    computed = sum(len(report["computed"]) for report in reports)
+    skipped = sum(report["skipped"] for report in reports)
+    failed = sum(report["error"] is not None for report in reports)
+    print(f"{computed} strategies computed, {skipped} unchanged, {failed} ticker(s) with errors, {load_seconds:.2f}s loading data")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precomputes the signals, indicators and backtests of every stored stock strategy")
+    parser.add_argument("--workers", type=int, default=None, help="processes computing tickers in parallel")
+    parser.add_argument("--tickers", nargs="+", help="only precompute these tickers")
+    parser.add_argument("--force", action="store_true", help="recompute strategies whose inputs have not changed")
+    parser.add_argument("--initial-cash", type=float, default=DEFAULT_INITIAL_CASH)
+    parser.add_argument("--fees", type=float, default=DEFAULT_FEES, help="commission in percent")
+    parser.add_argument("--db", default=None, help="database path, the tool's database by default")
+    args = parser.parse_args(argv)
+
+    runner = PrecomputeRunner(DBHandler(args.db), max_workers=args.workers, initial_cash=args.initial_cash, fees=args.fees)
+    try:
+        reports = runner.run(force=args.force, tickers=args.tickers)
+    finally:
+        runner.loader.close()
+    printReports(reports, runner.load_seconds)
+    return 1 if any(report["error"] for report in reports) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
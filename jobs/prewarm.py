@@ -0,0 +1,86 @@
+"""
+Scheduled job that pre-warms the stock data cache before the trading session, so no page has to wait on an API fetch.
+
+    python -m jobs.prewarm --at 07:00
+    python -m jobs.prewarm --once --precompute
+
+Every day at the configured time (New York time by default) the stock data of every ticker in the stock_strategy table is loaded
+through BulkStockLoader. Stale tickers are fetched and written to the cache, while tickers whose cache is still current under
+the trading calendar are read from disk without using the API quota. With --precompute the stored strategies are
+precomputed as well (see jobs.precompute)
+"""
+import argparse
+import sys
+import time
+
+import schedule
+
+from data.BulkLoader import BulkStockLoader
+from data.DatabaseHandler import DBHandler
+from data.TradingCalendar import TradingCalendar
+from jobs.precompute import PrecomputeRunner, printReports
+from diagnostics.profiler import profiler
+
+DEFAULT_TIME = "07:00"
+
+# Longest sleep between checks for due jobs, so the loop notices the system clock changing
+MAX_SLEEP_SECONDS = 60
+
+
+def prewarm(database_client, loader):
+    """
+    Loads the stock data of every ticker with a stored strategy, refreshing the stale ones.
+    Returns a dictionary mapping each ticker to its error, or None if it loaded
+    """
+    tickers = list((database_client.getAllStockStrategies() or {}).keys())
+    with profiler.span("prewarm.load", tickers=len(tickers)):
+        stocks = loader.load(tickers)
+    return {ticker: stock.getError() for ticker, stock in stocks.items()}
+
+
+def runJob(database_client, loader, precompute=False, workers=None):
+    start = time.perf_counter()
+    if precompute:
+        runner = PrecomputeRunner(database_client, max_workers=workers, loader=loader)
+        reports = runner.run()
+        printReports(reports, runner.load_seconds)
+        errors = {report["ticker"]: report["error"] for report in reports}
+    else:
+        errors = prewarm(database_client, loader)
+        for ticker, error in errors.items():
+            print(f"{ticker:<10} {error or 'ok'}")
+    failed = sum(error is not None for error in errors.values())
+    print(f"Pre-warmed {len(errors) - failed} of {len(errors)} tickers in {time.perf_counter() - start:.2f}s", flush=True)
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-warms the stock data cache for every stored strategy on a daily schedule")
+    parser.add_argument("--at", default=DEFAULT_TIME, help="time of day to run, as HH:MM")
+    parser.add_argument("--timezone", default=TradingCalendar.TIMEZONE, help="timezone of --at")
+    parser.add_argument("--once", action="store_true", help="run once now and exit instead of scheduling")
+    parser.add_argument("--precompute", action="store_true", help="also precompute the stored strategies")
+    parser.add_argument("--workers", type=int, default=None, help="processes precomputing tickers in parallel")
+    parser.add_argument("--requests-per-minute", type=int, default=75, help="Alpha Vantage request quota")
+    parser.add_argument("--db", default=None, help="database path, the tool's database by default")
+    args = parser.parse_args(argv)
+
+    database_client = DBHandler(args.db)
+    loader = BulkStockLoader(requests_per_minute=args.requests_per_minute)
+    try:
+        if args.once:
+            return 1 if runJob(database_client, loader, args.precompute, args.workers) else 0
+
+        job = schedule.every().day.at(args.at, args.timezone).do(runJob, database_client, loader, args.precompute, args.workers)
+        print(f"Pre-warming every day at {args.at} {args.timezone}, next run at {job.next_run}", flush=True)
+        while True:
+            schedule.run_pending()
+            time.sleep(min(max(schedule.idle_seconds() or 0, 1), MAX_SLEEP_SECONDS))
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        loader.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,6 @@
 import streamlit as st
 from page import Page
-from apps import add_stock_data, view_stock_data
+from apps import add_stock_data, view_stock_data, screener
 from data.DatabaseHandler import DBHandler
 
 
@@ -13,6 +13,7 @@ database_client = DBHandler()
 stock_strategies = database_client.getAllStockStrategies()
 
 page.addPage("Add Stock Data", add_stock_data.app)
+page.addPage("Screener", screener.app)
 
 for ticker, ticker_entry in stock_strategies.items():
 
@@ -1,4 +1,6 @@
 import streamlit as st
+import pandas as pd
+from diagnostics.profiler import profiler
 
 class Page:
     """
@@ -25,6 +27,10 @@ class Page:
         })
     
     def run(self):
+        # The diagnostics controls are read before the page runs so they apply to this run
+        diagnostics = st.sidebar.expander("Diagnostics", expanded=False)
+        self.addDiagnosticsControls(diagnostics)
+
         # Display the navigation bar containing the different pages
         app = st.selectbox(
             'Navigation',
@@ -32,4 +38,48 @@ class Page:
             format_func=lambda page: page['title']
         )
         # Run the selected page passing the parameters if they exist
-        app['func'](**app['function_parameters']) if app["function_parameters"] else app['func']()
\ No newline at end of file
+        app['func'](**app['function_parameters']) if app["function_parameters"] else app['func']()
+
+        self.showDiagnostics(diagnostics)
+
+    def addDiagnosticsControls(self, container):
+        """
+        Adds the switches for the process-wide profiler to the diagnostics panel. The profiler is shared by every session,
+        so it is only changed when a switch is flipped, and the switches otherwise show its current state
+        """
+        st.session_state["diagnostics_enabled"] = profiler.enabled
+        st.session_state["diagnostics_trace_memory"] = profiler.isTracingMemory()
+        with container:
+            st.checkbox("Enable profiling", key="diagnostics_enabled", on_change=self.onProfilingChanged)
+            st.checkbox("Trace memory", key="diagnostics_trace_memory", on_change=self.onTraceMemoryChanged,
+                        disabled=not profiler.enabled)
+            if st.button("Reset", key="diagnostics_reset"):
+                profiler.reset()
+
+    @staticmethod
+    def onProfilingChanged():
+        profiler.enable(st.session_state["diagnostics_enabled"])
+
+    @staticmethod
+    def onTraceMemoryChanged():
+        profiler.setTraceMemory(st.session_state["diagnostics_trace_memory"])
+
+    def showDiagnostics(self, container):
+        """
+        Shows the time and memory spent in each stage, the counters and the most recent spans recorded by the profiler
+        """
+        with container:
+            if not profiler.enabled:
+                st.caption("Profiling is off")
+                return
+            stages = profiler.getStageSummary()
+            if stages:
+                st.dataframe(pd.DataFrame.from_dict(stages, orient="index").sort_values("total_seconds", ascending=False),
+                             use_container_width=True)
+            counters = profiler.getCounters()
+            if counters:
+                st.dataframe(pd.Series(counters, name="count"), use_container_width=True)
+            records = profiler.getRecords()[-20:]
+            if records:
+                st.caption("Most recent spans")
+                st.dataframe(pd.DataFrame(records[::-1]), use_container_width=True)
\ No newline at end of file
@@ -1,4 +1,5 @@
 from strategy.strategies import SMACrossOverStrategy, MACDStrategy, BollingerBandStrategy
+from strategy.panel import SMACrossOverPanelStrategy, MACDPanelStrategy, BollingerBandPanelStrategy
 
 class StrategyFactory:
     """
@@ -11,6 +12,12 @@ class StrategyFactory:
             "SMA Crossover Strategy": SMACrossOverStrategy,
             "MACD Strategy": MACDStrategy
         }
+        # Vectorised versions of the strategies running over every ticker of a PricePanel
+        self._panel_strategy_map = {
+            "Bollinger Band Strategy": BollingerBandPanelStrategy,
+            "SMA Crossover Strategy": SMACrossOverPanelStrategy,
+            "MACD Strategy": MACDPanelStrategy
+        }
 
     def createStrategy(self, strategy_name, stock, **strategy_params):
         """
@@ -19,6 +26,12 @@ class StrategyFactory:
         """
         return self._strategy_map[strategy_name](stock, **strategy_params)
 
+    def createPanelStrategy(self, strategy_name, panel, **strategy_params):
+        """
+        Creates the panel version of a strategy, calculating its signals for every ticker in the panel with the same parameters
+        """
+        return self._panel_strategy_map[strategy_name](panel, **strategy_params)
+
     def getStrategyNames(self):
         """
         Returns a list of the strategy names available in the factory.
@@ -0,0 +1,89 @@
+from collections import OrderedDict
+from diagnostics.profiler import profiler
+import threading
+
+class IndicatorCache:
+    """
+    Memoizes indicator series so strategies built over the same stock data do not repeat identical rolling computations.
+    Entries are keyed by (ticker, data fingerprint, indicator, window) and the least recently used entries are evicted
+    once the cached series take up more than max_bytes.
+    """
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._current_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def getOrCompute(self, key, compute):
+        """
+        Returns the cached series for the key, calling compute() to create it on a miss.
+        The returned series is shared between strategies and must not be modified
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                profiler.count("indicator_cache.hits")
+                return self._entries[key]
+            self._misses += 1
+        profiler.count("indicator_cache.misses")
+
+        value = compute()
+        # Protect the shared values from accidental in-place modification
+        value.values.flags.writeable = False
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = value
+                self._current_bytes += self.getSize(value)
+                self._evict()
+        return value
+
+    @staticmethod
+    def getSize(value):
+        """
+        Returns the bytes held by a cached series or dataframe, including its index
+        """
+        size = value.memory_usage(index=True, deep=False)
+        return int(size.sum()) if hasattr(size, "sum") else int(size)
+
+    def _evict(self):
+        """
+        Drops the least recently used entries until the cache fits in max_bytes.
+        The most recent entry is always kept, even if it is larger than the bound on its own
+        """
+        while self._current_bytes > self.max_bytes and len(self._entries) > 1:
+            _, value = self._entries.popitem(last=False)
+            self._current_bytes -= self.getSize(value)
+            self._evictions += 1
+
+    def setMaxBytes(self, max_bytes):
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._current_bytes = 0
+
+    def getStats(self):
+        """
+        Returns the hit/miss counters and the current size of the cache
+        """
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "entries": len(self._entries),
+                "bytes": self._current_bytes,
+                "max_bytes": self.max_bytes
+            }
+
+
+# Cache shared by every strategy in the process
+indicator_cache = IndicatorCache()
@@ -0,0 +1,494 @@
+import numpy as np
+
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+except ImportError:
+    numba = None
+    NUMBA_AVAILABLE = False
+
+# Kernels run compiled with numba when it is installed, otherwise the NumPy implementations are used
+DEFAULT_BACKEND = "numba" if NUMBA_AVAILABLE else "numpy"
+BACKENDS = ("numba", "numpy") if NUMBA_AVAILABLE else ("numpy",)
+
+
+def jit(function):
+    """
+    Compiles a kernel loop with numba, caching the machine code on disk so later processes skip the compilation.
+    Without numba the loop is left as plain Python and is never selected
+    """
+    if NUMBA_AVAILABLE:
+        return numba.njit(cache=True, nogil=True)(function)
+    return function
+
+
+def getBackend(backend=None):
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Kernel backend {backend} is not available, choose one of {BACKENDS}")
+    return backend
+
+
+def asFloatArray(values):
+    """
+    Returns the values as a contiguous float64 array, without copying when they already are one
+    """
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+def checkWindow(window):
+    if window < 1:
+        raise ValueError("window must be an integer 1 or greater")
+
+
+def spanToAlpha(span):
+    """
+    Smoothing factor of an EMA over span bars, calculated the same way as pandas' ewm(span=span)
+    """
+    return 1.0 / (1.0 + (span - 1) / 2.0)
+
+
+def emaWarmup(span, tolerance):
+    """
+    Number of bars after which the first value of an EMA over span bars has a weight of at most tolerance.
+    An EMA started that many bars before a bar differs there from one over the full history by at most tolerance times the gap,
+    at its start, between the price and the full history EMA, which is within the range of the prices
+    """
+    alpha = spanToAlpha(span)
+    if alpha >= 1.0:
+        return 0
+    return int(np.ceil(np.log(tolerance) / np.log(1.0 - alpha)))
+
+
+# Compiled loops. These mirror the online algorithms pandas uses for rolling(window).mean(), rolling(window).std()
+# and ewm(adjust=False).mean(), including their compensated summation, so the results match pandas exactly
+
+@jit
+def _rollingMeanLoop(values, window):
+    result = np.empty(len(values))
+    nobs = 0
+    neg_ct = 0
+    sum_x = 0.0
+    compensation_add = 0.0
+    compensation_remove = 0.0
+    run_length = 0
+    prev_value = values[0] if len(values) else 0.0
+    for i in range(len(values)):
+        if i >= window:
+            val = values[i - window]
+            if not np.isnan(val):
+                nobs -= 1
+                y = -val - compensation_remove
+                t = sum_x + y
+                compensation_remove = t - sum_x - y
+                sum_x = t
+                if val < 0:
+                    neg_ct -= 1
+
+        val = values[i]
+        if not np.isnan(val):
+            nobs += 1
+            y = val - compensation_add
+            t = sum_x + y
+            compensation_add = t - sum_x - y
+            sum_x = t
+            if val < 0:
+                neg_ct += 1
+            run_length = run_length + 1 if val == prev_value else 1
+            prev_value = val
+
+        if nobs >= window:
+            mean = sum_x / nobs
+            if run_length >= nobs:
+                mean = prev_value
+            elif neg_ct == 0 and mean < 0:
+                mean = 0.0
+            elif neg_ct == nobs and mean > 0:
+                mean = 0.0
+            result[i] = mean
+        else:
+            result[i] = np.nan
+    return result
+
+
+@jit
+def _rollingStdLoop(values, window):
+    result = np.empty(len(values))
+    nobs = 0
+    mean_x = 0.0
+    ssqdm_x = 0.0
+    compensation_add = 0.0
+    compensation_remove = 0.0
+    run_length = 0
+    prev_value = values[0] if len(values) else 0.0
+    for i in range(len(values)):
+        if i >= window:
+            val = values[i - window]
+            if not np.isnan(val):
+                nobs -= 1
+                if nobs:
+                    prev_mean = mean_x - compensation_remove
+                    y = val - compensation_remove
+                    t = y - mean_x
+                    compensation_remove = t + mean_x - y
+                    mean_x -= t / nobs
+                    ssqdm_x -= (val - prev_mean) * (val - mean_x)
+                else:
+                    mean_x = 0.0
+                    ssqdm_x = 0.0
+
+        val = values[i]
+        if not np.isnan(val):
+            run_length = run_length + 1 if val == prev_value else 1
+            prev_value = val
+            nobs += 1
+            prev_mean = mean_x - compensation_add
+            y = val - compensation_add
+            t = y - mean_x
+            compensation_add = t + mean_x - y
+            mean_x += t / nobs
+            ssqdm_x += (val - prev_mean) * (val - mean_x)
+
+        # Sample standard deviation (ddof = 1)
+        if nobs >= window and nobs > 1:
+            if run_length >= nobs:
+                result[i] = 0.0
+            else:
+                variance = ssqdm_x / (nobs - 1)
+                result[i] = np.sqrt(variance) if variance > 0 else 0.0
+        else:
+            result[i] = np.nan
+    return result
+
+
+@jit
+def _emaLoop(values, alpha):
+    result = np.empty(len(values))
+    if len(values) == 0:
+        return result
+    old_wt_factor = 1.0 - alpha
+    weighted = values[0]
+    nobs = 0 if np.isnan(weighted) else 1
+    result[0] = weighted if nobs else np.nan
+    old_wt = 1.0
+    for i in range(1, len(values)):
+        cur = values[i]
+        is_observation = not np.isnan(cur)
+        if is_observation:
+            nobs += 1
+        if not np.isnan(weighted):
+            # Missing values are not ignored: the weight of the old average keeps decaying across them
+            old_wt *= old_wt_factor
+            if is_observation:
+                if weighted != cur:
+                    weighted = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+                old_wt = 1.0
+        elif is_observation:
+            weighted = cur
+        result[i] = weighted if nobs else np.nan
+    return result
+
+
+# Loops over the columns of a 2D array of bars × series, used for panels of many tickers. A column may start with missing values,
+# which the 1D loops treat like the start of the series
+
+@jit
+def _rollingMeanColumnsLoop(values, window):
+    result = np.empty(values.shape)
+    for column in range(values.shape[1]):
+        result[:, column] = _rollingMeanLoop(np.ascontiguousarray(values[:, column]), window)
+    return result
+
+
+@jit
+def _rollingStdColumnsLoop(values, window):
+    result = np.empty(values.shape)
+    for column in range(values.shape[1]):
+        result[:, column] = _rollingStdLoop(np.ascontiguousarray(values[:, column]), window)
+    return result
+
+
+@jit
+def _emaColumnsLoop(values, alpha):
+    result = np.empty(values.shape)
+    for column in range(values.shape[1]):
+        result[:, column] = _emaLoop(np.ascontiguousarray(values[:, column]), alpha)
+    return result
+
+
+@jit
+def _crossedAboveLoop(fast, slow):
+    crossed = np.zeros(len(fast), dtype=np.bool_)
+    for i in range(1, len(fast)):
+        crossed[i] = fast[i - 1] < slow[i - 1] and fast[i] > slow[i]
+    return crossed
+
+
+@jit
+def _crossedBelowLoop(fast, slow):
+    crossed = np.zeros(len(fast), dtype=np.bool_)
+    for i in range(1, len(fast)):
+        crossed[i] = fast[i - 1] > slow[i - 1] and fast[i] < slow[i]
+    return crossed
+
+
+@jit
+def _thresholdSignalsLoop(close, lower, upper, oscillator, low_threshold, high_threshold):
+    signals = np.zeros(len(close), dtype=np.int64)
+    for i in range(1, len(close)):
+        if close[i - 1] < lower[i - 1] and oscillator[i - 1] < low_threshold:
+            signals[i] = 1
+        elif close[i - 1] > upper[i - 1] and oscillator[i - 1] > high_threshold:
+            signals[i] = -1
+    return signals
+
+
+# NumPy implementations, used when numba is not installed. Means and EMAs agree with the loops to within a few ulps. The two-pass
+# standard deviation accumulates less rounding than the online one, so it can differ from pandas by up to about 1e-8 of the price level,
+# which is a large relative difference only where the deviation is tiny (see tests/test_kernels.py for the pinned tolerance)
+
+def _rollingMeanNumpy(values, window):
+    result = np.full(values.shape, np.nan)
+    if window <= len(values):
+        # A window containing a missing value has fewer than window observations, so its mean is NaN as in pandas
+        result[window - 1:] = np.lib.stride_tricks.sliding_window_view(values, window, axis=0).mean(axis=-1)
+    return result
+
+
+def _rollingStdNumpy(values, window):
+    result = np.full(values.shape, np.nan)
+    if 1 < window <= len(values):
+        result[window - 1:] = np.lib.stride_tricks.sliding_window_view(values, window, axis=0).std(axis=-1, ddof=1)
+    return result
+
+
+def _emaNumpy(values, alpha):
+    observed = np.flatnonzero(~np.isnan(values))
+    if len(observed) == 0 or len(observed) != len(values) - observed[0]:
+        # Gaps after the first observation change the decay between observations, so leave them to the loop
+        return _emaLoop(values, alpha)
+
+    result = np.full(len(values), np.nan)
+    first = observed[0]
+    result[first] = values[first]
+    decay = (1.0 - alpha) / ((1.0 - alpha) + alpha)
+    gain = alpha / ((1.0 - alpha) + alpha)
+    if decay == 0:
+        result[first:] = values[first:]
+        return result
+
+    # Unrolled recurrence: within a block, ema[j] = decay^(j+1) * (ema_before + gain * sum(x[i] / decay^(i+1))).
+    # Blocks are short enough for the powers of decay to stay within floating point range
+    block_length = max(1, int(200 / -np.log10(decay)))
+    powers = decay ** np.arange(1, block_length + 1)
+    for block_start in range(first + 1, len(values), block_length):
+        block = values[block_start:block_start + block_length]
+        block_powers = powers[:len(block)]
+        result[block_start:block_start + len(block)] = block_powers * (result[block_start - 1] + gain * np.cumsum(block / block_powers))
+    return result
+
+
+def _emaColumnsNumpy(values, alpha):
+    result = np.empty(values.shape)
+    for column in range(values.shape[1]):
+        result[:, column] = _emaNumpy(np.ascontiguousarray(values[:, column]), alpha)
+    return result
+
+
+def _crossedAboveNumpy(fast, slow):
+    crossed = np.zeros(fast.shape, dtype=bool)
+    crossed[1:] = (fast[:-1] < slow[:-1]) & (fast[1:] > slow[1:])
+    return crossed
+
+
+def _crossedBelowNumpy(fast, slow):
+    crossed = np.zeros(fast.shape, dtype=bool)
+    crossed[1:] = (fast[:-1] > slow[:-1]) & (fast[1:] < slow[1:])
+    return crossed
+
+
+def _thresholdSignalsNumpy(close, lower, upper, oscillator, low_threshold, high_threshold):
+    buy = np.zeros(close.shape, dtype=bool)
+    sell = np.zeros(close.shape, dtype=bool)
+    buy[1:] = (close[:-1] < lower[:-1]) & (oscillator[:-1] < low_threshold)
+    sell[1:] = (close[:-1] > upper[:-1]) & (oscillator[:-1] > high_threshold)
+    return combineSignals(buy, sell)
+
+
+KERNELS = {
+    "numba": {
+        "rollingMean": _rollingMeanLoop,
+        "rollingStd": _rollingStdLoop,
+        "ema": _emaLoop,
+        "crossedAbove": _crossedAboveLoop,
+        "crossedBelow": _crossedBelowLoop,
+        "thresholdSignals": _thresholdSignalsLoop,
+        "rollingMeanColumns": _rollingMeanColumnsLoop,
+        "rollingStdColumns": _rollingStdColumnsLoop,
+        "emaColumns": _emaColumnsLoop,
+        # Signals only compare neighbouring bars, which NumPy already does in one pass over a 2D array
+        "crossedAboveColumns": _crossedAboveNumpy,
+        "crossedBelowColumns": _crossedBelowNumpy,
+        "thresholdSignalsColumns": _thresholdSignalsNumpy,
+    },
+    "numpy": {
+        "rollingMean": _rollingMeanNumpy,
+        "rollingStd": _rollingStdNumpy,
+        "ema": _emaNumpy,
+        "crossedAbove": _crossedAboveNumpy,
+        "crossedBelow": _crossedBelowNumpy,
+        "thresholdSignals": _thresholdSignalsNumpy,
+        # The NumPy rolling windows run along the first axis, so they handle 2D arrays directly
+        "rollingMeanColumns": _rollingMeanNumpy,
+        "rollingStdColumns": _rollingStdNumpy,
+        "emaColumns": _emaColumnsNumpy,
+        "crossedAboveColumns": _crossedAboveNumpy,
+        "crossedBelowColumns": _crossedBelowNumpy,
+        "thresholdSignalsColumns": _thresholdSignalsNumpy,
+    },
+}
+
+
+def getKernel(name, values, backend=None):
+    """
+    Returns the kernel for the values: the 1D kernel, or for a 2D array of bars × series the one running it over every column
+    """
+    return KERNELS[getBackend(backend)][name if values.ndim == 1 else name + "Columns"]
+
+
+def rollingMean(values, window, backend=None):
+    """
+    Mean of the last window values at every bar, NaN until a full window is available. Matches pandas' rolling(window).mean().
+    values may also be a 2D array of bars × series, whose columns are averaged independently
+    """
+    checkWindow(window)
+    values = asFloatArray(values)
+    return getKernel("rollingMean", values, backend)(values, window)
+
+
+def rollingStd(values, window, backend=None):
+    """
+    Sample standard deviation of the last window values at every bar. Matches pandas' rolling(window).std().
+    values may also be a 2D array of bars × series
+    """
+    checkWindow(window)
+    values = asFloatArray(values)
+    return getKernel("rollingStd", values, backend)(values, window)
+
+
+def ema(values, span, backend=None):
+    """
+    Exponential moving average over span bars, seeded with the first value. Matches pandas' ewm(span=span, adjust=False).mean()
+    """
+    return emaAlpha(values, spanToAlpha(span), backend)
+
+
+def emaAlpha(values, alpha, backend=None):
+    """
+    Exponential moving average with the smoothing factor alpha, seeded with the first value.
+    values may also be a 2D array of bars × series, each column seeded with its first observed value
+    """
+    values = asFloatArray(values)
+    return getKernel("ema", values, backend)(values, alpha)
+
+
+def rsi(close, window=14, wilder=False, backend=None):
+    """
+    Relative Strength Index of the closing prices. By default the gains and losses are averaged with simple moving averages
+    over window bars, as in Strategy.calculateRSI. With wilder=True they are smoothed with Wilder's method instead:
+    seeded with the simple average of the first window bars, then updated with a smoothing factor of 1 / window.
+    Bars where the price or the previous price is missing are skipped, like the dropped rows of a pandas diff.
+    close may also be a 2D array of bars × series, averaged with simple moving averages, whose columns are only missing prices at their start
+    """
+    checkWindow(window)
+    close = asFloatArray(close)
+    if close.ndim == 2:
+        if wilder:
+            raise ValueError("Wilder's smoothing is only supported for a single series")
+        return _rsiColumns(close, window, backend)
+    result = np.full(len(close), np.nan)
+    delta = np.diff(close)
+    observed = np.flatnonzero(~np.isnan(delta))
+    delta = delta[observed]
+
+    positive = np.where(delta > 0, delta, 0.0)
+    negative = np.where(delta < 0, delta, 0.0)
+    if wilder:
+        average_gain = wilderAverage(positive, window, backend)
+        average_loss = np.abs(wilderAverage(negative, window, backend))
+    else:
+        average_gain = rollingMean(positive, window, backend)
+        average_loss = np.abs(rollingMean(negative, window, backend))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        relative_strength = average_gain / average_loss
+        result[observed + 1] = 100.0 - (100.0 / (1.0 + relative_strength))
+    return result
+
+
+def _rsiColumns(close, window, backend=None):
+    """
+    RSI of every column of a 2D array. The missing price changes at the start of a column are kept as NaN rather than dropped,
+    and the rolling means give NaN until they have window observations, so each column matches the RSI of the series alone
+    """
+    delta = np.diff(close, axis=0)
+    missing = np.isnan(delta)
+    positive = np.where(missing, np.nan, np.where(delta > 0, delta, 0.0))
+    negative = np.where(missing, np.nan, np.where(delta < 0, delta, 0.0))
+    average_gain = rollingMean(positive, window, backend)
+    average_loss = np.abs(rollingMean(negative, window, backend))
+
+    result = np.full(close.shape, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result[1:] = 100.0 - (100.0 / (1.0 + average_gain / average_loss))
+    return result
+
+
+def wilderAverage(values, window, backend=None):
+    """
+    Wilder's smoothing: the simple average of the first window values, then an EMA with a smoothing factor of 1 / window
+    """
+    values = asFloatArray(values)
+    result = np.full(len(values), np.nan)
+    if window <= len(values):
+        seeded = values[window - 1:].copy()
+        seeded[0] = values[:window].mean()
+        result[window - 1:] = emaAlpha(seeded, 1.0 / window, backend)
+    return result
+
+
+def crossedAbove(fast, slow, backend=None):
+    """
+    Boolean array which is True on the bars where fast moves from below slow to above slow
+    """
+    fast = asFloatArray(fast)
+    return getKernel("crossedAbove", fast, backend)(fast, asFloatArray(slow))
+
+
+def crossedBelow(fast, slow, backend=None):
+    """
+    Boolean array which is True on the bars where fast moves from above slow to below slow
+    """
+    fast = asFloatArray(fast)
+    return getKernel("crossedBelow", fast, backend)(fast, asFloatArray(slow))
+
+
+def thresholdSignals(close, lower, upper, oscillator, low_threshold, high_threshold, backend=None):
+    """
+    Signals based on the previous bar: buy (1) when it closed below the lower band with the oscillator below low_threshold,
+    otherwise sell (-1) when it closed above the upper band with the oscillator above high_threshold, otherwise hold (0)
+    """
+    close = asFloatArray(close)
+    return getKernel("thresholdSignals", close, backend)(close, asFloatArray(lower), asFloatArray(upper), asFloatArray(oscillator),
+                                                         float(low_threshold), float(high_threshold))
+
+
+def combineSignals(buy, sell):
+    """
+    Combines buy and sell masks into an array of 1 (buy), -1 (sell) and 0 (hold).
+    Buy takes precedence, and the first bar is always a hold as it has no previous bar
+    """
+    signals = np.where(buy, 1, np.where(sell, -1, 0)).astype(np.int64)
+    if len(signals):
+        signals[0] = 0
+    return signals
@@ -0,0 +1,178 @@
+from abc import ABC, abstractmethod
+from strategy import kernels
+from strategy.strategies import Strategy
+from diagnostics.profiler import profiler
+
+class PanelStrategy(ABC):
+    """
+    Vectorised counterpart of a Strategy, calculating its indicators and signals for every ticker of a PricePanel in one pass
+    over bars × tickers arrays. Each ticker's indicators run over its own last num_days bars plus the same warmup as in
+    the Strategy, so a ticker's signals match those of its Strategy over the same data
+    """
+    ema_tolerance = Strategy.ema_tolerance
+
+    def __init__(self, panel, num_days=1500, bar_cache=None):
+        """
+        bar_cache is an optional dictionary shared by strategies over the same panel, holding the longest closing prices read
+        from it so far, so strategies needing no more bars than an earlier one do not read the panel again
+        """
+        self.panel = panel
+        self.num_days = num_days
+        # Closing prices aligned on each ticker's own bars, the last row holding every ticker's latest bar
+        self.close, self.rows = self.readClose(self.num_days + self.getLookback(), bar_cache)
+        # Indicator arrays for the last num_days bars of every ticker
+        self.indicators = {}
+        with profiler.span("panel.preprocess", strategy=self.getName(), tickers=len(panel.getTickers())):
+            self.preprocessData()
+
+    def readClose(self, bars, bar_cache=None):
+        if bar_cache is None:
+            return self.panel.getBars("Close", bars)
+        if "Close" not in bar_cache or len(bar_cache["Close"][0]) < bars:
+            bar_cache["Close"] = self.panel.getBars("Close", bars)
+        values, rows = bar_cache["Close"]
+        return values[-bars:], rows[-bars:]
+
+    def getTickers(self):
+        return self.panel.getTickers()
+
+    def getRows(self):
+        """
+        Returns the panel row of every bar of the num_days × tickers arrays, -1 for tickers with fewer bars
+        """
+        return self.rows[-self.num_days:]
+
+    def getClose(self):
+        return self.close[-self.num_days:]
+
+    def getIndicator(self, name):
+        return self.indicators[name]
+
+    def addIndicator(self, name, values):
+        self.indicators[name] = values[-self.num_days:]
+
+    def closeIndicator(self, kernel, warmup, *args):
+        """
+        Runs an indicator kernel over every ticker's closing prices of the last num_days bars and the warmup bars before them
+        """
+        return kernel(self.close[-(self.num_days + warmup):], *args)
+
+    def getEMAWarmup(self, window):
+        if self.ema_tolerance is None:
+            # Longer than any ticker's history, so EMAs run over every bar as in the Strategy
+            return len(self.panel.getDates())
+        return kernels.emaWarmup(window, self.ema_tolerance)
+
+    def getLastSignals(self):
+        """
+        Returns the signal of every ticker's latest bar
+        """
+        return self.generateSignalArray()[-1]
+
+    def generateSignalFrame(self):
+        """
+        Returns the signals as a dates × tickers dataframe, NaN on the dates a ticker has no bar or which are not in its last num_days bars
+        """
+        return self.panel.toDateFrame(self.generateSignalArray(), self.getRows())
+
+    @abstractmethod
+    def getName(self):
+        raise NotImplementedError()
+
+    @abstractmethod
+    def getLookback(self):
+        """
+        Returns the number of warmup bars the indicators need, as in the Strategy
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def preprocessData(self):
+        raise NotImplementedError()
+
+    @abstractmethod
+    def generateSignalArray(self):
+        """
+        Returns the num_days × tickers array of signals: 1 (buy), -1 (sell) or 0 (hold)
+        """
+        raise NotImplementedError()
+
+
+class SMACrossOverPanelStrategy(PanelStrategy):
+    def __init__(self, panel, short_window, long_window, num_days=1500, bar_cache=None):
+        self.short_window = short_window
+        self.long_window = long_window
+        super().__init__(panel, num_days, bar_cache)
+
+    def getName(self):
+        return "SMA Crossover Strategy"
+
+    def getLookback(self):
+        return max(self.short_window, self.long_window) - 1
+
+    def preprocessData(self):
+        self.addIndicator('SMA_short', self.closeIndicator(kernels.rollingMean, self.short_window - 1, self.short_window))
+        self.addIndicator('SMA_long', self.closeIndicator(kernels.rollingMean, self.long_window - 1, self.long_window))
+
+    def generateSignalArray(self):
+        short, long = self.indicators['SMA_short'], self.indicators['SMA_long']
+        return kernels.combineSignals(kernels.crossedAbove(short, long), kernels.crossedBelow(short, long))
+
+
+class MACDPanelStrategy(PanelStrategy):
+    def __init__(self, panel, short_window=12, long_window=26, signal_window=9, num_days=1500, bar_cache=None):
+        self.short_window = short_window
+        self.long_window = long_window
+        self.signal_window = signal_window
+        super().__init__(panel, num_days, bar_cache)
+
+    def getName(self):
+        return "MACD Strategy"
+
+    def getMACDWarmup(self):
+        return self.getEMAWarmup(max(self.short_window, self.long_window)) + self.getEMAWarmup(self.signal_window)
+
+    def getLookback(self):
+        return max(self.getEMAWarmup(200), self.getMACDWarmup())
+
+    def preprocessData(self):
+        self.addIndicator('EMA_200', self.closeIndicator(kernels.ema, self.getEMAWarmup(200), 200))
+        warmup = self.getMACDWarmup()
+        macd = self.closeIndicator(kernels.ema, warmup, self.short_window) - self.closeIndicator(kernels.ema, warmup, self.long_window)
+        self.addIndicator('MACD', macd)
+        self.addIndicator('Signal_line', kernels.ema(macd, self.signal_window))
+        self.addIndicator('MACD_histogram', self.indicators['MACD'] - self.indicators['Signal_line'])
+
+    def generateSignalArray(self):
+        macd, signal_line = self.indicators['MACD'], self.indicators['Signal_line']
+        close, ema_200 = self.getClose(), self.indicators['EMA_200']
+        buy = kernels.crossedAbove(macd, signal_line) & (close > ema_200)
+        sell = kernels.crossedBelow(macd, signal_line) & (close < ema_200)
+        return kernels.combineSignals(buy, sell)
+
+
+class BollingerBandPanelStrategy(PanelStrategy):
+    def __init__(self, panel, window=20, standard_deviations=2, num_days=1500, bar_cache=None):
+        self.window = window
+        self.standard_deviations = standard_deviations
+        self.RSI_threshold_high = 70
+        self.RSI_threshold_low = 30
+        super().__init__(panel, num_days, bar_cache)
+
+    def getName(self):
+        return "Bollinger Band Strategy"
+
+    def getLookback(self):
+        return max(self.window - 1, 14)
+
+    def preprocessData(self):
+        self.addIndicator('SMA', self.closeIndicator(kernels.rollingMean, self.window - 1, self.window))
+        self.addIndicator('SD', self.closeIndicator(kernels.rollingStd, self.window - 1, self.window))
+        # The bands are two standard deviations wide, as in BollingerBandStrategy
+        self.addIndicator('UB', self.indicators['SMA'] + (2 * self.indicators['SD']))
+        self.addIndicator('LB', self.indicators['SMA'] - (2 * self.indicators['SD']))
+        self.addIndicator('RSI', self.closeIndicator(kernels.rsi, 14, 14))
+
+    def generateSignalArray(self):
+        return kernels.thresholdSignals(self.getClose(), self.indicators['LB'], self.indicators['UB'], self.indicators['RSI'],
+                                        self.RSI_threshold_low, self.RSI_threshold_high)
@@ -0,0 +1,126 @@
+import json
+import threading
+import numpy as np
+import pandas as pd
+from data.Data import StockData
+from data.Panel import PricePanel
+from strategy.factory import StrategyFactory
+from diagnostics.profiler import profiler
+
+# Directory of the memory-mapped panel of every cached ticker, brought up to date with the stock data cache when loaded
+PANEL_DIRECTORY = "data/panel"
+
+SIGNAL_NAMES = {1: "Buy", -1: "Sell", 0: "Hold"}
+
+# Parameter sets screened when none are given, the defaults of the Add Stock Data page
+DEFAULT_PARAMETER_SETS = {
+    "SMA Crossover Strategy": [{"short_window": 10, "long_window": 50}],
+    "MACD Strategy": [{"short_window": 12, "long_window": 26, "signal_window": 9}],
+    "Bollinger Band Strategy": [{"window": 20, "standard_deviations": 2}],
+}
+
+# Sessions of the Streamlit process share the panel files, so only one of them updates the panel at a time
+_panel_lock = threading.Lock()
+
+
+def loadCachedPanel(price_store=None, directory=PANEL_DIRECTORY):
+    """
+    Opens the panel of every ticker in the stock data cache, appending the data cached since it was last loaded.
+    The cache is only read, not refreshed, so screened signals are as current as the cache (see jobs.prewarm)
+    """
+    price_store = price_store if price_store is not None else StockData.price_store
+    with _panel_lock:
+        with profiler.span("screener.load_panel"):
+            return PricePanel.fromPriceStore(price_store, price_store.getTickers(), directory)
+
+
+def formatParameters(params):
+    return ", ".join(f"{name}={value}" for name, value in params.items())
+
+
+class Screener:
+    """
+    Evaluates the signal of the latest bar of every ticker in a PricePanel for many strategies and parameter sets.
+    Each parameter set takes one vectorised pass over the last bars of every ticker, with the same warmup as the Strategy,
+    and the closing prices are read from the panel once and shared by every parameter set
+    """
+    # The latest bar's signal compares it with the bar before, so only the last two bars of signals are calculated
+    SIGNAL_BARS = 2
+
+    def __init__(self, panel, strategy_factory=None):
+        self.panel = panel
+        self.strategy_factory = strategy_factory if strategy_factory is not None else StrategyFactory()
+        self.bar_cache = {}
+        close, rows = panel.getBars("Close", 1)
+        # Date and closing price of every ticker's latest bar
+        self.last_close = close[0]
+        self.last_dates = panel.getDates()[rows[0]]
+
+    def getLastSignals(self, strategy_name, params):
+        """
+        Returns the signal of every ticker's latest bar for the strategy with the given parameters
+        """
+        with profiler.span("screener.strategy", strategy=strategy_name, tickers=len(self.panel.getTickers())):
+            strategy = self.strategy_factory.createPanelStrategy(strategy_name, self.panel, num_days=self.SIGNAL_BARS,
+                                                                 bar_cache=self.bar_cache, **params)
+            return strategy.getLastSignals()
+
+    def createTable(self, strategy_name, params, signals, columns):
+        """
+        Returns the rows of the screener table for the tickers in the given panel columns
+        """
+        return pd.DataFrame({
+            "Ticker": np.array(self.panel.getTickers(), dtype=object)[columns],
+            "Strategy": strategy_name,
+            "Parameters": formatParameters(params),
+            "Signal": [SIGNAL_NAMES[signal] for signal in signals[columns]],
+            "Last Bar": self.last_dates[columns].date,
+            "Close": self.last_close[columns],
+        })
+
+    def sortTable(self, tables):
+        """
+        Joins the tables with the buy and sell signals first
+        """
+        if not tables:
+            return pd.DataFrame(columns=["Ticker", "Strategy", "Parameters", "Signal", "Last Bar", "Close"])
+        table = pd.concat(tables, ignore_index=True)
+        order = np.lexsort((table["Ticker"].to_numpy(), table["Signal"].eq("Hold").to_numpy()))
+        return table.iloc[order].reset_index(drop=True)
+
+    def screen(self, parameter_sets=None, tickers=None):
+        """
+        Returns a table with the latest signal of every ticker for every parameter set. parameter_sets maps strategy names
+        to lists of parameter dictionaries, DEFAULT_PARAMETER_SETS by default, and tickers optionally limits the table to some tickers
+        """
+        parameter_sets = DEFAULT_PARAMETER_SETS if parameter_sets is None else parameter_sets
+        ticker_columns = {ticker: column for column, ticker in enumerate(self.panel.getTickers())}
+        columns = np.arange(len(ticker_columns)) if tickers is None else \
+            np.array([ticker_columns[ticker] for ticker in tickers if ticker in ticker_columns], dtype=np.int64)
+        tables = []
+        for strategy_name, params_list in parameter_sets.items():
+            for params in params_list:
+                tables.append(self.createTable(strategy_name, params, self.getLastSignals(strategy_name, params), columns))
+        return self.sortTable(tables)
+
+    def screenStockStrategies(self, stock_strategies):
+        """
+        Returns the screener table for stored stock strategies, given as returned by DBHandler.getAllStockStrategies.
+        Strategies sharing the same parameters are evaluated in one pass, and tickers missing from the panel are left out
+        """
+        ticker_columns = {ticker: column for column, ticker in enumerate(self.panel.getTickers())}
+        groups = {}
+        for ticker, entries in stock_strategies.items():
+            if ticker not in ticker_columns:
+                continue
+            for stock_strategy_id, strategy_name, params in entries:
+                key = (strategy_name, json.dumps(params, sort_keys=True))
+                groups.setdefault(key, (params, []))[1].append((stock_strategy_id, ticker_columns[ticker]))
+
+        tables = []
+        for (strategy_name, _), (params, members) in groups.items():
+            columns = np.array([column for _, column in members], dtype=np.int64)
+            table = self.createTable(strategy_name, params, self.getLastSignals(strategy_name, params), columns)
+            table.insert(0, "Stock Strategy ID", [stock_strategy_id for stock_strategy_id, _ in members])
+            tables.append(table)
+        return self.sortTable(tables)
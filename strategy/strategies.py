@@ -2,46 +2,188 @@ from abc import ABC, abstractmethod
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
-import copy
+import numpy as np
+from strategy.indicator_cache import indicator_cache
+from strategy import kernels
+from diagnostics.profiler import profiler
+from strategy.streaming import StreamingSMA, StreamingEMA, StreamingRSI, StreamingMACD, StreamingBollingerBands
 
 class Strategy(ABC):
     """
     Abstract class for a trading strategy that can be implemented by different strategies.
+    Indicators are calculated over the last num_days bars plus the warmup they need (see getLookback), not the full history
     """
+    # Weight below which the first value of an EMA is taken to have no effect (see kernels.emaWarmup), which sets how many
+    # bars of warmup an EMA is given. None calculates EMAs over the full history, as the other indicators are exact with their warmup
+    ema_tolerance = 1e-8
+
     def __init__(self,stock):
         self.stock = stock
         self.num_days = 1500
-        self.historical_data = copy.deepcopy(stock.getDataFrame())
-        self.preprocessData()
+        # The full price history is shared with the stock and every other strategy, so it is never modified here
+        self.price_data = stock.getDataFrame()
+        # Indicator columns for the last num_days bars, kept apart from the shared price data
+        self.indicators = {}
+        with profiler.span("strategy.preprocess", strategy=self.getName(), ticker=self.getTicker()):
+            self.preprocessData()
+        with profiler.span("strategy.materialise", strategy=self.getName(), ticker=self.getTicker()):
+            self.historical_data = self.materialiseData()
+        profiler.count("strategy.built")
+        # Streaming indicator state and the values of the last bar seen, created by startStreaming
+        self.streams = None
+        self.last_bar = None
     
     def getData(self):
         return self.historical_data
+
+    def addIndicator(self, name, values):
+        """
+        Stores the last num_days values of an indicator series in the indicator overlay
+        """
+        self.indicators[name] = values.iloc[-self.num_days:]
+
+    def materialiseData(self):
+        """
+        Joins the last num_days bars of the price data with the indicator overlay.
+        This is the only copy of the price data a strategy makes
+        """
+        price_window = self.price_data.iloc[-self.num_days:]
+        overlay = pd.DataFrame(self.indicators, index=price_window.index)
+        return pd.concat([price_window, overlay], axis=1)
     
     def getTicker(self):
         return self.stock.getTicker()
 
     def getDataSize(self):
-        return self.num_days
+        """
+        Returns the number of bars in historical_data, which is less than num_days for a stock with a shorter history
+        """
+        return len(self.historical_data)
 
     def generateSignalSeries(self):
+        """
+        Generates the signal for every bar in a single pass over the indicator columns.
+        Produces the same output as generateSignalSeriesIterative
+        """
+        return pd.Series(self.generateSignalArray(), index=self.historical_data.index[:])
+
+    def generateSignalSeriesIterative(self):
+        """
+        Reference implementation which calls generateSignal once per bar
+        """
         signals = [0]
         for i in range(1, len(self.historical_data)):
             signals.append(self.generateSignal(current_index=i))
         
         return pd.Series(signals, index=self.historical_data.index[:])
 
+    def generateSignal(self, current_index = -1):
+        """
+        Passing current index in data as optional argument for backtesting. 
+        For some current_index = i, prev = self.historical_data[i-1] and 
+        curr = self.historical_data[i]
+        """
+        curr = self.historical_data.iloc[current_index]
+        prev = self.historical_data.iloc[current_index-1]
+        return self.evaluateSignal(prev, curr)
+
+    def startStreaming(self):
+        """
+        Seeds the streaming indicators by replaying the end of the stock's price history the indicators need,
+        after which onBar evaluates each new bar in constant time without rebuilding the strategy
+        """
+        self.streams = self.createStreams()
+        self.last_bar = None
+        for close in self.price_data['Close'].to_numpy()[-(self.getLookback() + 1):]:
+            self.last_bar = self.updateStreams(close)
+
+    def onBar(self, bar):
+        """
+        Updates the streaming indicators with a new bar and returns its signal: 1 (buy), -1 (sell) or 0 (hold).
+        bar is a row with a 'Close' value, or the closing price itself. The signal is the one generateSignal would give
+        for the bar if it were appended to the price data, which itself is left unchanged
+        """
+        if self.streams is None:
+            self.startStreaming()
+        close = bar if np.isscalar(bar) else bar['Close']
+        prev, self.last_bar = self.last_bar, self.updateStreams(float(close))
+        if prev is None:
+            return 0
+        return self.evaluateSignal(prev, self.last_bar)
+
+    @staticmethod
+    def crossedAbove(fast, slow):
+        """
+        Returns a boolean array which is True on the bars where fast moves from below slow to above slow
+        """
+        return kernels.crossedAbove(fast, slow)
+
+    @staticmethod
+    def crossedBelow(fast, slow):
+        """
+        Returns a boolean array which is True on the bars where fast moves from above slow to below slow
+        """
+        return kernels.crossedBelow(fast, slow)
+
+    @staticmethod
+    def combineSignals(buy, sell):
+        """
+        Combines buy and sell masks into an array of 1 (buy), -1 (sell) and 0 (hold).
+        Buy takes precedence, matching the order of the checks in generateSignal
+        """
+        return kernels.combineSignals(buy, sell)
+
+    def getCachedIndicator(self, indicator, window, warmup, compute):
+        """
+        Returns the indicator from the shared indicator cache, computing it only if no other strategy
+        over the same stock data has already done so with the same warmup
+        """
+        key = (self.getTicker(), self.stock.getFingerprint(), indicator, window, self.num_days + warmup)
+        return indicator_cache.getOrCompute(key, compute)
+
+    def closeIndicator(self, kernel, warmup, *args):
+        """
+        Runs an indicator kernel over the closing prices of the last num_days bars and the warmup bars before them,
+        and returns the result as a series aligned with those bars
+        """
+        close = self.price_data['Close'].iloc[-(self.num_days + warmup):]
+        return pd.Series(kernel(close.to_numpy(), *args), index=close.index)
+
+    def getEMAWarmup(self, window):
+        """
+        Returns the number of warmup bars an EMA over window bars needs to converge to within ema_tolerance
+        """
+        if self.ema_tolerance is None:
+            return len(self.price_data)
+        return kernels.emaWarmup(window, self.ema_tolerance)
+
     def calculateSMA(self, window):
         """
         Calculates the Simple Moving Average over a given window
         """
-        return self.historical_data['Close'].rolling(window=window).mean()
+        return self.getCachedIndicator('SMA', window, window - 1, lambda: self.closeIndicator(kernels.rollingMean, window - 1, window))
     
-    def calculateEMA(self, window):
+    def calculateEMA(self, window, warmup=None):
         """
         Calculates a weighted average,
-        by giving more weight to the recent points in a window
+        by giving more weight to the recent points in a window.
+        By default it is given the warmup it needs to converge, a longer one can be passed when it is combined with other EMAs
+        """
+        warmup = self.getEMAWarmup(window) if warmup is None else warmup
+        return self.getCachedIndicator('EMA', window, warmup, lambda: self.closeIndicator(kernels.ema, warmup, window))
+
+    def calculateSD(self, window):
+        """
+        Calculates the rolling standard deviation of the closing price over a given window
+        """
+        return self.getCachedIndicator('SD', window, window - 1, lambda: self.closeIndicator(kernels.rollingStd, window - 1, window))
+
+    def calculateRSI(self, window=14):
+        """
+        Calculates the Relative Strength Index using simple moving averages of the gains and losses over a given window.
+        The first of the window price changes needs the price before it, so it has a warmup of window bars
         """
-        return self.historical_data['Close'].ewm(span=window, adjust=False).mean()
+        return self.getCachedIndicator('RSI', window, window, lambda: self.closeIndicator(kernels.rsi, window, window))
     
     # Abstract methods
     @abstractmethod
@@ -52,23 +194,50 @@ class Strategy(ABC):
     def getDataAsDict(self):
         raise NotImplementedError()
 
+    @abstractmethod
+    def getLookback(self):
+        """
+        Returns the number of bars before the last num_days bars that the strategy's indicators need as warmup
+        """
+        raise NotImplementedError()
+
     @abstractmethod
     def preprocessData(self):
         """
-        Method to calculate the necessary indicators for the strategy
+        Method to calculate the necessary indicators for the strategy and add them to the overlay with addIndicator
         """
         raise NotImplementedError()
     
     
     @abstractmethod
-    def generateSignal(self, current_index = -1):
+    def evaluateSignal(self, prev, curr):
         """
-        Passing current index in data as optional argument for backtesting. 
-        For some current_index = i, prev = self.historical_data[i-1] and 
-        curr = self.historical_data[i]
+        Returns the signal for the bar curr given the previous bar prev. Both are rows of indicator values indexed by column name,
+        either from historical_data or from the streaming indicators
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def createStreams(self):
+        """
+        Returns the fresh streaming indicators the strategy needs, which updateStreams advances one bar at a time
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def updateStreams(self, close):
+        """
+        Updates the streaming indicators with the next closing price and returns the bar's values by column name
         """
         raise NotImplementedError()
     
+    @abstractmethod
+    def generateSignalArray(self):
+        """
+        Vectorised equivalent of generateSignal, returning the signal for every bar as a NumPy array
+        """
+        raise NotImplementedError()
+
     @abstractmethod
     def generatePlot(self):
         raise NotImplementedError()
@@ -81,10 +250,12 @@ class SMACrossOverStrategy(Strategy):
         self.long_window = long_window
         super().__init__(stock)
 
+    def getLookback(self):
+        return max(self.short_window, self.long_window) - 1
+
     def preprocessData(self):
-        self.historical_data['SMA_short'] = self.calculateSMA(self.short_window)
-        self.historical_data['SMA_long'] = self.calculateSMA(self.long_window)
-        self.historical_data = self.historical_data.tail(self.num_days)
+        self.addIndicator('SMA_short', self.calculateSMA(self.short_window))
+        self.addIndicator('SMA_long', self.calculateSMA(self.long_window))
 
     def getDataAsDict(self):
         return {
@@ -101,24 +272,36 @@ class SMACrossOverStrategy(Strategy):
     def getLongWindow(self):
         return self.long_window
     
-    def generateSignal(self, current_index = -1):
+    def evaluateSignal(self, prev, curr):
         """
         In this strategy for a buy signal The short-term SMA must cross above the long-term SMA
         For a sell signal the short-term SMA must cross below the long-term SMA
         """
-        curr = self.historical_data.iloc[current_index]
-        prev = self.historical_data.iloc[current_index-1]
-
         # Generate Buy Signal
-        if (prev.SMA_short < prev.SMA_long) and (curr.SMA_short > curr.SMA_long):
+        if (prev['SMA_short'] < prev['SMA_long']) and (curr['SMA_short'] > curr['SMA_long']):
             return 1
 
         # Generate Sell Signal
-        if (prev.SMA_short > prev.SMA_long) and (curr.SMA_short < curr.SMA_long):
+        if (prev['SMA_short'] > prev['SMA_long']) and (curr['SMA_short'] < curr['SMA_long']):
             return -1
 
         # Hold
         return 0
+
+    def createStreams(self):
+        return {'SMA_short': StreamingSMA(self.short_window), 'SMA_long': StreamingSMA(self.long_window)}
+
+    def updateStreams(self, close):
+        return {
+            'Close': close,
+            'SMA_short': self.streams['SMA_short'].update(close),
+            'SMA_long': self.streams['SMA_long'].update(close)
+        }
+
+    def generateSignalArray(self):
+        short = self.historical_data['SMA_short'].to_numpy()
+        long = self.historical_data['SMA_long'].to_numpy()
+        return self.combineSignals(self.crossedAbove(short, long), self.crossedBelow(short, long))
     
     def generatePlot(self, plot_window):
         stock_data_plot = self.historical_data.tail(plot_window).copy()
@@ -168,13 +351,23 @@ class MACDStrategy(Strategy):
         self.long_window = long_window
         super().__init__(stock)
         
-    def preprocessData(self):
-        self.historical_data['EMA_200'] = self.calculateEMA(200) 
-        self.historical_data['MACD'] = self.calculateEMA(self.short_window) - self.calculateEMA(self.long_window)
-        self.historical_data['Signal_line'] = self.historical_data['MACD'].ewm(span=self.signal_window, adjust=False).mean()
-        self.historical_data['MACD_histogram'] = self.historical_data['MACD'] - self.historical_data['Signal_line']
+    def getMACDWarmup(self):
+        """
+        The signal line is an EMA of the MACD, so the MACD's EMAs need the warmup of the longer of them followed by the signal line's
+        """
+        return self.getEMAWarmup(max(self.short_window, self.long_window)) + self.getEMAWarmup(self.signal_window)
 
-        self.historical_data = self.historical_data.tail(self.num_days)
+    def getLookback(self):
+        return max(self.getEMAWarmup(200), self.getMACDWarmup())
+
+    def preprocessData(self):
+        self.addIndicator('EMA_200', self.calculateEMA(200))
+        # The signal line is calculated over the whole MACD warmup before being trimmed
+        warmup = self.getMACDWarmup()
+        macd = self.calculateEMA(self.short_window, warmup) - self.calculateEMA(self.long_window, warmup)
+        self.addIndicator('MACD', macd)
+        self.addIndicator('Signal_line', pd.Series(kernels.ema(macd.to_numpy(), self.signal_window), index=macd.index))
+        self.addIndicator('MACD_histogram', self.indicators['MACD'] - self.indicators['Signal_line'])
 
     def getName(self):
         return "MACD Strategy"
@@ -186,7 +379,7 @@ class MACDStrategy(Strategy):
             'MACD_histogram': self.getData()['MACD_histogram'].to_list()
         }
 
-    def generateSignal(self, current_index = -1):
+    def evaluateSignal(self, prev, curr):
         """
         In this strategy for a buy signal:
         1. The MACD must cross above the Signal Line
@@ -195,9 +388,6 @@ class MACDStrategy(Strategy):
         1. The MACD must cross below the Signal Line
         2. The current closing price is below the 200-day EMA
         """
-        curr = self.historical_data.iloc[current_index]
-        prev = self.historical_data.iloc[current_index-1]
-
         if (prev['MACD'] < prev['Signal_line'] and 
             curr['MACD'] > curr['Signal_line'] and 
             curr['Close'] > curr['EMA_200']):
@@ -210,6 +400,29 @@ class MACDStrategy(Strategy):
         
         return 0  # Hold signal
 
+    def createStreams(self):
+        return {'EMA_200': StreamingEMA(200), 'MACD': StreamingMACD(self.short_window, self.long_window, self.signal_window)}
+
+    def updateStreams(self, close):
+        macd, signal_line, histogram = self.streams['MACD'].update(close)
+        return {
+            'Close': close,
+            'EMA_200': self.streams['EMA_200'].update(close),
+            'MACD': macd,
+            'Signal_line': signal_line,
+            'MACD_histogram': histogram
+        }
+
+    def generateSignalArray(self):
+        macd = self.historical_data['MACD'].to_numpy()
+        signal_line = self.historical_data['Signal_line'].to_numpy()
+        close = self.historical_data['Close'].to_numpy()
+        ema_200 = self.historical_data['EMA_200'].to_numpy()
+
+        buy = self.crossedAbove(macd, signal_line) & (close > ema_200)
+        sell = self.crossedBelow(macd, signal_line) & (close < ema_200)
+        return self.combineSignals(buy, sell)
+
     def generatePlot(self, plot_window):
         stock_data_plot = self.historical_data.tail(plot_window).copy()
         
@@ -271,31 +484,20 @@ class BollingerBandStrategy(Strategy):
         self.band_width_threshold = 0.15
         super().__init__(stock)
     
-    def preprocessData(self):
-
-        self.historical_data['SMA'] = self.calculateSMA(self.window)
-        self.historical_data['SD'] = self.historical_data['Close'].rolling(window=self.window).std()
-
-        self.historical_data['UB'] = self.historical_data['SMA'] + (2 * self.historical_data['SD'])
-        self.historical_data['LB'] = self.historical_data['SMA'] - (2 * self.historical_data['SD'])
+    def getLookback(self):
+        return max(self.window - 1, 14)
 
-        self.historical_data['Band_width'] = (self.historical_data['UB'] - self.historical_data['LB']) / self.historical_data['SMA']
+    def preprocessData(self):
 
-        delta = self.historical_data['Close'].diff()
-        delta.dropna(inplace=True)
+        self.addIndicator('SMA', self.calculateSMA(self.window))
+        self.addIndicator('SD', self.calculateSD(self.window))
 
-        positive = delta.copy()
-        negative = delta.copy()
+        self.addIndicator('UB', self.indicators['SMA'] + (2 * self.indicators['SD']))
+        self.addIndicator('LB', self.indicators['SMA'] - (2 * self.indicators['SD']))
 
-        positive[positive < 0] = 0
-        negative[negative > 0] = 0
+        self.addIndicator('Band_width', (self.indicators['UB'] - self.indicators['LB']) / self.indicators['SMA'])
 
-        average_gain = positive.rolling(window=14).mean()
-        average_loss = abs(negative.rolling(window=14).mean())
-        relative_strength = average_gain/average_loss
-        RSI = 100.0 - (100.0/(1.0 + relative_strength))
-        self.historical_data['RSI'] = RSI
-        self.historical_data = self.historical_data.tail(self.num_days)
+        self.addIndicator('RSI', self.calculateRSI(14))
 
     def getName(self):
         return "Bollinger Band Strategy"
@@ -307,16 +509,13 @@ class BollingerBandStrategy(Strategy):
             'RSI': self.getData()['RSI'].to_list()
         }
     
-    def generateSignal(self, current_index = -1):
+    def evaluateSignal(self, prev, curr):
         """
         In this strategy for a buy signal: 
         1. The prevous candle must close below the bollinger band
         2. The RSI value for the previous day must be below the threshold (30)
         vice verse for a sell signal.
         """
-        curr = self.historical_data.iloc[current_index]
-        prev = self.historical_data.iloc[current_index-1]
-
         # 1
         prev_close_below_band = prev['Close'] < prev['LB']
         # 2
@@ -342,6 +541,26 @@ class BollingerBandStrategy(Strategy):
     
         return 0 
 
+    def createStreams(self):
+        # The bands are two standard deviations wide, as in preprocessData
+        return {'Bands': StreamingBollingerBands(self.window, 2), 'RSI': StreamingRSI(14)}
+
+    def updateStreams(self, close):
+        sma, upper_band, lower_band = self.streams['Bands'].update(close)
+        return {
+            'Close': close,
+            'SMA': sma,
+            'UB': upper_band,
+            'LB': lower_band,
+            'RSI': self.streams['RSI'].update(close)
+        }
+
+    def generateSignalArray(self):
+        # Both signals are based on the previous bar
+        return kernels.thresholdSignals(self.historical_data['Close'].to_numpy(), self.historical_data['LB'].to_numpy(),
+                                        self.historical_data['UB'].to_numpy(), self.historical_data['RSI'].to_numpy(),
+                                        self.RSI_threshold_low, self.RSI_threshold_high)
+
 
     def generatePlot(self,plot_window):
         stock_data_plot = self.historical_data.tail(plot_window).copy()
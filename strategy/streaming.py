@@ -0,0 +1,206 @@
+from collections import deque
+import math
+from strategy.kernels import spanToAlpha
+
+class StreamingIndicator:
+    """
+    Indicator updated one bar at a time in constant time and memory.
+    Updates use the same arithmetic as the kernels in strategy.kernels, so an indicator seeded with a price history
+    and then updated with new bars gives exactly the values the kernels give over the extended history
+    """
+    def update(self, value):
+        """
+        Adds the next value and returns the indicator for that bar, NaN while there is not enough history
+        """
+        raise NotImplementedError()
+
+    def seed(self, values):
+        """
+        Replays a history through the indicator and returns the indicator for its last bar
+        """
+        result = math.nan
+        for value in values:
+            result = self.update(value)
+        return result
+
+
+class StreamingSMA(StreamingIndicator):
+    """
+    Simple moving average over the last window values, with the compensated running sum of rolling(window).mean()
+    """
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.nobs = 0
+        self.negative_count = 0
+        self.sum = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.run_length = 0
+        self.prev_value = None
+
+    def update(self, value):
+        if len(self.values) == self.window:
+            removed = self.values[0]
+            if not math.isnan(removed):
+                self.nobs -= 1
+                y = -removed - self.compensation_remove
+                t = self.sum + y
+                self.compensation_remove = t - self.sum - y
+                self.sum = t
+                if removed < 0:
+                    self.negative_count -= 1
+        self.values.append(value)
+
+        if not math.isnan(value):
+            self.nobs += 1
+            y = value - self.compensation_add
+            t = self.sum + y
+            self.compensation_add = t - self.sum - y
+            self.sum = t
+            if value < 0:
+                self.negative_count += 1
+            self.run_length = self.run_length + 1 if (value == self.prev_value or self.prev_value is None) else 1
+            self.prev_value = value
+
+        if self.nobs < self.window:
+            return math.nan
+        if self.run_length >= self.nobs:
+            return self.prev_value
+        mean = self.sum / self.nobs
+        if (self.negative_count == 0 and mean < 0) or (self.negative_count == self.nobs and mean > 0):
+            return 0.0
+        return mean
+
+
+class StreamingSD(StreamingIndicator):
+    """
+    Sample standard deviation of the last window values, with the online update of rolling(window).std()
+    """
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.nobs = 0
+        self.mean = 0.0
+        self.sum_squared_deviations = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.run_length = 0
+        self.prev_value = None
+
+    def update(self, value):
+        if len(self.values) == self.window:
+            removed = self.values[0]
+            if not math.isnan(removed):
+                self.nobs -= 1
+                if self.nobs:
+                    prev_mean = self.mean - self.compensation_remove
+                    y = removed - self.compensation_remove
+                    t = y - self.mean
+                    self.compensation_remove = t + self.mean - y
+                    self.mean -= t / self.nobs
+                    self.sum_squared_deviations -= (removed - prev_mean) * (removed - self.mean)
+                else:
+                    self.mean = 0.0
+                    self.sum_squared_deviations = 0.0
+        self.values.append(value)
+
+        if not math.isnan(value):
+            self.run_length = self.run_length + 1 if (value == self.prev_value or self.prev_value is None) else 1
+            self.prev_value = value
+            self.nobs += 1
+            prev_mean = self.mean - self.compensation_add
+            y = value - self.compensation_add
+            t = y - self.mean
+            self.compensation_add = t + self.mean - y
+            self.mean += t / self.nobs
+            self.sum_squared_deviations += (value - prev_mean) * (value - self.mean)
+
+        if self.nobs < self.window or self.nobs < 2:
+            return math.nan
+        if self.run_length >= self.nobs:
+            return 0.0
+        variance = self.sum_squared_deviations / (self.nobs - 1)
+        return math.sqrt(variance) if variance > 0 else 0.0
+
+
+class StreamingEMA(StreamingIndicator):
+    """
+    Exponential moving average over span bars seeded with the first value, as ewm(span=span, adjust=False).mean()
+    """
+    def __init__(self, span):
+        self.alpha = spanToAlpha(span)
+        self.weighted = math.nan
+        self.old_weight = 1.0
+        self.started = False
+
+    def update(self, value):
+        is_observation = not math.isnan(value)
+        if not self.started:
+            # The first value seeds the average, even when it is missing
+            self.started = True
+            self.weighted = value
+        elif not math.isnan(self.weighted):
+            self.old_weight *= 1.0 - self.alpha
+            if is_observation:
+                if self.weighted != value:
+                    self.weighted = (self.old_weight * self.weighted + self.alpha * value) / (self.old_weight + self.alpha)
+                self.old_weight = 1.0
+        elif is_observation:
+            self.weighted = value
+        return self.weighted
+
+
+class StreamingRSI(StreamingIndicator):
+    """
+    Relative Strength Index from simple moving averages of the gains and losses over window bars, as Strategy.calculateRSI.
+    Bars where the price or the previous price is missing are skipped
+    """
+    def __init__(self, window=14):
+        self.average_gain = StreamingSMA(window)
+        self.average_loss = StreamingSMA(window)
+        self.prev_close = math.nan
+
+    def update(self, close):
+        delta = close - self.prev_close
+        self.prev_close = close
+        if math.isnan(delta):
+            return math.nan
+
+        average_gain = self.average_gain.update(delta if delta > 0 else 0.0)
+        average_loss = abs(self.average_loss.update(delta if delta < 0 else 0.0))
+        if average_loss == 0:
+            return math.nan if average_gain == 0 or math.isnan(average_gain) else 100.0
+        return 100.0 - (100.0 / (1.0 + average_gain / average_loss))
+
+
+class StreamingMACD(StreamingIndicator):
+    """
+    MACD line (short EMA minus long EMA of the close), its signal line and histogram.
+    update returns (macd, signal_line, histogram)
+    """
+    def __init__(self, short_window=12, long_window=26, signal_window=9):
+        self.short_ema = StreamingEMA(short_window)
+        self.long_ema = StreamingEMA(long_window)
+        self.signal_ema = StreamingEMA(signal_window)
+
+    def update(self, close):
+        macd = self.short_ema.update(close) - self.long_ema.update(close)
+        signal_line = self.signal_ema.update(macd)
+        return macd, signal_line, macd - signal_line
+
+
+class StreamingBollingerBands(StreamingIndicator):
+    """
+    Bollinger bands: the simple moving average of the close plus and minus width standard deviations.
+    update returns (sma, upper_band, lower_band)
+    """
+    def __init__(self, window=20, width=2):
+        self.sma = StreamingSMA(window)
+        self.sd = StreamingSD(window)
+        self.width = width
+
+    def update(self, close):
+        sma = self.sma.update(close)
+        sd = self.sd.update(close)
+        return sma, sma + (self.width * sd), sma - (self.width * sd)
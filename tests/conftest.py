@@ -0,0 +1,104 @@
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Nothing in the tests calls the real API, but the config module refuses to load without a key
+os.environ.setdefault("ALPHA_VANTAGE_KEY", "test")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+import pandas as pd
+
+from benchmark.synthetic import generateOHLCV
+
+
+class StandInAlphaVantage:
+    """
+    Local HTTP server standing in for the Alpha Vantage API. Each symbol is given a list of (status, body) responses,
+    served one per request with the last one repeated, and every request's query is recorded
+    """
+    def __init__(self):
+        self.responses = {}
+        self.requests = []
+        self._lock = threading.Lock()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = {name: values[0] for name, values in parse_qs(urlparse(self.path).query).items()}
+                status, body = stand_in.nextResponse(query)
+                payload = body.encode() if isinstance(body, str) else json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/query"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def nextResponse(self, query):
+        with self._lock:
+            self.requests.append(query)
+            responses = self.responses.get(query.get("symbol"), [(404, {})])
+            return responses.pop(0) if len(responses) > 1 else responses[0]
+
+    def setResponses(self, symbol, responses):
+        with self._lock:
+            self.responses[symbol] = list(responses)
+
+    def getRequests(self, symbol):
+        with self._lock:
+            return [query for query in self.requests if query.get("symbol") == symbol]
+
+    @staticmethod
+    def dailyBody(frame):
+        """
+        Formats OHLCV bars as a TIME_SERIES_DAILY response, newest bar first like the real API
+        """
+        series = {}
+        for date, bar in frame.iloc[::-1].iterrows():
+            series[date.strftime("%Y-%m-%d")] = {
+                "1. open": str(bar["Open"]), "2. high": str(bar["High"]), "3. low": str(bar["Low"]),
+                "4. close": str(bar["Close"]), "5. volume": str(int(bar["Volume"])),
+            }
+        return {"Meta Data": {}, "Time Series (Daily)": series}
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def alpha_vantage(monkeypatch, tmp_path):
+    """
+    Stand-in API server, with StockData pointed at it and at an empty price store in a temporary directory
+    """
+    from data.Data import StockData
+    from data.PriceStore import PriceStore
+
+    stand_in = StandInAlphaVantage()
+    monkeypatch.setattr(StockData, "API_URL", stand_in.url)
+    monkeypatch.setattr(StockData, "price_store", PriceStore(str(tmp_path / "stock_data_cache")))
+    yield stand_in
+    stand_in.close()
+
+
+@pytest.fixture
+def daily_bars():
+    """
+    Returns generated OHLCV bars on business days, rounded like the API's prices so they survive the JSON round trip
+    """
+    def createBars(bars, seed=0, end_date="2024-06-28"):
+        frame = generateOHLCV(bars, seed=seed).round(4)
+        frame.index = pd.bdate_range(end=end_date, periods=bars, name="Date")
+        return frame
+    return createBars
@@ -0,0 +1,99 @@
+import pytest
+import requests
+
+from data.BulkLoader import TokenBucket, RateLimitedSession, BulkStockLoader
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def createSession(**kwargs):
+    # No waiting between retries, and a quota too large to throttle the tests
+    return RateLimitedSession(requests_per_minute=6000, backoff_seconds=0, sleep=lambda seconds: None, **kwargs)
+
+
+def test_token_bucket_stays_within_quota_from_the_first_minute():
+    clock = FakeClock()
+    bucket = TokenBucket(75, clock=clock.time, sleep=clock.sleep)
+    grant_times = []
+    while clock.now < 300:
+        bucket.acquire()
+        grant_times.append(clock.now)
+    # Every minute long window, less a little for rounding in the fake clock, from the first grant on
+    assert all(sum(start <= time < start + 59.999 for time in grant_times) <= 75 for start in range(0, 240, 5))
+    assert len(grant_times) >= 74 * 5
+
+
+def test_token_bucket_allows_configured_burst():
+    clock = FakeClock()
+    bucket = TokenBucket(60, capacity=5, clock=clock.time, sleep=clock.sleep)
+    for _ in range(5):
+        bucket.acquire()
+    assert clock.now == 0
+    bucket.acquire()
+    assert clock.now == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize("throttled", [
+    (429, {}),
+    (503, {}),
+    (200, {"Note": "Thank you for using Alpha Vantage! Our standard API call frequency is 5 calls per minute."}),
+])
+def test_session_retries_throttled_responses(alpha_vantage, daily_bars, throttled):
+    body = alpha_vantage.dailyBody(daily_bars(5))
+    alpha_vantage.setResponses("AAA", [throttled, throttled, (200, body)])
+    session = createSession(max_retries=4)
+    response = session.get(alpha_vantage.url, params={"symbol": "AAA"}, timeout=5)
+    assert response.status_code == 200 and "Time Series (Daily)" in response.json()
+    assert len(alpha_vantage.getRequests("AAA")) == 3
+
+
+def test_session_returns_last_response_when_retries_run_out(alpha_vantage):
+    alpha_vantage.setResponses("AAA", [(500, {})])
+    response = createSession(max_retries=2).get(alpha_vantage.url, params={"symbol": "AAA"}, timeout=5)
+    assert response.status_code == 500
+    assert len(alpha_vantage.getRequests("AAA")) == 3
+
+
+def test_session_does_not_retry_information_responses(alpha_vantage):
+    alpha_vantage.setResponses("AAA", [(200, {"Information": "The **demo** API key is for demo purposes only."})])
+    response = createSession(max_retries=4).get(alpha_vantage.url, params={"symbol": "AAA"}, timeout=5)
+    assert "Information" in response.json()
+    assert len(alpha_vantage.getRequests("AAA")) == 1
+
+
+def test_session_raises_connection_errors_after_retries():
+    session = createSession(max_retries=1)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        # Nothing listens on the discard port
+        session.get("http://127.0.0.1:9/query", timeout=1)
+
+
+def test_bulk_loader_loads_caches_and_reports_errors(alpha_vantage, daily_bars):
+    bars = daily_bars(30)
+    alpha_vantage.setResponses("GOOD", [(429, {}), (200, alpha_vantage.dailyBody(bars))])
+    alpha_vantage.setResponses("BADKEY", [(200, {"Information": "Invalid API key."})])
+    alpha_vantage.setResponses("DOWN", [(500, {})])
+
+    loader = BulkStockLoader(requests_per_minute=6000, max_retries=2, backoff_seconds=0)
+    try:
+        stocks = loader.load(["GOOD", "BADKEY", "DOWN", "GOOD"])
+    finally:
+        loader.close()
+
+    assert list(stocks) == ["GOOD", "BADKEY", "DOWN"]
+    assert stocks["GOOD"].getError() is None
+    assert stocks["GOOD"].getDataFrame()["Close"].tolist() == bars["Close"].tolist()
+    assert "Invalid API key." in stocks["BADKEY"].getError()
+    assert "HTTP Error" in stocks["DOWN"].getError()
+    assert len(alpha_vantage.getRequests("GOOD")) == 2
+    assert len(alpha_vantage.getRequests("BADKEY")) == 1
+    assert len(alpha_vantage.getRequests("DOWN")) == 3
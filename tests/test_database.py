@@ -0,0 +1,102 @@
+import sqlite3
+
+import pytest
+
+from data.DatabaseHandler import ConnectionPool, DBHandler, MIGRATIONS
+from strategy.factory import StrategyFactory
+from benchmark.synthetic import SyntheticStock
+
+SMA = {"short_window": 10, "long_window": 50}
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    # Handlers made by the test get their own pools and strategy indexes, so nothing is shared with the tool's database
+    monkeypatch.setattr(DBHandler, "_pools", {})
+    monkeypatch.setattr(DBHandler, "_strategy_indexes", {})
+    return str(tmp_path / "trading_tool.db")
+
+
+@pytest.fixture
+def executed(monkeypatch):
+    """
+    Statements run on every connection the pools create
+    """
+    statements = []
+    create_connection = ConnectionPool.createConnection
+
+    def createTracedConnection(pool):
+        conn = create_connection(pool)
+        conn.set_trace_callback(statements.append)
+        return conn
+    monkeypatch.setattr(ConnectionPool, "createConnection", createTracedConnection)
+    return statements
+
+
+def getUserVersion(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute("PRAGMA user_version;").fetchone()[0]
+
+
+def createStrategy(ticker, strategy_name="SMA Crossover Strategy", params=SMA):
+    return StrategyFactory().createStrategy(strategy_name, SyntheticStock(ticker, 300, seed=0), **params)
+
+
+def test_migrates_new_database_once(db_path, executed):
+    assert getUserVersion(db_path) == 0
+    DBHandler(db_path)
+    assert getUserVersion(db_path) == len(MIGRATIONS) == 3
+    with sqlite3.connect(db_path) as conn:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table';")}
+    assert {"stock_strategy", "backtest_result", "strategy_snapshot"} <= tables
+
+    # Later handlers share the pool, and a new pool on a migrated database applies nothing
+    assert DBHandler(db_path).pool is DBHandler(db_path).pool
+    ConnectionPool(db_path)
+    assert getUserVersion(db_path) == 3
+    assert sum(statement.lstrip().startswith("CREATE TABLE") for statement in executed) == 3
+
+
+def test_migrates_from_an_older_version(db_path, executed):
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(MIGRATIONS[0])
+        conn.execute("PRAGMA user_version = 1;")
+    DBHandler(db_path)
+    assert getUserVersion(db_path) == 3
+    assert sum(statement.lstrip().startswith("CREATE TABLE") for statement in executed) == 2
+
+
+def test_duplicate_strategy_is_rejected(db_path):
+    handler = DBHandler(db_path)
+    assert handler.insertStrategy(createStrategy("AAA"), SMA) is None
+    error = handler.insertStrategy(createStrategy("AAA"), dict(reversed(list(SMA.items()))))
+    assert "might already exist" in error
+    # The same parameters for another ticker are a different strategy
+    assert handler.insertStrategy(createStrategy("BBB"), SMA) is None
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM stock_strategy;").fetchone()[0] == 2
+
+
+def test_strategy_index_reflects_inserts_and_deletes(db_path):
+    handler = DBHandler(db_path)
+    assert handler.getAllStockStrategies() == {}
+    macd = {"short_window": 12, "long_window": 26, "signal_window": 9}
+    handler.insertStrategy(createStrategy("AAA"), SMA)
+    handler.insertStrategy(createStrategy("AAA", "MACD Strategy", macd), macd)
+    sma_id = handler.getStockStrategyId(createStrategy("AAA"), SMA)
+    macd_id = handler.getStockStrategyId(createStrategy("AAA", "MACD Strategy", macd), macd)
+
+    strategies = handler.getAllStockStrategies()
+    assert strategies == {"AAA": [(sma_id, "SMA Crossover Strategy", SMA), (macd_id, "MACD Strategy", macd)]}
+    # Unchanged tables return the cached index
+    assert DBHandler(db_path).getAllStockStrategies() is strategies
+
+    handler.removeStockStrategy(sma_id)
+    assert handler.getAllStockStrategies() == {"AAA": [(macd_id, "MACD Strategy", macd)]}
+
+    # A strategy inserted by another process, which cannot invalidate this process's index, is found from the table version
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("INSERT INTO stock_strategy (ticker, strategy, params) VALUES ('BBB', 'SMA Crossover Strategy', '{}');")
+    assert set(handler.getAllStockStrategies()) == {"AAA", "BBB"}
+    handler.removeStockStrategy(macd_id)
+    assert set(handler.getAllStockStrategies()) == {"BBB"}
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from strategy.indicator_cache import IndicatorCache
+
+INDEX = pd.date_range("2020-01-01", periods=1000, freq="D")
+
+
+def createSeries():
+    return pd.Series(np.arange(1000, dtype=np.float64), index=INDEX)
+
+
+def test_size_includes_index():
+    cache = IndicatorCache()
+    series = cache.getOrCompute("series", createSeries)
+    frame = cache.getOrCompute("frame", lambda: pd.DataFrame({"a": createSeries(), "b": createSeries()}))
+    # 8 bytes per value and 8 per timestamp of the index
+    assert IndicatorCache.getSize(series) == 16000
+    assert IndicatorCache.getSize(frame) == 24000
+    assert cache.getStats()["bytes"] == 40000
+
+
+def test_evicts_least_recently_used_within_bound():
+    cache = IndicatorCache(max_bytes=40000)
+    for key in ["a", "b"]:
+        cache.getOrCompute(key, createSeries)
+    cache.getOrCompute("a", createSeries)
+    cache.getOrCompute("c", createSeries)
+
+    stats = cache.getStats()
+    assert stats["entries"] == 2 and stats["evictions"] == 1 and stats["bytes"] == 32000
+    calls = []
+    cache.getOrCompute("a", lambda: calls.append("a") or createSeries())
+    cache.getOrCompute("b", lambda: calls.append("b") or createSeries())
+    assert calls == ["b"]
+
+    cache.setMaxBytes(10000)
+    assert cache.getStats()["entries"] == 1 and cache.getStats()["bytes"] == 16000
+    cache.clear()
+    assert cache.getStats()["bytes"] == 0
+
+
+def test_cached_values_are_read_only():
+    cache = IndicatorCache()
+    series = cache.getOrCompute("series", createSeries)
+    assert not series.values.flags.writeable
+    assert cache.getOrCompute("series", createSeries) is series
+    assert cache.getStats()["hits"] == 1
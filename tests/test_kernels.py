@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from strategy import kernels
+from benchmark.synthetic import generateOHLCV
+
+# The NumPy rolling standard deviation is a two-pass calculation, while pandas and the numba loop update it online.
+# The online rounding error is absolute, up to about 5e-9 of the price level for two bar windows, so where the deviation
+# is tiny compared with the price the relative difference can be large
+NUMPY_STD_RTOL = 1e-6
+NUMPY_STD_ATOL = 1e-8
+# Every other NumPy kernel agrees with pandas to within a few ulps
+NUMPY_RTOL = 1e-12
+
+WINDOWS = [1, 2, 3, 14, 20, 50, 200]
+
+
+def createSeries(kind, bars=600, seed=0):
+    close = generateOHLCV(bars, seed=seed)["Close"].to_numpy()
+    if kind == "nan_prefix":
+        close[:37] = np.nan
+    elif kind == "gaps":
+        close[[5, 90, 91, 300]] = np.nan
+    elif kind == "flat":
+        close[100:160] = close[100]
+    return close
+
+
+def getTolerance(backend, kernel_name, close):
+    if backend == "numba":
+        return {"rtol": 0, "atol": 0}
+    if kernel_name == "rollingStd":
+        return {"rtol": NUMPY_STD_RTOL, "atol": NUMPY_STD_ATOL * np.nanmax(np.abs(close))}
+    return {"rtol": NUMPY_RTOL, "atol": 0}
+
+
+def expectedRolling(kernel_name, close, window):
+    rolling = pd.Series(close).rolling(window)
+    return (rolling.mean() if kernel_name == "rollingMean" else rolling.std()).to_numpy()
+
+
+@pytest.mark.parametrize("backend", kernels.BACKENDS)
+@pytest.mark.parametrize("kernel_name", ["rollingMean", "rollingStd"])
+@pytest.mark.parametrize("kind", ["plain", "nan_prefix", "gaps", "flat"])
+@pytest.mark.parametrize("window", WINDOWS + [599, 600, 601, 1000])
+def test_rolling_kernels_match_pandas(backend, kernel_name, kind, window):
+    close = createSeries(kind)
+    kernel = getattr(kernels, kernel_name)
+    np.testing.assert_allclose(kernel(close, window, backend), expectedRolling(kernel_name, close, window),
+                               **getTolerance(backend, kernel_name, close))
+
+
+@pytest.mark.parametrize("backend", kernels.BACKENDS)
+@pytest.mark.parametrize("kind", ["plain", "nan_prefix", "gaps", "flat"])
+@pytest.mark.parametrize("span", WINDOWS + [1000])
+def test_ema_matches_pandas(backend, kind, span):
+    close = createSeries(kind)
+    expected = pd.Series(close).ewm(span=span, adjust=False).mean().to_numpy()
+    np.testing.assert_allclose(kernels.ema(close, span, backend), expected, **getTolerance(backend, "ema", close))
+
+
+@pytest.mark.parametrize("backend", kernels.BACKENDS)
+@pytest.mark.parametrize("length", [0, 1, 5])
+def test_short_series(backend, length):
+    close = createSeries("plain")[:length]
+    series = pd.Series(close, dtype=float)
+    np.testing.assert_allclose(kernels.rollingMean(close, 20, backend), series.rolling(20).mean().to_numpy())
+    np.testing.assert_allclose(kernels.rollingStd(close, 20, backend), series.rolling(20).std().to_numpy())
+    np.testing.assert_allclose(kernels.ema(close, 20, backend), series.ewm(span=20, adjust=False).mean().to_numpy(), rtol=NUMPY_RTOL)
+
+
+@pytest.mark.parametrize("backend", kernels.BACKENDS)
+@pytest.mark.parametrize("window", [2, 14, 20, 200, 700])
+def test_column_kernels_match_each_column(backend, window):
+    # Columns of different lengths, right-aligned like the bars of a PricePanel
+    columns = [createSeries("plain", bars=600, seed=seed) for seed in range(4)]
+    panel = np.column_stack(columns)
+    panel[:150, 1] = np.nan
+    panel[:599, 2] = np.nan
+    panel[:, 3] = np.nan
+
+    for kernel_name in ["rollingMean", "rollingStd"]:
+        result = getattr(kernels, kernel_name)(panel, window, backend)
+        for column in range(panel.shape[1]):
+            expected = expectedRolling(kernel_name, panel[:, column], window)
+            np.testing.assert_allclose(result[:, column], expected, **getTolerance(backend, kernel_name, panel[:, :3]))
+
+    result = kernels.ema(panel, window, backend)
+    for column in range(panel.shape[1]):
+        expected = pd.Series(panel[:, column]).ewm(span=window, adjust=False).mean().to_numpy()
+        np.testing.assert_allclose(result[:, column], expected, **getTolerance(backend, "ema", panel))
+
+    result = kernels.rsi(panel, window, backend=backend)
+    for column in range(panel.shape[1]):
+        np.testing.assert_allclose(result[:, column], kernels.rsi(panel[:, column], window, backend=backend),
+                                   **getTolerance(backend, "rsi", panel))
+
+
+@pytest.mark.parametrize("kind", ["plain", "nan_prefix", "gaps"])
+@pytest.mark.parametrize("window", [2, 14, 700])
+def test_backends_agree_on_rsi(kind, window):
+    close = createSeries(kind)
+    results = [kernels.rsi(close, window, wilder=wilder, backend=backend) for wilder in (False, True) for backend in kernels.BACKENDS]
+    for backend_results in (results[:len(kernels.BACKENDS)], results[len(kernels.BACKENDS):]):
+        for result in backend_results[1:]:
+            np.testing.assert_allclose(result, backend_results[0], rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize("backend", kernels.BACKENDS)
+def test_signal_kernels_match_comparisons(backend):
+    close = createSeries("nan_prefix")
+    fast, slow = kernels.rollingMean(close, 5, backend), kernels.rollingMean(close, 20, backend)
+    fast_series, slow_series = pd.Series(fast), pd.Series(slow)
+    expected_above = ((fast_series.shift(1) < slow_series.shift(1)) & (fast_series > slow_series)).to_numpy()
+    expected_below = ((fast_series.shift(1) > slow_series.shift(1)) & (fast_series < slow_series)).to_numpy()
+    np.testing.assert_array_equal(kernels.crossedAbove(fast, slow, backend), expected_above)
+    np.testing.assert_array_equal(kernels.crossedBelow(fast, slow, backend), expected_below)
+
+    oscillator = kernels.rsi(close, 14, backend=backend)
+    lower, upper = slow * 0.99, slow * 1.01
+    signals = kernels.thresholdSignals(close, lower, upper, oscillator, 45, 55, backend)
+    previous = pd.DataFrame({"close": close, "lower": lower, "upper": upper, "rsi": oscillator}).shift(1)
+    buy = (previous["close"] < previous["lower"]) & (previous["rsi"] < 45)
+    sell = (previous["close"] > previous["upper"]) & (previous["rsi"] > 55)
+    np.testing.assert_array_equal(signals, np.where(buy, 1, np.where(sell, -1, 0)))
+    assert (signals != 0).any()
+
+    panel = np.column_stack([fast, slow])
+    np.testing.assert_array_equal(kernels.crossedAbove(panel, panel[:, ::-1], backend)[:, 0], expected_above)
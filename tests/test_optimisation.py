@@ -0,0 +1,135 @@
+import numpy as np
+import pytest
+
+from backtest.optimisation import WalkForwardOptimisation
+from benchmark.synthetic import SyntheticStock
+
+# Small grids so each walk forward run takes a moment. The Bollinger bands are always two standard deviations wide,
+# so every window's scores tie in groups of four across standard_deviations, and the chunk boundaries split those groups
+PARAMETER_SPACES = {
+    "SMA Crossover Strategy": (["short_window", "long_window"], [np.array([2, 5, 10, 20]), np.array([10, 20, 50, 100])]),
+    "MACD Strategy": (["short_window", "long_window", "signal_window"], [np.array([5, 12]), np.array([26, 35]), np.array([5, 9])]),
+    "Bollinger Band Strategy": (["window", "standard_deviations"], [np.array([5, 10, 20, 30, 40]), np.array([1, 2, 3, 4])]),
+}
+
+IN_SAMPLE_PERCENTAGE = 0.6
+OUT_SAMPLE_PERCENTAGE = 0.2
+
+
+@pytest.fixture(autouse=True)
+def small_parameter_spaces(monkeypatch):
+    # Patched on the class, so forked worker processes build the same grid
+    monkeypatch.setattr(WalkForwardOptimisation, "getParameterSpace", lambda self: PARAMETER_SPACES[self.strategy_str])
+
+
+def createOptimiser(strategy_name, seed=0, **kwargs):
+    return WalkForwardOptimisation(strategy_name, SyntheticStock(f"SYN{seed}", 1500, seed=seed), **kwargs)
+
+
+def runWalkForward(strategy_name, seed=0, **kwargs):
+    portfolios, performance_parameter_map = createOptimiser(strategy_name, seed, **kwargs).run(IN_SAMPLE_PERCENTAGE, OUT_SAMPLE_PERCENTAGE)
+    returns = [None if portfolio is None else float(portfolio.total_return()) for portfolio in portfolios]
+    return returns, performance_parameter_map
+
+
+@pytest.mark.parametrize("strategy_name", list(PARAMETER_SPACES))
+def test_parallel_run_matches_serial(strategy_name):
+    serial_returns, serial_map = runWalkForward(strategy_name, max_workers=1)
+    assert list(serial_map) == list(range(len(serial_returns)))
+    assert len(serial_returns) > 5
+
+    for parameter_chunks in [1, 3]:
+        parallel_returns, parallel_map = runWalkForward(strategy_name, max_workers=2, parameter_chunks=parameter_chunks)
+        assert list(parallel_map) == list(serial_map)
+        for window, (performance, params) in serial_map.items():
+            assert parallel_map[window][1] == params
+            assert parallel_map[window][0] == performance
+        assert parallel_returns == serial_returns
+
+
+def test_tied_scores_resolve_to_earliest_combination():
+    optimiser = createOptimiser("Bollinger Band Strategy")
+    windows = optimiser.createWindows(IN_SAMPLE_PERCENTAGE, OUT_SAMPLE_PERCENTAGE)
+    grid = optimiser.parameter_grid
+    for window in windows:
+        performances = optimiser.evaluateParameters(grid, window[0], window[1])
+        # Combinations differing only in standard_deviations score the same
+        np.testing.assert_array_equal(performances.reshape(-1, 4), performances.reshape(-1, 4)[:, :1].repeat(4, axis=1))
+        best_params, _ = optimiser.selectBestParameters(performances, grid)
+        assert best_params["standard_deviations"] == 1
+
+    _, serial_map = runWalkForward("Bollinger Band Strategy", max_workers=1)
+    _, parallel_map = runWalkForward("Bollinger Band Strategy", max_workers=2, parameter_chunks=3)
+    assert all(params["standard_deviations"] == 1 for _, params in serial_map.values())
+    assert parallel_map == serial_map
+
+
+def test_parallel_run_counts_every_evaluation():
+    serial = createOptimiser("SMA Crossover Strategy", max_workers=1)
+    serial.run(IN_SAMPLE_PERCENTAGE, OUT_SAMPLE_PERCENTAGE)
+    parallel = createOptimiser("SMA Crossover Strategy", max_workers=2, parameter_chunks=3)
+    parallel.run(IN_SAMPLE_PERCENTAGE, OUT_SAMPLE_PERCENTAGE)
+    assert parallel.getEvaluationCount() == serial.getEvaluationCount()
+    assert parallel.getEvaluatedBars() == serial.getEvaluatedBars()
+
+
+def selectBestInLoop(performances, parameter_grid):
+    # The loop the batch selection replaced: keep the first strictly better result
+    best_params, best_performance = None, -np.inf
+    for params, performance in zip(parameter_grid, performances):
+        if performance > best_performance:
+            best_params, best_performance = params, performance
+    return best_params, best_performance
+
+
+@pytest.mark.parametrize("strategy_name", list(PARAMETER_SPACES))
+def test_batch_evaluation_matches_loop(strategy_name):
+    modes = {
+        "loop": {"batch": False, "incremental": False},
+        "loop_metrics": {"batch": False, "incremental": False, "metric_only": True},
+        "batch": {"batch": True, "incremental": False},
+        "batch_metrics": {"batch": True, "incremental": False, "metric_only": True},
+        "incremental": {"batch": True, "incremental": True},
+    }
+    optimisers = {mode: createOptimiser(strategy_name, seed=3, **kwargs) for mode, kwargs in modes.items()}
+    grid = optimisers["loop"].parameter_grid
+    windows = optimisers["loop"].createWindows(IN_SAMPLE_PERCENTAGE, OUT_SAMPLE_PERCENTAGE)
+    for window in windows + [(None, None), (0, 1), (1400, 1499)]:
+        expected = optimisers["loop"].evaluateParameters(grid, window[0], window[1])
+        expected_best = selectBestInLoop(expected, grid)
+        for mode, optimiser in optimisers.items():
+            performances = optimiser.evaluateParameters(grid, window[0], window[1])
+            np.testing.assert_allclose(performances, expected, rtol=1e-9, atol=1e-11, err_msg=f"{mode} window {window}")
+            best_params, best_performance = optimiser.optimiseParametersInSample(window[0], window[1])
+            assert best_params == expected_best[0], f"{mode} window {window}"
+            assert best_performance == pytest.approx(expected_best[1], rel=1e-9, abs=1e-11)
+
+
+@pytest.mark.parametrize("performances", [
+    [0.1, 0.3, 0.3, 0.2],
+    [np.nan, 0.1, np.nan, 0.1],
+    [np.nan, np.nan, np.nan],
+    [0.0, 0.0, 0.0],
+    [-np.inf, -0.5, np.nan, -0.5],
+    [np.nan, -np.inf],
+    [-0.2, np.inf, np.inf],
+])
+def test_select_best_parameters_matches_loop(performances):
+    optimiser = createOptimiser("SMA Crossover Strategy")
+    grid = optimiser.parameter_grid[:len(performances)]
+    performances = np.array(performances)
+    best_params, best_performance = optimiser.selectBestParameters(performances, grid)
+    expected_params, expected_performance = selectBestInLoop(performances, grid)
+    assert best_params == expected_params
+    assert best_performance == expected_performance
+
+
+def test_walk_forward_modes_choose_the_same_parameters():
+    results = [runWalkForward("MACD Strategy", seed=4, batch=batch, incremental=incremental)
+               for batch, incremental in [(False, False), (True, False), (True, True)]]
+    loop_returns, loop_map = results[0]
+    for returns, performance_parameter_map in results[1:]:
+        assert [params for _, params in performance_parameter_map.values()] == [params for _, params in loop_map.values()]
+        np.testing.assert_allclose([performance for performance, _ in performance_parameter_map.values()],
+                                   [performance for performance, _ in loop_map.values()], rtol=1e-9, atol=1e-11)
+        assert returns == loop_returns
@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data.Panel import PricePanel
+from data.PriceStore import PriceStore
+from strategy.factory import StrategyFactory
+from benchmark.synthetic import SyntheticStock, generateOHLCV
+
+FETCH_TIME = pd.Timestamp("2024-12-31 18:00", tz="America/New_York")
+
+
+def createFrame(bars, seed, end_date="2024-12-31"):
+    return generateOHLCV(bars, seed=seed, end_date=end_date)
+
+
+def assertTickerFrame(panel, ticker, frame):
+    pd.testing.assert_frame_equal(panel.getTickerFrame(ticker), frame, check_freq=False, check_names=False)
+
+
+def test_append_tickers_with_disjoint_dates():
+    first = createFrame(10, seed=0, end_date="2024-01-10")
+    second = createFrame(5, seed=1, end_date="2024-02-05")
+    panel = PricePanel()
+    panel.append({"AAA": first, "BBB": second})
+
+    assert panel.getTickers() == ["AAA", "BBB"]
+    assert len(panel.getDates()) == 15
+    mask = panel.getMask()
+    np.testing.assert_array_equal(mask[:, 0], np.arange(15) < 10)
+    np.testing.assert_array_equal(mask[:, 1], np.arange(15) >= 10)
+    assert np.isnan(panel.getField("Close")[~mask]).all()
+    assertTickerFrame(panel, "AAA", first)
+    assertTickerFrame(panel, "BBB", second)
+    np.testing.assert_array_equal(panel.getBarCounts(), [10, 5])
+
+
+def test_append_inserts_dates_between_rows_and_replaces_bars():
+    frame = createFrame(20, seed=2, end_date="2024-03-20")
+    panel = PricePanel()
+    panel.append({"AAA": frame.iloc[::2]})
+    # The odd days fall between the stored rows, and the last bar is revised
+    revised = frame.iloc[1::2].copy()
+    panel.append({"AAA": revised, "BBB": frame.iloc[5:8]})
+    panel.append({"AAA": frame.iloc[-1:]})
+
+    assert panel.getDates().is_monotonic_increasing and len(panel.getDates()) == 20
+    assertTickerFrame(panel, "AAA", frame)
+    assertTickerFrame(panel, "BBB", frame.iloc[5:8])
+
+
+def test_append_grows_capacity():
+    panel = PricePanel()
+    frames = {f"T{column}": createFrame(300, seed=column) for column in range(PricePanel.MIN_COLUMN_CAPACITY + 3)}
+    panel.append(frames)
+    assert panel.row_capacity >= 300 and panel.column_capacity >= len(frames)
+    for ticker, frame in frames.items():
+        assertTickerFrame(panel, ticker, frame)
+
+
+def test_reopen_from_directory(tmp_path):
+    directory = str(tmp_path / "panel")
+    frames = {f"T{column}": createFrame(100 + 50 * column, seed=column) for column in range(PricePanel.MIN_COLUMN_CAPACITY + 1)}
+    frames["LATE"] = createFrame(300, seed=99, end_date="2025-06-30")
+    panel = PricePanel(directory)
+    panel.append(frames, {ticker: FETCH_TIME for ticker in frames})
+
+    reopened = PricePanel(directory)
+    assert reopened.getTickers() == panel.getTickers()
+    pd.testing.assert_index_equal(reopened.getDates(), panel.getDates())
+    np.testing.assert_array_equal(reopened.getMask(), panel.getMask())
+    for field in PricePanel.FIELDS:
+        np.testing.assert_array_equal(reopened.getField(field), panel.getField(field))
+    assert reopened.fetch_dates == {ticker: FETCH_TIME for ticker in frames}
+
+    # Appending to the reopened panel writes through to the files
+    extra = createFrame(3, seed=7, end_date="2025-07-03")
+    reopened.append({"T0": extra})
+    assertTickerFrame(PricePanel(directory), "T0", pd.concat([frames["T0"], extra]))
+
+
+def test_update_after_price_store_gains_a_bar(tmp_path):
+    store = PriceStore(str(tmp_path / "store"))
+    full = {"AAA": createFrame(400, seed=0), "BBB": createFrame(250, seed=1)}
+    store.save("AAA", full["AAA"].iloc[:-1], FETCH_TIME)
+    store.save("BBB", full["BBB"], FETCH_TIME)
+    directory = str(tmp_path / "panel")
+    panel = PricePanel.fromPriceStore(store, ["AAA", "BBB", "MISSING"], directory)
+    assert panel.getTickers() == ["AAA", "BBB"]
+    assertTickerFrame(panel, "AAA", full["AAA"].iloc[:-1])
+
+    # The cache gains a bar and revises the one before it, while BBB's cache is unchanged
+    refreshed = full["AAA"].copy()
+    refreshed.iloc[-2, refreshed.columns.get_loc("Close")] += 1.0
+    store.save("AAA", refreshed, FETCH_TIME + pd.Timedelta(days=1))
+    panel = PricePanel.fromPriceStore(store, ["AAA", "BBB"], directory)
+
+    assertTickerFrame(panel, "AAA", refreshed)
+    assertTickerFrame(panel, "BBB", full["BBB"])
+    assert panel.fetch_dates["AAA"] == FETCH_TIME + pd.Timedelta(days=1)
+    assert len(panel.getDates()) == 400
+    assertTickerFrame(PricePanel(directory), "AAA", refreshed)
+
+
+def test_get_bars_pads_short_tickers():
+    frames = {"LONG": createFrame(50, seed=0), "SHORT": createFrame(5, seed=1), "EARLY": createFrame(8, seed=2, end_date="2024-11-30")}
+    panel = PricePanel()
+    panel.append(frames)
+    values, rows = panel.getBars("Close", 10)
+
+    assert values.shape == rows.shape == (10, 3)
+    np.testing.assert_array_equal(values[:, 0], frames["LONG"]["Close"].to_numpy()[-10:])
+    assert np.isnan(values[:5, 1]).all() and (rows[:5, 1] == -1).all()
+    np.testing.assert_array_equal(values[5:, 1], frames["SHORT"]["Close"].to_numpy())
+    # A ticker whose bars end earlier is aligned on its own last bar
+    assert np.isnan(values[:2, 2]).all() and (rows[:2, 2] == -1).all()
+    np.testing.assert_array_equal(values[2:, 2], frames["EARLY"]["Close"].to_numpy())
+    dates = panel.getDates()
+    assert dates[rows[-1, 2]] == frames["EARLY"].index[-1]
+
+    frame = panel.toDateFrame(values, rows)
+    pd.testing.assert_series_equal(frame["SHORT"].dropna(), frames["SHORT"]["Close"], check_names=False, check_freq=False)
+
+    values, rows = panel.getBars("Close", 100)
+    np.testing.assert_array_equal(values[-50:, 0], frames["LONG"]["Close"].to_numpy())
+    assert np.isnan(values[:50, 0]).all()
+
+
+PARAMETER_SETS = [
+    ("SMA Crossover Strategy", {"short_window": 10, "long_window": 50}),
+    ("SMA Crossover Strategy", {"short_window": 3, "long_window": 7}),
+    ("MACD Strategy", {"short_window": 12, "long_window": 26, "signal_window": 9}),
+    ("Bollinger Band Strategy", {"window": 20, "standard_deviations": 2}),
+]
+
+
+@pytest.mark.parametrize("num_days", [1500, 200])
+@pytest.mark.parametrize("strategy_name, params", PARAMETER_SETS)
+def test_panel_signals_match_strategies(strategy_name, params, num_days):
+    stocks = [SyntheticStock(f"SYN{seed}", bars, seed=seed) for seed, bars in enumerate([2500, 900, 150, 40])]
+    gapped = SyntheticStock("GAPS", 1200, seed=10)
+    gapped.data = gapped.data.iloc[np.random.default_rng(10).random(1200) > 0.3]
+    stocks.append(gapped)
+    panel = PricePanel.fromStocks(stocks)
+
+    signal_frame = StrategyFactory().createPanelStrategy(strategy_name, panel, num_days=num_days, **params).generateSignalFrame()
+    for stock in stocks:
+        strategy = StrategyFactory().createStrategy(strategy_name, stock, **params)
+        strategy.num_days = num_days
+        strategy.preprocessData()
+        strategy.historical_data = strategy.materialiseData()
+        expected = strategy.generateSignalSeries()
+        pd.testing.assert_series_equal(signal_frame[stock.getTicker()].dropna(), expected,
+                                       check_dtype=False, check_names=False, check_freq=False)
@@ -0,0 +1,25 @@
+from jobs import precompute
+from benchmark.synthetic import SyntheticStock
+
+
+def test_report_collects_every_strategy_error(monkeypatch):
+    monkeypatch.setattr(precompute, "_worker_stocks", {"SYN": SyntheticStock("SYN", 400, seed=0)})
+    strategies = [
+        (1, "SMA Crossover Strategy", {"short_window": 0, "long_window": 7}),
+        (2, "SMA Crossover Strategy", {"short_window": 3, "long_window": 7}),
+        (3, "Bollinger Band Strategy", {"window": -1, "standard_deviations": 2}),
+    ]
+    report = precompute.precomputeTicker(("SYN", strategies, {}, 1000, 2.0, False))
+
+    assert [snapshot["stock_strategy_id"] for snapshot, _, _ in report["computed"]] == [2]
+    assert len(report["errors"]) == 2
+    assert "SMA Crossover Strategy" in report["errors"][0] and "Bollinger Band Strategy" in report["errors"][1]
+    assert report["error"] == "; ".join(report["errors"])
+
+
+def test_report_without_errors(monkeypatch):
+    monkeypatch.setattr(precompute, "_worker_stocks", {"SYN": SyntheticStock("SYN", 400, seed=0)})
+    report = precompute.precomputeTicker(("SYN", [(1, "MACD Strategy", {"short_window": 12, "long_window": 26, "signal_window": 9})],
+                                          {}, 1000, 2.0, False))
+    assert report["errors"] == [] and report["error"] is None
+    assert len(report["computed"]) == 1
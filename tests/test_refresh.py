@@ -0,0 +1,98 @@
+import pandas as pd
+import pytest
+
+from data.Data import StockData
+
+# Cached data fetched on the evening its last bar was published, long enough ago to be stale
+CACHED_FETCH_TIME = pd.Timestamp("2024-06-14 18:00", tz="America/New_York")
+
+
+@pytest.fixture
+def history(daily_bars):
+    # Bars up to the latest session the stand-in server returns, of which the cache holds the earlier ones
+    return daily_bars(400, seed=1, end_date="2024-06-28")
+
+
+def cacheBars(frame):
+    StockData.price_store.save("AAA", frame, CACHED_FETCH_TIME)
+
+
+def getOutputSizes(alpha_vantage):
+    return [query["outputsize"] for query in alpha_vantage.getRequests("AAA")]
+
+
+def test_compact_window_is_merged_into_overlapping_cache(alpha_vantage, history):
+    cacheBars(history.iloc[:-10])
+    alpha_vantage.setResponses("AAA", [(200, alpha_vantage.dailyBody(history.iloc[-100:]))])
+
+    stock = StockData("AAA")
+
+    assert stock.getError() is None
+    assert getOutputSizes(alpha_vantage) == ["compact"]
+    pd.testing.assert_frame_equal(stock.getDataFrame(), history, check_freq=False)
+    # The merged data replaced the cache, so the next load is served from it without a request
+    fetch_time, cached = StockData.price_store.load("AAA")
+    pd.testing.assert_frame_equal(cached, history, check_freq=False)
+    assert fetch_time > CACHED_FETCH_TIME
+
+
+def test_gap_before_compact_window_fetches_full_history(alpha_vantage, history):
+    cacheBars(history.iloc[:200])
+    alpha_vantage.setResponses("AAA", [(200, alpha_vantage.dailyBody(history.iloc[-100:])),
+                                       (200, alpha_vantage.dailyBody(history))])
+
+    stock = StockData("AAA")
+
+    assert stock.getError() is None
+    assert getOutputSizes(alpha_vantage) == ["compact", "full"]
+    pd.testing.assert_frame_equal(stock.getDataFrame(), history, check_freq=False)
+
+
+def test_compact_window_starting_after_cache_fetches_full_history(alpha_vantage, history):
+    # The compact window begins on the bar after the cached ones: nothing is missing, but there is no overlap to confirm it
+    cacheBars(history.iloc[:-100])
+    alpha_vantage.setResponses("AAA", [(200, alpha_vantage.dailyBody(history.iloc[-100:])),
+                                       (200, alpha_vantage.dailyBody(history))])
+
+    stock = StockData("AAA")
+
+    assert getOutputSizes(alpha_vantage) == ["compact", "full"]
+    pd.testing.assert_frame_equal(stock.getDataFrame(), history, check_freq=False)
+
+
+def test_revised_bars_replace_cached_bars(alpha_vantage, history):
+    cached = history.iloc[:-5].copy()
+    # The cache holds a provisional last bar and an earlier bar which were later corrected
+    cached.iloc[-1, cached.columns.get_loc("Close")] += 1.25
+    cached.iloc[-30, cached.columns.get_loc("Volume")] = 1.0
+    cacheBars(cached)
+    alpha_vantage.setResponses("AAA", [(200, alpha_vantage.dailyBody(history.iloc[-100:]))])
+
+    stock = StockData("AAA")
+
+    assert getOutputSizes(alpha_vantage) == ["compact"]
+    pd.testing.assert_frame_equal(stock.getDataFrame(), history, check_freq=False)
+
+
+def test_failed_refresh_reports_error_and_keeps_cache(alpha_vantage, history):
+    cacheBars(history.iloc[:-10])
+    alpha_vantage.setResponses("AAA", [(200, {"Information": "Invalid API key."})])
+
+    stock = StockData("AAA")
+
+    assert "Invalid API key." in stock.getError()
+    fetch_time, cached = StockData.price_store.load("AAA")
+    assert fetch_time == CACHED_FETCH_TIME
+    pd.testing.assert_frame_equal(cached, history.iloc[:-10], check_freq=False)
+
+
+def test_current_cache_is_not_refreshed(alpha_vantage, history, monkeypatch):
+    from data.TradingCalendar import trading_calendar
+    monkeypatch.setattr(trading_calendar, "now", lambda: pd.Timestamp("2024-06-14 20:00", tz="America/New_York"))
+    cacheBars(history.loc[:"2024-06-14"])
+
+    stock = StockData("AAA")
+
+    assert stock.getError() is None
+    assert getOutputSizes(alpha_vantage) == []
+    pd.testing.assert_frame_equal(stock.getDataFrame(), history.loc[:"2024-06-14"], check_freq=False)
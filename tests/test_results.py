@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from backtest.optimisation import WalkForwardOptimisation
+from backtest.results import WalkForwardResults
+from backtest.search import RandomSearch
+from benchmark.synthetic import SyntheticStock
+
+IN_SAMPLE_PERCENTAGE = 0.6
+OUT_SAMPLE_PERCENTAGE = 0.2
+
+
+def createOptimiser(strategy_name="SMA Crossover Strategy"):
+    return WalkForwardOptimisation(strategy_name, SyntheticStock("SYN0", 1500, seed=0), search=RandomSearch(budget=30))
+
+
+@pytest.fixture(scope="module")
+def serial_run():
+    return createOptimiser().run(IN_SAMPLE_PERCENTAGE, OUT_SAMPLE_PERCENTAGE)
+
+
+@pytest.fixture(scope="module")
+def compact_run(tmp_path_factory):
+    spill_dir = str(tmp_path_factory.mktemp("spill"))
+    return createOptimiser().run(IN_SAMPLE_PERCENTAGE, OUT_SAMPLE_PERCENTAGE, compact=True, spill_dir=spill_dir)
+
+
+def test_run_returns_map_keyed_by_window(serial_run):
+    portfolios, performance_parameter_map = serial_run
+    windows = createOptimiser().createWindows(IN_SAMPLE_PERCENTAGE, OUT_SAMPLE_PERCENTAGE)
+    assert len(portfolios) == len(windows) > 1
+    assert list(performance_parameter_map) == list(range(len(windows)))
+    for performance, params in performance_parameter_map.values():
+        assert isinstance(performance, float)
+        assert set(params) == {"short_window", "long_window"}
+
+
+def test_compact_summary_matches_run(serial_run, compact_run):
+    portfolios, performance_parameter_map = serial_run
+    summary = compact_run.getSummary()
+    windows = createOptimiser().createWindows(IN_SAMPLE_PERCENTAGE, OUT_SAMPLE_PERCENTAGE)
+
+    assert len(compact_run) == len(summary) == len(windows)
+    assert compact_run.stop_reason is None
+    np.testing.assert_array_equal(summary[["in_sample_start", "in_sample_end", "out_sample_start", "out_sample_end"]].to_numpy(),
+                                  np.array(windows))
+    for window, portfolio in enumerate(portfolios):
+        row = summary.iloc[window]
+        performance, params = performance_parameter_map[window]
+        assert row["window"] == window and row["has_params"]
+        assert compact_run.getParameters(window) == params
+        assert row["in_sample_performance"] == performance
+        assert row["out_sample_return"] == pytest.approx(float(portfolio.total_return()), rel=1e-12)
+        assert row["out_sample_max_drawdown"] == pytest.approx(float(portfolio.max_drawdown()), rel=1e-12)
+        assert row["out_sample_trades"] == int(portfolio.trades.count())
+
+
+def test_equity_layout(serial_run, compact_run):
+    portfolios, _ = serial_run
+    lengths = np.diff(compact_run.equity_offsets)
+    assert len(lengths) == len(portfolios)
+    assert compact_run.equity_offsets[-1] == len(compact_run.equity)
+    for window, portfolio in enumerate(portfolios):
+        row = compact_run.getSummary().iloc[window]
+        assert lengths[window] == WalkForwardResults.getWindowLength(row["out_sample_start"], row["out_sample_end"])
+        np.testing.assert_array_equal(compact_run.getEquityCurve(window), portfolio.value().to_numpy())
+    assert not np.isnan(compact_run.equity).any()
+    assert compact_run.getMemoryUsage() == compact_run.summary.nbytes + compact_run.equity.nbytes + compact_run.equity_offsets.nbytes
+
+
+def test_spilled_portfolios_reload(serial_run, compact_run):
+    portfolios, _ = serial_run
+    for window in [0, len(portfolios) - 1]:
+        reloaded = compact_run.getPortfolio(window)
+        assert float(reloaded.total_return()) == float(portfolios[window].total_return())
+        np.testing.assert_array_equal(reloaded.value().to_numpy(), portfolios[window].value().to_numpy())
+    assert compact_run.getPortfolio(len(portfolios)) is None
+
+
+def test_best_parameters(serial_run, compact_run):
+    _, performance_parameter_map = serial_run
+    performances = [performance for performance, _ in performance_parameter_map.values()]
+    best_window = int(np.argmax(performances))
+    assert compact_run.getBestWindow() == best_window
+    assert compact_run.getBestParameters() == (performance_parameter_map[best_window][1], performances[best_window])
+
+
+def test_partial_results_without_spill_dir():
+    windows = [(0, 10, 10, 15), (5, 15, 15, 20), (10, 20, 20, 29)]
+    results = WalkForwardResults(windows, ["window", "standard_deviations"], [np.int64, np.int64])
+    assert len(results) == 0 and results.getBestWindow() is None
+    assert results.getBestParameters() == (None, -np.inf)
+    np.testing.assert_array_equal(results.equity_offsets, [0, 6, 12, 22])
+
+    results.add({"window": 1, "best_params": None, "in_sample_performance": -np.inf, "elapsed_seconds": 0.5})
+    assert len(results) == 2
+    summary = results.getSummary()
+    assert not summary["has_params"].any() and summary["out_sample_trades"].tolist() == [-1, -1]
+    assert results.getParameters(1) is None and results.getPortfolio(1) is None
+    assert np.isnan(results.getEquityCurve(1)).all()
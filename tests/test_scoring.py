@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from backtest.Backtest import BatchBacktester
+from backtest.scoring import IncrementalScorer
+from strategy.factory import StrategyFactory
+from benchmark.synthetic import SyntheticStock
+
+WINDOWS = [(None, None), (0, None), (None, 1499), (1, 2), (10, 400), (250, 1000), (700, 1450), (1000, None), (1497, None), (1200, 1201)]
+
+PARAMETER_SETS = [
+    ("SMA Crossover Strategy", {"short_window": 5, "long_window": 20}),
+    ("SMA Crossover Strategy", {"short_window": 10, "long_window": 50}),
+    ("SMA Crossover Strategy", {"short_window": 50, "long_window": 200}),
+    ("MACD Strategy", {"short_window": 12, "long_window": 26, "signal_window": 9}),
+    ("Bollinger Band Strategy", {"window": 20, "standard_deviations": 2}),
+    ("Bollinger Band Strategy", {"window": 10, "standard_deviations": 2}),
+]
+
+
+def createBacktester(seed):
+    stock = SyntheticStock(f"SYN{seed}", 2000, seed=seed)
+    strategies = [StrategyFactory().createStrategy(strategy_name, stock, **params) for strategy_name, params in PARAMETER_SETS]
+    signals = np.column_stack([strategy.generateSignalArray() for strategy in strategies])
+    return BatchBacktester(data=strategies[0].getData(), signals=signals), signals
+
+
+@pytest.mark.parametrize("percentage_commission", [0.0, 0.1, 1.0])
+@pytest.mark.parametrize("seed", range(3))
+def test_scores_match_backtester(percentage_commission, seed):
+    backtester, signals = createBacktester(seed)
+    scorer = IncrementalScorer(backtester.data["Close"].to_numpy(), signals, percentage_commission)
+    for start_data, end_data in WINDOWS:
+        expected = backtester.run(10000, percentage_commission, start_data=start_data, end_data=end_data).total_return().to_numpy()
+        np.testing.assert_allclose(scorer.totalReturn(start_data, end_data), expected, rtol=1e-9, atol=1e-11,
+                                   err_msg=f"window {start_data}..{end_data}")
+
+
+def test_scores_for_selected_columns():
+    backtester, signals = createBacktester(seed=5)
+    scorer = IncrementalScorer(backtester.data["Close"].to_numpy(), signals, 0.1)
+    expected = backtester.run(10000, 0.1, start_data=300, end_data=1100).total_return().to_numpy()
+    columns = [4, 0, 2]
+    np.testing.assert_allclose(scorer.totalReturn(300, 1100, columns), expected[columns], rtol=1e-9, atol=1e-11)
+
+
+def test_single_signal_column():
+    backtester, signals = createBacktester(seed=6)
+    scorer = IncrementalScorer(backtester.data["Close"].to_numpy(), signals[:, 1], 0.1)
+    expected = backtester.run(10000, 0.1, start_data=200, end_data=900).total_return().to_numpy()[1]
+    np.testing.assert_allclose(scorer.totalReturn(200, 900), [expected], rtol=1e-9, atol=1e-11)
+
+
+def test_tied_columns_stay_tied():
+    # Two columns with different signals before the window but identical trades inside it
+    close = SyntheticStock("SYN0", 500, seed=0).getDataFrame()["Close"].to_numpy()
+    signals = np.zeros((500, 2), dtype=np.int64)
+    signals[[10, 200, 300], 0] = [1, 1, -1]
+    signals[[20, 60, 200, 300], 1] = [1, -1, 1, -1]
+    scorer = IncrementalScorer(close, signals, 0.1)
+    returns = scorer.totalReturn(100, 400)
+    assert returns[0] == returns[1]
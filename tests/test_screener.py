@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+from data.Panel import PricePanel
+from strategy.factory import StrategyFactory
+from strategy.indicator_cache import indicator_cache
+from strategy.screener import Screener, DEFAULT_PARAMETER_SETS, SIGNAL_NAMES
+from benchmark.synthetic import SyntheticStock
+
+PARAMETER_SETS = {
+    "SMA Crossover Strategy": [{"short_window": 10, "long_window": 50}, {"short_window": 3, "long_window": 7},
+                               {"short_window": 50, "long_window": 200}],
+    "MACD Strategy": [{"short_window": 12, "long_window": 26, "signal_window": 9},
+                      {"short_window": 5, "long_window": 35, "signal_window": 5}],
+    "Bollinger Band Strategy": [{"window": 20, "standard_deviations": 2}, {"window": 10, "standard_deviations": 2}],
+}
+
+
+def createStocks():
+    """
+    Tickers of different lengths, one shorter than the longest window, one with days the others traded missing,
+    and one whose history ends before the others
+    """
+    stocks = [SyntheticStock(f"SYN{seed}", bars, seed=seed) for seed, bars in enumerate([2500, 1600, 400, 120, 60, 30])]
+    gapped = SyntheticStock("GAPS", 900, seed=10)
+    gapped.data = gapped.data.iloc[np.random.default_rng(10).random(900) > 0.2]
+    ended = SyntheticStock("ENDED", 700, seed=11)
+    ended.data = ended.data.iloc[:-25]
+    return stocks + [gapped, ended]
+
+
+@pytest.fixture(scope="module")
+def stocks():
+    return createStocks()
+
+
+@pytest.fixture(scope="module")
+def screener(stocks):
+    return Screener(PricePanel.fromStocks(stocks))
+
+
+def getExpectedSignal(stock, strategy_name, params):
+    strategy = StrategyFactory().createStrategy(strategy_name, stock, **params)
+    return int(strategy.generateSignalSeries().iloc[-1])
+
+
+@pytest.mark.parametrize("strategy_name", list(PARAMETER_SETS))
+def test_last_signals_match_strategies(stocks, screener, strategy_name):
+    indicator_cache.clear()
+    for params in PARAMETER_SETS[strategy_name]:
+        signals = screener.getLastSignals(strategy_name, params)
+        assert len(signals) == len(stocks)
+        for stock, signal in zip(stocks, signals):
+            assert signal == getExpectedSignal(stock, strategy_name, params), f"{stock.getTicker()} {params}"
+
+
+def test_last_signals_include_buys_and_sells():
+    # Guards the parity test against tickers that never signal on their latest bar: each synthetic history is cut
+    # at the bars where its strategy signalled
+    strategy_name, params = "SMA Crossover Strategy", {"short_window": 3, "long_window": 7}
+    base = SyntheticStock("BASE", 600, seed=20)
+    signals = StrategyFactory().createStrategy(strategy_name, base, **params).generateSignalSeries()
+    stocks = []
+    for signal in (1, -1):
+        stock = SyntheticStock(f"CUT{signal}", 600, seed=20)
+        stock.data = base.getDataFrame().loc[:signals.index[signals == signal][-1]]
+        stocks.append(stock)
+    last_signals = Screener(PricePanel.fromStocks(stocks)).getLastSignals(strategy_name, params)
+    assert list(last_signals) == [1, -1]
+    assert [getExpectedSignal(stock, strategy_name, params) for stock in stocks] == [1, -1]
+
+
+def test_screen_table(stocks, screener):
+    table = screener.screen(PARAMETER_SETS, tickers=["SYN2", "GAPS", "UNKNOWN"])
+    assert len(table) == 2 * sum(len(params_list) for params_list in PARAMETER_SETS.values())
+    assert set(table["Ticker"]) == {"SYN2", "GAPS"}
+    # Buy and sell signals come first
+    holds = table["Signal"].eq("Hold").to_numpy()
+    assert not (holds[:-1] & ~holds[1:]).any()
+    stocks_by_ticker = {stock.getTicker(): stock for stock in stocks}
+    for row in table.itertuples():
+        params = next(params for params in PARAMETER_SETS[row.Strategy]
+                      if ", ".join(f"{name}={value}" for name, value in params.items()) == row.Parameters)
+        stock = stocks_by_ticker[row.Ticker]
+        assert row.Signal == SIGNAL_NAMES[getExpectedSignal(stock, row.Strategy, params)]
+        assert row.Close == stock.getDataFrame()["Close"].iloc[-1]
+        assert row._5 == stock.getDataFrame().index[-1].date()
+
+    assert len(screener.screen()) == len(stocks) * len(DEFAULT_PARAMETER_SETS)
+
+
+def test_screen_stock_strategies_maps_rows(stocks, screener):
+    sma = {"short_window": 3, "long_window": 7}
+    macd = {"short_window": 12, "long_window": 26, "signal_window": 9}
+    stock_strategies = {
+        "SYN0": [(11, "SMA Crossover Strategy", sma), (12, "MACD Strategy", macd)],
+        "SYN3": [(13, "SMA Crossover Strategy", dict(sma))],
+        "GAPS": [(14, "SMA Crossover Strategy", {"long_window": 7, "short_window": 3}),
+                 (15, "Bollinger Band Strategy", {"window": 10, "standard_deviations": 2})],
+        "MISSING": [(16, "SMA Crossover Strategy", sma)],
+    }
+    table = screener.screenStockStrategies(stock_strategies)
+
+    assert sorted(table["Stock Strategy ID"]) == [11, 12, 13, 14, 15]
+    stocks_by_ticker = {stock.getTicker(): stock for stock in stocks}
+    expected_rows = {stock_strategy_id: (ticker, strategy_name, params)
+                     for ticker, entries in stock_strategies.items() for stock_strategy_id, strategy_name, params in entries}
+    for row in table.itertuples():
+        ticker, strategy_name, params = expected_rows[row._1]
+        assert (row.Ticker, row.Strategy) == (ticker, strategy_name)
+        assert row.Signal == SIGNAL_NAMES[getExpectedSignal(stocks_by_ticker[ticker], strategy_name, params)]
+    assert screener.screenStockStrategies({}).empty
@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+
+from backtest.Backtest import Backtester
+from backtest.optimisation import WalkForwardOptimisation
+from backtest.search import GridSearch, RandomSearch, CoarseToFineSearch, SuccessiveHalvingSearch, SEARCH_METHODS
+from benchmark.synthetic import SyntheticStock
+
+IN_SAMPLE_PERCENTAGE = 0.6
+OUT_SAMPLE_PERCENTAGE = 0.2
+
+
+def createOptimiser(strategy_name, search=None, **kwargs):
+    return WalkForwardOptimisation(strategy_name, SyntheticStock("SYN1", 1500, seed=1), search=search, **kwargs)
+
+
+def exhaustiveSearch(optimiser, start_data, end_data):
+    # The search before ParameterSearch existed: backtest every combination on its own and keep the first strictly better
+    best_params, best_performance = None, -np.inf
+    for params in optimiser.parameter_grid:
+        strategy = optimiser.strategy_factory.createStrategy(optimiser.strategy_str, optimiser.stock, **params)
+        performance = Backtester(strategy).run(optimiser.initial_cash, optimiser.percentage_commission,
+                                               start_data=start_data, end_data=end_data).total_return()
+        if performance > best_performance:
+            best_params, best_performance = params, performance
+    return best_params, best_performance
+
+
+@pytest.mark.parametrize("strategy_name", ["SMA Crossover Strategy", "Bollinger Band Strategy"])
+def test_grid_search_matches_exhaustive_loop(strategy_name):
+    optimiser = createOptimiser(strategy_name, GridSearch())
+    window = optimiser.createWindows(IN_SAMPLE_PERCENTAGE, OUT_SAMPLE_PERCENTAGE)[3]
+    best_params, best_performance = optimiser.optimiseParametersInSample(window[0], window[1])
+    expected_params, expected_performance = exhaustiveSearch(optimiser, window[0], window[1])
+    assert best_params == expected_params
+    assert best_performance == pytest.approx(expected_performance, rel=1e-9, abs=1e-11)
+    assert optimiser.getEvaluationCount() == len(optimiser.parameter_grid)
+    assert optimiser.getEvaluatedBars() == len(optimiser.parameter_grid) * (window[1] - window[0] + 1)
+
+
+def test_random_search_respects_budget_and_seed():
+    optimiser = createOptimiser("SMA Crossover Strategy")
+    evaluated = []
+    original = optimiser.evaluateParameters
+
+    def recordEvaluations(parameter_list, start_data=None, end_data=None):
+        evaluated.append(list(parameter_list))
+        return original(parameter_list, start_data, end_data)
+    optimiser.evaluateParameters = recordEvaluations
+
+    best_params, best_performance = RandomSearch(budget=25, seed=3).search(optimiser, 100, 600)
+    assert len(evaluated) == 1 and len(evaluated[0]) == 25
+    assert optimiser.getEvaluationCount() == 25
+    # Sampled without replacement, in grid order
+    positions = [optimiser.parameter_grid.index(params) for params in evaluated[0]]
+    assert positions == sorted(set(positions))
+    assert best_params in evaluated[0]
+
+    # The same seed samples the same combinations, another seed different ones
+    assert RandomSearch(budget=25, seed=3).search(optimiser, 100, 600) == (best_params, best_performance)
+    assert evaluated[1] == evaluated[0]
+    RandomSearch(budget=25, seed=4).search(optimiser, 100, 600)
+    assert evaluated[2] != evaluated[0]
+
+    # A budget larger than the grid evaluates the whole grid, and finds the grid search's best
+    grid_best = GridSearch().search(optimiser, 100, 600)
+    assert RandomSearch(budget=10 ** 6).search(optimiser, 100, 600) == grid_best
+    assert len(evaluated[-1]) == len(optimiser.parameter_grid)
+
+
+@pytest.mark.parametrize("search", [GridSearch(), RandomSearch(budget=40), CoarseToFineSearch(), SuccessiveHalvingSearch(),
+                                    SuccessiveHalvingSearch(eta=3, rounds=1, initial_candidates=50)])
+def test_evaluation_count_is_reported(search):
+    optimiser = createOptimiser("SMA Crossover Strategy", search)
+    results = list(optimiser.iterRun(IN_SAMPLE_PERCENTAGE, OUT_SAMPLE_PERCENTAGE))
+    counts = [result["evaluations"] for result in results]
+    assert counts == sorted(counts) and counts[0] > 0
+    assert counts[-1] == optimiser.getEvaluationCount()
+    per_window = counts[0]
+    if isinstance(search, GridSearch):
+        assert per_window == len(optimiser.parameter_grid)
+    elif isinstance(search, RandomSearch):
+        assert counts == [40 * (window + 1) for window in range(len(results))]
+    else:
+        # Searches that prune the grid backtest fewer bars than the grid search, though successive halving runs more backtests
+        windows = optimiser.createWindows(IN_SAMPLE_PERCENTAGE, OUT_SAMPLE_PERCENTAGE)
+        grid_bars = len(optimiser.parameter_grid) * sum(window[1] - window[0] + 1 for window in windows)
+        assert optimiser.getEvaluatedBars() < grid_bars
+    assert all(result["best_params"] is not None for result in results)
+
+
+def test_successive_halving_rounds():
+    optimiser = createOptimiser("Bollinger Band Strategy")
+    grid_size = len(optimiser.parameter_grid)
+    best_params, _ = SuccessiveHalvingSearch(eta=2, rounds=3).search(optimiser, 0, 700)
+    # All candidates, then half of them, then a quarter
+    assert optimiser.getEvaluationCount() == grid_size + int(np.ceil(grid_size / 2)) + int(np.ceil(np.ceil(grid_size / 2) / 2))
+    assert best_params in optimiser.parameter_grid
+
+    single_round = createOptimiser("Bollinger Band Strategy")
+    assert SuccessiveHalvingSearch(rounds=1).search(single_round, 0, 700) == GridSearch().search(single_round, 0, 700)
+
+
+@pytest.mark.parametrize("kwargs", [{"rounds": 0}, {"rounds": -1}, {"eta": 1}, {"eta": 0.5}])
+def test_successive_halving_rejects_invalid_settings(kwargs):
+    with pytest.raises(ValueError):
+        SuccessiveHalvingSearch(**kwargs)
+
+
+def test_search_methods():
+    assert list(SEARCH_METHODS) == ["Grid Search", "Coarse To Fine Search", "Successive Halving Search", "Random Search"]
@@ -0,0 +1,65 @@
+import pandas as pd
+import pytest
+
+from strategy import kernels
+from strategy.factory import StrategyFactory
+from strategy.indicator_cache import indicator_cache
+from strategy.strategies import Strategy
+from benchmark.synthetic import SyntheticStock
+
+PARAMETER_SETS = [
+    ("SMA Crossover Strategy", {"short_window": 10, "long_window": 50}),
+    ("SMA Crossover Strategy", {"short_window": 3, "long_window": 7}),
+    ("SMA Crossover Strategy", {"short_window": 50, "long_window": 200}),
+    ("MACD Strategy", {"short_window": 12, "long_window": 26, "signal_window": 9}),
+    ("MACD Strategy", {"short_window": 5, "long_window": 35, "signal_window": 5}),
+    ("Bollinger Band Strategy", {"window": 20, "standard_deviations": 2}),
+    ("Bollinger Band Strategy", {"window": 10, "standard_deviations": 2}),
+]
+
+
+@pytest.fixture(autouse=True)
+def clear_indicator_cache():
+    # Indicators are cached by ticker and data, not by backend, so each test starts from an empty cache
+    indicator_cache.clear()
+    yield
+    indicator_cache.clear()
+
+
+def createStrategy(strategy_name, params, bars, seed):
+    return StrategyFactory().createStrategy(strategy_name, SyntheticStock(f"SYN{seed}", bars, seed=seed), **params)
+
+
+@pytest.mark.parametrize("strategy_name, params", PARAMETER_SETS)
+@pytest.mark.parametrize("bars", [2500, 1500, 300, 30])
+def test_vectorised_signals_match_iterative(strategy_name, params, bars):
+    for seed in range(3):
+        strategy = createStrategy(strategy_name, params, bars, seed)
+        signals = strategy.generateSignalSeries()
+        pd.testing.assert_series_equal(signals, strategy.generateSignalSeriesIterative(), check_dtype=False)
+        assert len(signals) == min(bars, strategy.num_days)
+
+
+@pytest.mark.parametrize("strategy_name, params", PARAMETER_SETS)
+def test_signals_are_generated(strategy_name, params):
+    # Guards against the comparison passing on strategies that never signal
+    signals = pd.concat([createStrategy(strategy_name, params, 2500, seed).generateSignalSeries() for seed in range(3)])
+    assert (signals == 1).any() and (signals == -1).any()
+
+
+@pytest.mark.parametrize("backend", kernels.BACKENDS)
+@pytest.mark.parametrize("strategy_name, params", PARAMETER_SETS)
+def test_signals_match_on_every_backend(monkeypatch, backend, strategy_name, params):
+    monkeypatch.setattr(kernels, "DEFAULT_BACKEND", backend)
+    strategy = createStrategy(strategy_name, params, 2000, seed=7)
+    pd.testing.assert_series_equal(strategy.generateSignalSeries(), strategy.generateSignalSeriesIterative(), check_dtype=False)
+
+
+@pytest.mark.parametrize("strategy_name, params", PARAMETER_SETS)
+def test_ema_warmup_does_not_change_signals(monkeypatch, strategy_name, params):
+    warmed_up = createStrategy(strategy_name, params, 3000, seed=11).generateSignalSeries()
+    indicator_cache.clear()
+    monkeypatch.setattr(Strategy, "ema_tolerance", None)
+    full_history = createStrategy(strategy_name, params, 3000, seed=11)
+    pd.testing.assert_series_equal(warmed_up, full_history.generateSignalSeries())
+    pd.testing.assert_series_equal(full_history.generateSignalSeries(), full_history.generateSignalSeriesIterative(), check_dtype=False)
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+import pytest
+import vectorbt as vbt
+
+from backtest.Backtest import Backtester, BatchBacktester
+from backtest.simulator import simulateMetrics, METRICS
+from strategy import kernels
+from strategy.strategies import SMACrossOverStrategy
+from benchmark.synthetic import generateOHLCV, SyntheticStock
+
+FEES = [0.0, 0.1, 1.0]
+
+
+def createSignals(bars, columns, seed, density=0.05):
+    rng = np.random.default_rng(seed)
+    entries = rng.random((bars, columns)) < density
+    exits = rng.random((bars, columns)) < density
+    return entries, exits
+
+
+def vectorbtMetrics(close, entries, exits, initial_cash, percentage_commission):
+    close = pd.Series(close, index=pd.date_range("2020-01-01", periods=len(close), freq="D"))
+    portfolio = vbt.Portfolio.from_signals(close, pd.DataFrame(entries, index=close.index), pd.DataFrame(exits, index=close.index),
+                                           init_cash=initial_cash, fees=percentage_commission / 100, freq="D")
+    return {
+        "total_return": portfolio.total_return().to_numpy(),
+        "max_drawdown": portfolio.max_drawdown().to_numpy(),
+        "trade_count": portfolio.trades.count().to_numpy(),
+    }
+
+
+def assertMatchesVectorbt(close, entries, exits, percentage_commission, backend, initial_cash=10000):
+    expected = vectorbtMetrics(close, entries, exits, initial_cash, percentage_commission)
+    results = simulateMetrics(close, entries, exits, initial_cash, percentage_commission, metrics=METRICS, backend=backend)
+    np.testing.assert_allclose(results["total_return"], expected["total_return"], rtol=1e-9, atol=1e-12)
+    np.testing.assert_allclose(results["max_drawdown"], expected["max_drawdown"], rtol=1e-9, atol=1e-12)
+    np.testing.assert_array_equal(results["trade_count"], expected["trade_count"])
+
+
+@pytest.mark.parametrize("backend", kernels.BACKENDS)
+@pytest.mark.parametrize("percentage_commission", FEES)
+@pytest.mark.parametrize("seed", range(3))
+def test_batch_columns_match_vectorbt(backend, percentage_commission, seed):
+    close = generateOHLCV(800, seed=seed)["Close"].to_numpy()
+    entries, exits = createSignals(800, 25, seed)
+    # Columns that never trade, that only exit, and that hold from the first bar to the end
+    entries[:, 0] = exits[:, 0] = False
+    entries[:, 1] = False
+    entries[:, 2], exits[:, 2] = False, False
+    entries[0, 2] = True
+    assertMatchesVectorbt(close, entries, exits, percentage_commission, backend)
+
+
+@pytest.mark.parametrize("backend", kernels.BACKENDS)
+@pytest.mark.parametrize("percentage_commission", FEES)
+def test_edge_signals_match_vectorbt(backend, percentage_commission):
+    close = generateOHLCV(60, seed=4)["Close"].to_numpy()
+    bars = len(close)
+    entries = np.zeros((bars, 6), dtype=bool)
+    exits = np.zeros((bars, 6), dtype=bool)
+    # Entry on the last bar only
+    entries[-1, 0] = True
+    # Entry on the last bar after a closed trade
+    entries[[3, bars - 1], 1] = True
+    exits[10, 1] = True
+    # Exit on the last bar
+    entries[5, 2] = True
+    exits[-1, 2] = True
+    # Entry and exit on the same bar, when flat and when invested
+    entries[[7, 20], 3] = True
+    exits[[7, 20, 30], 3] = True
+    # Repeated entries and exits
+    entries[[2, 3, 4, 40, 41], 4] = True
+    exits[[12, 13, 50, 51], 4] = True
+    # Signals on every bar
+    entries[::2, 5] = True
+    exits[1::2, 5] = True
+    assertMatchesVectorbt(close, entries, exits, percentage_commission, backend)
+
+
+@pytest.mark.parametrize("backend", kernels.BACKENDS)
+def test_single_column_and_short_windows(backend):
+    close = generateOHLCV(300, seed=9)["Close"].to_numpy()
+    entries, exits = createSignals(300, 1, seed=9, density=0.1)
+    for start, stop in [(0, 300), (250, 300), (298, 300), (299, 300), (120, 121)]:
+        expected = vectorbtMetrics(close[start:stop], entries[start:stop], exits[start:stop], 10000, 0.1)
+        results = simulateMetrics(close[start:stop], entries[start:stop, 0], exits[start:stop, 0], 10000, 0.1,
+                                  metrics=METRICS, backend=backend)
+        for metric in METRICS:
+            np.testing.assert_allclose(results[metric], expected[metric], rtol=1e-9, atol=1e-12)
+
+
+def test_empty_window_and_unknown_metric():
+    results = simulateMetrics(np.array([]), np.zeros((0, 3), dtype=bool), np.zeros((0, 3), dtype=bool), 10000, 0.1, metrics=METRICS)
+    for metric in METRICS:
+        np.testing.assert_array_equal(results[metric], np.zeros(3))
+    with pytest.raises(ValueError):
+        simulateMetrics(np.ones(3), np.zeros(3, dtype=bool), np.zeros(3, dtype=bool), 10000, 0.1, metrics=("sharpe_ratio",))
+
+
+@pytest.mark.parametrize("start_data, end_data", [(None, None), (100, None), (None, 900), (600, 1400), (1498, None)])
+def test_backtester_metrics_match_portfolio(start_data, end_data):
+    stock = SyntheticStock("SYN0", 2000, seed=0)
+    strategies = [SMACrossOverStrategy(stock, short_window, long_window) for short_window, long_window in [(5, 20), (10, 50), (20, 100)]]
+    backtesters = [Backtester(strategies[0]), BatchBacktester(strategies)]
+    for backtester in backtesters:
+        portfolio = backtester.run(10000, 0.1, start_data=start_data, end_data=end_data)
+        results = backtester.runMetrics(10000, 0.1, start_data=start_data, end_data=end_data, metrics=("total_return", "trade_count"))
+        np.testing.assert_allclose(results["total_return"], portfolio.total_return(), rtol=1e-9, atol=1e-12)
+        np.testing.assert_array_equal(results["trade_count"], portfolio.trades.count())
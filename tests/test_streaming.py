@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from strategy import kernels
+from strategy.factory import StrategyFactory
+from strategy.indicator_cache import indicator_cache
+from strategy.streaming import StreamingSMA, StreamingSD, StreamingEMA, StreamingRSI, StreamingMACD, StreamingBollingerBands
+from benchmark.synthetic import SyntheticStock, generateOHLCV
+
+# Long enough for rounding in the running sums to build up if the updates drifted from the kernels
+STREAMED_BARS = 20000
+
+
+@pytest.fixture(scope="module")
+def close():
+    values = generateOHLCV(STREAMED_BARS, seed=5)["Close"].to_numpy()
+    # A flat run and a level shift, where running sums lose precision
+    values[5000:5100] = values[5000]
+    values[12000:] *= 50
+    return values
+
+
+def stream(indicator, values):
+    return np.array([indicator.update(value) for value in values])
+
+
+@pytest.mark.parametrize("window", [2, 14, 20, 200])
+def test_streaming_sma_and_sd_match_kernels(close, window):
+    np.testing.assert_array_equal(stream(StreamingSMA(window), close), kernels.rollingMean(close, window, "numba"))
+    np.testing.assert_array_equal(stream(StreamingSD(window), close), kernels.rollingStd(close, window, "numba"))
+    np.testing.assert_allclose(stream(StreamingSD(window), close), pd.Series(close).rolling(window).std().to_numpy(), rtol=0, atol=0)
+
+
+@pytest.mark.parametrize("span", [9, 26, 200])
+def test_streaming_ema_matches_kernel(close, span):
+    np.testing.assert_array_equal(stream(StreamingEMA(span), close), kernels.ema(close, span, "numba"))
+
+
+@pytest.mark.parametrize("window", [2, 14])
+def test_streaming_rsi_matches_kernel(close, window):
+    np.testing.assert_allclose(stream(StreamingRSI(window), close), kernels.rsi(close, window, backend="numba"), rtol=1e-12)
+
+
+def test_streaming_macd_and_bands_match_kernels(close):
+    macd, signal_line, histogram = stream(StreamingMACD(12, 26, 9), close).T
+    expected_macd = kernels.ema(close, 12, "numba") - kernels.ema(close, 26, "numba")
+    np.testing.assert_array_equal(macd, expected_macd)
+    np.testing.assert_array_equal(signal_line, kernels.ema(expected_macd, 9, "numba"))
+    np.testing.assert_array_equal(histogram, macd - signal_line)
+
+    sma, upper, lower = stream(StreamingBollingerBands(20, 2), close).T
+    sd = kernels.rollingStd(close, 20, "numba")
+    np.testing.assert_array_equal(sma, kernels.rollingMean(close, 20, "numba"))
+    np.testing.assert_array_equal(upper, sma + 2 * sd)
+    np.testing.assert_array_equal(lower, sma - 2 * sd)
+
+
+PARAMETER_SETS = [
+    ("SMA Crossover Strategy", {"short_window": 10, "long_window": 50}),
+    ("SMA Crossover Strategy", {"short_window": 3, "long_window": 7}),
+    ("MACD Strategy", {"short_window": 12, "long_window": 26, "signal_window": 9}),
+    ("Bollinger Band Strategy", {"window": 20, "standard_deviations": 2}),
+    ("Bollinger Band Strategy", {"window": 10, "standard_deviations": 2}),
+]
+
+
+@pytest.mark.parametrize("strategy_name, params", PARAMETER_SETS)
+def test_on_bar_matches_signal_series(strategy_name, params):
+    indicator_cache.clear()
+    full = SyntheticStock("SYN", 6000, seed=8)
+    seeded = SyntheticStock("SYN", 6000, seed=8)
+    seeded.data = full.getDataFrame().iloc[:1000]
+    factory = StrategyFactory()
+
+    strategy = factory.createStrategy(strategy_name, seeded, **params)
+    strategy.startStreaming()
+    streamed = [strategy.onBar(bar) for _, bar in full.getDataFrame().iloc[1000:].iterrows()]
+
+    # The full history strategy covers its last num_days bars, so its signals are compared with the streamed ones there
+    expected = factory.createStrategy(strategy_name, full, **params).generateSignalSeries()
+    streamed = pd.Series(streamed, index=full.getDataFrame().index[1000:]).loc[expected.index]
+    assert (expected != 0).sum() > 5
+    pd.testing.assert_series_equal(streamed, expected, check_dtype=False, check_names=False, check_freq=False)
+
+
+@pytest.mark.parametrize("strategy_name, params", PARAMETER_SETS)
+def test_on_bar_after_seeding_matches_every_next_bar(strategy_name, params):
+    indicator_cache.clear()
+    full = SyntheticStock("SYN", 1800, seed=9)
+    factory = StrategyFactory()
+    for history in [300, 1200, 1799]:
+        seeded = SyntheticStock("SYN", 1800, seed=9)
+        seeded.data = full.getDataFrame().iloc[:history]
+        strategy = factory.createStrategy(strategy_name, seeded, **params)
+        # The close on its own, as well as a row, is accepted
+        signal = strategy.onBar(full.getDataFrame()["Close"].iloc[history])
+
+        extended = SyntheticStock("SYN", 1800, seed=9)
+        extended.data = full.getDataFrame().iloc[:history + 1]
+        assert signal == factory.createStrategy(strategy_name, extended, **params).generateSignalSeries().iloc[-1]
+        # The price data of the streaming strategy is left unchanged
+        assert len(strategy.price_data) == history
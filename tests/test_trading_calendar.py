@@ -0,0 +1,80 @@
+import datetime
+
+import pandas as pd
+import pytest
+
+from data.TradingCalendar import TradingCalendar, trading_calendar
+
+
+def marketTime(time):
+    return pd.Timestamp(time, tz=TradingCalendar.TIMEZONE)
+
+
+def test_publish_time_and_sessions():
+    assert trading_calendar.getPublishTime("2024-07-02") == marketTime("2024-07-02 16:30")
+    # Independence Day and the weekend after it add no sessions
+    assert list(trading_calendar.getSessions("2024-07-02", "2024-07-08").date) == [
+        datetime.date(2024, 7, 2), datetime.date(2024, 7, 3), datetime.date(2024, 7, 5), datetime.date(2024, 7, 8)]
+    assert not trading_calendar.isTradingDay("2024-07-04") and not trading_calendar.isTradingDay("2024-07-06")
+
+
+@pytest.mark.parametrize("now, expected", [
+    ("2024-07-02 16:29", datetime.date(2024, 7, 1)),
+    ("2024-07-02 16:30", datetime.date(2024, 7, 2)),
+    ("2024-07-03 00:10", datetime.date(2024, 7, 2)),
+    ("2024-07-04 18:00", datetime.date(2024, 7, 3)),
+    ("2024-07-06 12:00", datetime.date(2024, 7, 5)),
+    ("2024-07-08 09:00", datetime.date(2024, 7, 5)),
+])
+def test_latest_published_session(now, expected):
+    assert trading_calendar.getLatestPublishedSession(marketTime(now)) == expected
+
+
+def test_saturday_with_fridays_data():
+    now = marketTime("2024-07-06 12:00")
+    assert trading_calendar.isDataCurrent(marketTime("2024-07-05 17:00"), datetime.date(2024, 7, 5), now=now)
+    # Still current on Monday before its bar is due
+    assert trading_calendar.isDataCurrent(marketTime("2024-07-05 17:00"), datetime.date(2024, 7, 5), now=marketTime("2024-07-08 15:00"))
+    # Fetched on Friday morning, so without Friday's bar
+    assert not trading_calendar.isDataCurrent(marketTime("2024-07-05 10:00"), datetime.date(2024, 7, 3), now=now)
+    # Fetched on Saturday, when the API had no newer bar to return
+    assert trading_calendar.isDataCurrent(marketTime("2024-07-06 09:00"), datetime.date(2024, 7, 3), now=now)
+    # Data cached with only a fetch date
+    assert not trading_calendar.isDataCurrent(datetime.date(2024, 7, 5), now=now)
+    assert trading_calendar.isDataCurrent(datetime.date(2024, 7, 6), now=now)
+
+
+def test_market_holiday():
+    now = marketTime("2024-07-04 18:00")
+    assert trading_calendar.isDataCurrent(marketTime("2024-07-03 17:00"), datetime.date(2024, 7, 3), now=now)
+    assert not trading_calendar.isDataCurrent(marketTime("2024-07-03 12:00"), datetime.date(2024, 7, 2), now=now)
+    assert trading_calendar.isDataCurrent(marketTime("2024-07-04 09:00"), datetime.date(2024, 7, 2), now=now)
+    # The day after the holiday expects no bar for it
+    assert trading_calendar.isDataCurrent(marketTime("2024-07-03 17:00"), datetime.date(2024, 7, 3), now=marketTime("2024-07-05 16:00"))
+
+
+def test_fetch_before_and_after_publish_on_a_trading_day():
+    last_bar = datetime.date(2024, 7, 1)
+    fetch_time = marketTime("2024-07-02 09:00")
+    assert trading_calendar.isDataCurrent(fetch_time, last_bar, now=marketTime("2024-07-02 15:00"))
+    assert trading_calendar.isDataCurrent(fetch_time, last_bar, now=marketTime("2024-07-02 16:29"))
+    assert not trading_calendar.isDataCurrent(fetch_time, last_bar, now=marketTime("2024-07-02 16:30"))
+    assert trading_calendar.isDataCurrent(marketTime("2024-07-02 16:45"), datetime.date(2024, 7, 2), now=marketTime("2024-07-02 17:00"))
+    # Times in other timezones, or without one, are compared in market time
+    assert not trading_calendar.isDataCurrent(pd.Timestamp("2024-07-02 13:00", tz="UTC"), last_bar, now=pd.Timestamp("2024-07-02 21:00", tz="UTC"))
+    assert trading_calendar.isDataCurrent(pd.Timestamp("2024-07-02 09:00"), last_bar, now=pd.Timestamp("2024-07-02 16:00"))
+
+
+def test_retry_interval_after_early_fetch():
+    last_bar = datetime.date(2024, 7, 1)
+    # Fetched before the bar was due, so it is refetched as soon as it is due
+    assert not trading_calendar.isDataCurrent(marketTime("2024-07-02 16:10"), last_bar, now=marketTime("2024-07-02 16:35"))
+    # Fetched after the bar was due, but the API had not published it yet
+    late_fetch = marketTime("2024-07-02 16:40")
+    assert trading_calendar.isDataCurrent(late_fetch, last_bar, now=marketTime("2024-07-02 17:00"))
+    assert trading_calendar.isDataCurrent(late_fetch, last_bar, now=marketTime("2024-07-02 17:39"))
+    assert not trading_calendar.isDataCurrent(late_fetch, last_bar, now=marketTime("2024-07-02 17:40"))
+
+    calendar = TradingCalendar(retry_interval=pd.Timedelta(hours=3))
+    assert calendar.isDataCurrent(late_fetch, last_bar, now=marketTime("2024-07-02 19:00"))
+    assert not calendar.isDataCurrent(late_fetch, last_bar, now=marketTime("2024-07-02 19:40"))